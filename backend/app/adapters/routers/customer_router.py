@@ -1,31 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.responses import JSONResponse
 from uuid import UUID
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.adapters.schemas.customer import (
     CustomerCreate,
+    CustomerBulkCreate,
     CustomerUpdate,
     CustomerRead,
 )
-from app.infrastructure.db.session import get_db
-from app.infrastructure.repositories.customer_repository import CustomerRepository
+from app.adapters.schemas.bulk import BulkCreateResponse
+from app.infrastructure.db.session import get_async_db
+from app.infrastructure.repositories.customer_repository import AsyncCustomerRepository
 from app.use_cases.customer_usecases import CustomerUseCase
-from app.domain.exceptions import CustomerDuplicateException, CustomerValidationException, CustomerNotFoundException
+from app.use_cases.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.domain.exceptions import InvalidPageCursorException, CustomerDuplicateException, CustomerValidationException, CustomerNotFoundException
 
 router = APIRouter(prefix="/api/v1/customers", tags=["Customers"])
 
-def get_customer_use_case(db: Session = Depends(get_db)) -> CustomerUseCase:
-    repository = CustomerRepository(db)
+def get_customer_use_case(db: AsyncSession = Depends(get_async_db)) -> CustomerUseCase:
+    repository = AsyncCustomerRepository(db)
     return CustomerUseCase(repository)
 
 @router.post("/create", response_model=CustomerRead, status_code=status.HTTP_201_CREATED)
-def create_customer(
+async def create_customer(
     customer_data: CustomerCreate,
     use_case: CustomerUseCase = Depends(get_customer_use_case),
 ):
     "Allows to create a new customer"
     try:
-        return use_case.create_customer(customer_data)
+        return await use_case.create_customer(customer_data)
     except CustomerDuplicateException as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except CustomerValidationException as e:
@@ -35,26 +39,48 @@ def create_customer(
 
 #--------------------------------------------------------------------------------------------
 
+@router.post("/bulk-create", response_model=BulkCreateResponse)
+async def bulk_create_customers(
+    payload: CustomerBulkCreate,
+    use_case: CustomerUseCase = Depends(get_customer_use_case),
+):
+    "Allows to create many customers at once; rejected rows are reported by index and the rest are created"
+    try:
+        return await use_case.create_customers(payload.items)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
 @router.get("/list", response_model=list[CustomerRead])
-def get_all_customers(
+async def get_all_customers(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
     use_case: CustomerUseCase = Depends(get_customer_use_case),
 ):
-    "Allows to get all customers"
+    "Allows to get the customers, one keyset page at a time (next page in the X-Next-Cursor header)"
     try:
-        return use_case.get_all_customers()
+        items, next_cursor = await use_case.get_customers_page(limit, cursor, is_active=is_active)
+    except InvalidPageCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 #--------------------------------------------------------------------------------------------
 
 @router.get("/detail/{customer_id}", response_model=CustomerRead)
-def get_customer_by_id(
+async def get_customer_by_id(
     customer_id: UUID,
     use_case: CustomerUseCase = Depends(get_customer_use_case),
 ):
     "Allows to get a customer by id"
     try:
-        customer = use_case.get_customer_by_id(customer_id)
+        customer = await use_case.get_customer_by_id(customer_id)
     except CustomerNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -64,14 +90,14 @@ def get_customer_by_id(
 #--------------------------------------------------------------------------------------------
 
 @router.put("/update/{customer_id}", response_model=CustomerRead)
-def update_customer(
+async def update_customer(
     customer_id: UUID,
     customer_data: CustomerUpdate,
     use_case: CustomerUseCase = Depends(get_customer_use_case),
 ):
     "Allows to update a customer by id"
     try:
-        updated = use_case.update_customer(customer_id, customer_data)
+        updated = await use_case.update_customer(customer_id, customer_data)
     except CustomerNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except CustomerDuplicateException as e:
@@ -85,13 +111,13 @@ def update_customer(
 #--------------------------------------------------------------------------------------------
 
 @router.patch("/disable/{customer_id}", status_code=status.HTTP_200_OK)
-def disable_customer(
+async def disable_customer(
     customer_id: UUID,
     use_case: CustomerUseCase = Depends(get_customer_use_case),
 ):
     "Allows to disable (soft delete) a customer by id"
     try:
-        use_case.disable_customer(customer_id)
+        await use_case.disable_customer(customer_id)
     except CustomerNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
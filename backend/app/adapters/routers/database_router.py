@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.adapters.schemas.database import DatabasePoolStatsResponse, PoolStatsResponse
+from app.infrastructure.db.pool import pool_stats
+from app.infrastructure.db.session import engine, async_engine
+
+router = APIRouter(prefix="/api/v1/database", tags=["Database"])
+
+@router.get("/pool_stats", response_model=DatabasePoolStatsResponse)
+def get_pool_stats():
+    "Allows to get the connection pool usage of this worker: checked out, overflow, checkout wait time and timeouts"
+    return DatabasePoolStatsResponse(
+        sync_pool=PoolStatsResponse(**vars(pool_stats(engine.pool))),
+        async_pool=PoolStatsResponse(**vars(pool_stats(async_engine.sync_engine.pool))),
+    )
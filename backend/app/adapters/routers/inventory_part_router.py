@@ -1,22 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from tempfile import SpooledTemporaryFile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from uuid import UUID
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.adapters.schemas.inventory_part import (
     InventoryPartCreate,
+    InventoryPartBulkCreate,
     InventoryPartUpdate,
     InventoryPartRead,
+    InventoryPartPriceListRequest,
+    InventoryPartPriceListResponse,
+    InventoryPartImportResponse,
 )
+from app.adapters.schemas.bulk import BulkCreateResponse
 from app.infrastructure.db.session import get_db
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
 from app.use_cases.inventory_part_usecases import InventoryPartUseCase
-from app.domain.exceptions import InventoryPartDuplicateException, InventoryPartValidationException, InventoryPartNotFoundException
+from app.use_cases.repair_order_optimization.live_plan import shared_plan
+from app.use_cases.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.domain.exceptions import InvalidPageCursorException, InventoryPartDuplicateException, InventoryPartValidationException, InventoryPartNotFoundException
 
 router = APIRouter(prefix="/api/v1/inventory_parts", tags=["Inventory Parts"])
 
+# Size of an uploaded catalog kept in memory before it is spooled to disk.
+IMPORT_SPOOL_SIZE = 8 * 2**20
+
 def get_inventory_part_use_case(db: Session = Depends(get_db)) -> InventoryPartUseCase:
     repository = InventoryPartRepository(db)
-    return InventoryPartUseCase(repository)
+    return InventoryPartUseCase(repository, shared_plan, RepairOrderRepository(db))
 
 @router.post("/create", response_model=InventoryPartRead, status_code=status.HTTP_201_CREATED)
 def create_inventory_part(
@@ -35,15 +50,37 @@ def create_inventory_part(
 
 #--------------------------------------------------------------------------------------------
 
+@router.post("/bulk-create", response_model=BulkCreateResponse)
+def bulk_create_inventory_parts(
+    payload: InventoryPartBulkCreate,
+    use_case: InventoryPartUseCase = Depends(get_inventory_part_use_case),
+):
+    "Allows to create many parts at once; rejected rows are reported by index and the rest are created"
+    try:
+        return use_case.create_inventory_parts(payload.items)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
 @router.get("/list", response_model=list[InventoryPartRead])
 def get_all_inventory_parts(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
     use_case: InventoryPartUseCase = Depends(get_inventory_part_use_case),
 ):
-    "Allows to get all parts"
+    "Allows to get the parts, one keyset page at a time (next page in the X-Next-Cursor header)"
     try:
-        return use_case.get_all_inventory_parts()
+        items, next_cursor = use_case.get_inventory_parts_page(limit, cursor, is_active=is_active)
+    except InvalidPageCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 #--------------------------------------------------------------------------------------------
 
@@ -84,6 +121,45 @@ def update_inventory_part(
 
 #--------------------------------------------------------------------------------------------
 
+@router.put("/prices", response_model=InventoryPartPriceListResponse)
+def update_inventory_part_prices(
+    price_list: InventoryPartPriceListRequest,
+    use_case: InventoryPartUseCase = Depends(get_inventory_part_use_case),
+):
+    "Allows to update the cost and final price of many parts and re-price their open repair orders"
+    try:
+        return use_case.update_prices(price_list.items)
+    except InventoryPartNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InventoryPartValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
+@router.post("/import", response_model=InventoryPartImportResponse)
+async def import_inventory_parts(
+    request: Request,
+    use_case: InventoryPartUseCase = Depends(get_inventory_part_use_case),
+):
+    "Allows to import a supplier catalog sent as a text/csv body; parts are matched by name and updated or created"
+    try:
+        with SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as upload:
+            async for chunk in request.stream():
+                upload.write(chunk)
+            upload.seek(0)
+            csv_file = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+            return await run_in_threadpool(use_case.import_catalog, csv_file)
+    except InventoryPartValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Catalog must be UTF-8 encoded CSV.")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
 @router.patch("/disable/{inventory_part_id}", status_code=status.HTTP_200_OK)
 def disable_inventory_part(
     inventory_part_id: UUID,
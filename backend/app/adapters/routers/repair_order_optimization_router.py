@@ -1,30 +1,118 @@
-from app.adapters.schemas.repair_order_optimization import OptimizedRepairOrderResponse
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.use_cases.repair_order_optimization.select_orders_by_profit import SelectRepairOrdersByProfitUseCase
+from app.adapters.schemas.repair_order_optimization import (OptimizedRepairOrderResponse,
+                                                           OptimizationPlanResponse,
+                                                           WhatIfRequest,
+                                                           ScenarioResultResponse,
+                                                           OptimizationCacheStatsResponse)
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from uuid import UUID
+from app.use_cases.repair_order_optimization.select_orders_by_profit import SelectRepairOrdersByProfitUseCase, encode_cursor
+from app.use_cases.repair_order_optimization.live_plan import shared_plan
+from app.use_cases.repair_order_optimization.result_cache import shared_result_cache
 from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
 from app.infrastructure.db.session import get_db
 from sqlalchemy.orm import Session
-from app.domain.exceptions import NoAvailableRepairOrdersException, InvalidRepairOrderDataException
+from app.domain.exceptions import (NoAvailableRepairOrdersException,
+                                   InvalidRepairOrderDataException,
+                                   InvalidOptimizationCursorException,
+                                   InvalidOptimizationScenarioException)
 
 router = APIRouter(prefix="/api/v1/repair_order_optimization", tags=["Repair Order Optimization"])
 
 def get_repair_order_use_case(db: Session = Depends(get_db)) -> SelectRepairOrdersByProfitUseCase:
     repair_order_repo = RepairOrderRepository(db)
     inventory_part_repo = InventoryPartRepository(db)
-    return SelectRepairOrdersByProfitUseCase(repair_order_repo, inventory_part_repo)
+    return SelectRepairOrdersByProfitUseCase(repair_order_repo, inventory_part_repo, shared_plan, shared_result_cache)
 
 @router.get("/list", response_model=list[OptimizedRepairOrderResponse])
 def get_optimized_orders(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    min_profit: Optional[float] = None,
+    customer_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    time_budget_ms: Optional[int] = Query(None, ge=1),
     use_case: SelectRepairOrdersByProfitUseCase = Depends(get_repair_order_use_case),
 ):
-    "Allows to get all optimized repair orders"
+    "Allows to get the optimized repair orders, optionally filtered and paginated with the X-Next-Cursor header"
     try:
-        return use_case.execute()
+        orders = use_case.execute(
+            limit=limit, min_profit=min_profit, customer_id=customer_id, cursor=cursor, time_budget_ms=time_budget_ms
+        )
+    except NoAvailableRepairOrdersException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except (InvalidRepairOrderDataException, InvalidOptimizationCursorException) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if limit is not None and len(orders) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(orders[-1])
+    return orders
+
+#--------------------------------------------------------------------------------------------
+
+@router.get("/plan", response_model=OptimizationPlanResponse)
+def get_optimization_plan(
+    limit: Optional[int] = Query(None, ge=1),
+    min_profit: Optional[float] = None,
+    customer_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    time_budget_ms: Optional[int] = Query(None, ge=1),
+    use_case: SelectRepairOrdersByProfitUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to get the optimized repair orders with the plan profit, its upper bound and optimality gap"
+    try:
+        return use_case.execute_with_report(
+            limit=limit, min_profit=min_profit, customer_id=customer_id, cursor=cursor, time_budget_ms=time_budget_ms
+        )
+    except NoAvailableRepairOrdersException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except (InvalidRepairOrderDataException, InvalidOptimizationCursorException) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+#--------------------------------------------------------------------------------------------
+
+@router.get("/stream")
+def stream_optimized_orders(
+    min_profit: Optional[float] = None,
+    customer_id: Optional[UUID] = None,
+    use_case: SelectRepairOrdersByProfitUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to stream all optimized repair orders as NDJSON, one order per line"
+    try:
+        orders = use_case.stream(min_profit=min_profit, customer_id=customer_id)
     except NoAvailableRepairOrdersException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except InvalidRepairOrderDataException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-        
\ No newline at end of file
+    return StreamingResponse((order.model_dump_json() + "\n" for order in orders), media_type="application/x-ndjson")
+
+#--------------------------------------------------------------------------------------------
+
+@router.post("/what_if", response_model=list[ScenarioResultResponse])
+def evaluate_what_if_scenarios(
+    request: WhatIfRequest,
+    use_case: SelectRepairOrdersByProfitUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to compare the optimized plan under stock and price scenarios without changing the inventory"
+    try:
+        return use_case.evaluate_scenarios(request)
+    except NoAvailableRepairOrdersException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except (InvalidRepairOrderDataException, InvalidOptimizationScenarioException) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+#--------------------------------------------------------------------------------------------
+
+@router.get("/cache_stats", response_model=OptimizationCacheStatsResponse)
+def get_optimization_cache_stats():
+    "Allows to get the hit, miss and eviction counters of the optimization result cache"
+    return OptimizationCacheStatsResponse(**vars(shared_result_cache.stats()))
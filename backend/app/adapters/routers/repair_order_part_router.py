@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.responses import JSONResponse
 from uuid import UUID
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.adapters.schemas.repair_order_part import (
     RepairOrderPartCreate,
@@ -12,7 +13,9 @@ from app.infrastructure.repositories.repair_order_part_repository import RepairO
 from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
 from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
-from app.domain.exceptions import RepairOrderPartValidationException, RepairOrderNotFoundException, InventoryPartNotFoundException
+from app.use_cases.repair_order_optimization.live_plan import shared_plan
+from app.use_cases.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.domain.exceptions import InvalidPageCursorException, RepairOrderPartValidationException, RepairOrderNotFoundException, InventoryPartNotFoundException
 
 router = APIRouter(prefix="/api/v1/repair_order_parts", tags=["Repair Order Parts"])
 
@@ -20,7 +23,7 @@ def get_repair_order_part_use_case(db: Session = Depends(get_db)) -> RepairOrder
     repository = RepairOrderPartRepository(db)
     repair_order_repository = RepairOrderRepository(db)
     part_repository = InventoryPartRepository(db)
-    return RepairOrderPartUseCase(repository, repair_order_repository, part_repository)
+    return RepairOrderPartUseCase(repository, repair_order_repository, part_repository, shared_plan)
 
 @router.post("/create", response_model=RepairOrderPartRead, status_code=status.HTTP_201_CREATED)
 def create_repair_order_part(
@@ -43,13 +46,23 @@ def create_repair_order_part(
 
 @router.get("/list", response_model=list[RepairOrderPartRead])
 def get_all_repair_order_parts(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    repair_order_id: Optional[UUID] = None,
+    is_active: Optional[bool] = None,
     use_case: RepairOrderPartUseCase = Depends(get_repair_order_part_use_case),
 ):
-    "Allows to get all repair order parts"
+    "Allows to get the repair order parts, one keyset page at a time (next page in the X-Next-Cursor header)"
     try:
-        return use_case.get_all_repair_order_parts()
+        items, next_cursor = use_case.get_repair_order_parts_page(limit, cursor, repair_order_id=repair_order_id, is_active=is_active)
+    except InvalidPageCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 #--------------------------------------------------------------------------------------------
 
@@ -1,23 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from datetime import datetime
 from uuid import UUID
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.adapters.schemas.repair_order import (
     RepairOrderCreate,
     RepairOrderUpdate,
     RepairOrderRead,
-    RepairOrderUpdateStatusRequest
+    RepairOrderUpdateStatusRequest,
+    RepairOrderTotalsRead
 )
 from app.adapters.schemas.inventory_part import PartDetailByInventoryPart
 from app.infrastructure.db.session import get_db
 from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
-from app.use_cases.repair_order_usecases import RepairOrderUseCase
+from app.use_cases.repair_order_usecases import RepairOrderUseCase, ExportFormat
 from app.infrastructure.repositories.vehicle_repository import VehicleRepository
 from app.infrastructure.repositories.customer_repository import CustomerRepository
-from app.domain.exceptions import RepairOrderValidationException, RepairOrderNotFoundException
+from app.use_cases.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.domain.exceptions import (InvalidPageCursorException, RepairOrderValidationException, RepairOrderNotFoundException,
+                                   InventoryPartNotFoundException, InventoryPartValidationException)
+from app.domain.enums import RepairOrderStatus
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
 from app.infrastructure.repositories.repair_order_part_repository import RepairOrderPartRepository
 from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
+from app.use_cases.repair_order_optimization.live_plan import shared_plan
 
 router = APIRouter(prefix="/api/v1/repair_orders", tags=["Repair Orders"])
 
@@ -27,7 +34,7 @@ def get_repair_order_use_case(db: Session = Depends(get_db)) -> RepairOrderUseCa
     repository = RepairOrderRepository(db)
     repair_order_part_repo = RepairOrderPartRepository(db)
     part_repo = InventoryPartRepository(db)
-    repair_order_part_usecase = RepairOrderPartUseCase(repair_order_part_repo, repository, part_repo)
+    repair_order_part_usecase = RepairOrderPartUseCase(repair_order_part_repo, repository, part_repo, shared_plan)
     return RepairOrderUseCase(repository, vehicle_repo, customer_repo, part_repo, repair_order_part_usecase, repair_order_part_repo)
 
 @router.post("/create", response_model=RepairOrderRead, status_code=status.HTTP_201_CREATED)
@@ -49,11 +56,56 @@ def create_repair_order(
 
 @router.get("/list", response_model=list[RepairOrderRead])
 def get_all_repair_orders(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[RepairOrderStatus] = Query(None, alias="status"),
+    is_active: Optional[bool] = None,
     use_case: RepairOrderUseCase = Depends(get_repair_order_use_case),
 ):
-    "Allows to get all repair orders"
+    "Allows to get the repair orders, one keyset page at a time (next page in the X-Next-Cursor header)"
     try:
-        return use_case.get_all_repair_orders()
+        items, next_cursor = use_case.get_repair_orders_page(limit, cursor, status=status_filter, is_active=is_active)
+    except InvalidPageCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+#--------------------------------------------------------------------------------------------
+
+@router.get("/export")
+def export_repair_orders(
+    export_format: ExportFormat = Query("csv", alias="format"),
+    status_filter: Optional[RepairOrderStatus] = Query(None, alias="status"),
+    is_active: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    use_case: RepairOrderUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to download the repair orders with their customer, vehicle and totals as streamed CSV or NDJSON"
+    try:
+        chunks = use_case.export_repair_orders(
+            export_format, status=status_filter, is_active=is_active, date_from=date_from, date_to=date_to
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="repair_orders.{export_format}"'}
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+#--------------------------------------------------------------------------------------------
+
+@router.get("/most-profitable", response_model=list[RepairOrderRead])
+def get_most_profitable_pending_orders(
+    limit: int = Query(20, ge=1, le=500),
+    use_case: RepairOrderUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to get the pending repair orders with the highest expected profit"
+    try:
+        return use_case.get_most_profitable_pending_orders(limit)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -88,6 +140,10 @@ def update_repair_order(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except RepairOrderValidationException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except InventoryPartNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except InventoryPartValidationException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)) 
     return updated
@@ -126,6 +182,21 @@ def get_parts_used_in_order(
 
 #--------------------------------------------------------------------------------------------
 
+@router.get("/{repair_order_id}/totals", response_model=RepairOrderTotalsRead)
+def get_repair_order_totals(
+    repair_order_id: UUID,
+    use_case: RepairOrderUseCase = Depends(get_repair_order_use_case),
+):
+    "Allows to get the parts total, parts profit and expected profit of a repair order"
+    try:
+        return use_case.get_repair_order_totals(repair_order_id)
+    except RepairOrderNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
 @router.patch("/update-status/{repair_order_id}", status_code=status.HTTP_200_OK, response_model=RepairOrderRead)
 def update_repair_order_status(
     repair_order_id: UUID,
@@ -1,33 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.responses import JSONResponse
 from uuid import UUID
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.adapters.schemas.vehicle import (
     VehicleCreate,
+    VehicleBulkCreate,
     VehicleUpdate,
     VehicleRead,
 )
-from app.infrastructure.db.session import get_db
-from app.infrastructure.repositories.vehicle_repository import VehicleRepository
+from app.adapters.schemas.bulk import BulkCreateResponse
+from app.infrastructure.db.session import get_async_db
+from app.infrastructure.repositories.vehicle_repository import AsyncVehicleRepository
 from app.use_cases.vehicle_usecases import VehicleUseCase
-from app.domain.exceptions import VehicleDuplicateException, VehicleValidationException, VehicleNotFoundException, CustomerNotFoundException
-from app.infrastructure.repositories.customer_repository import CustomerRepository
+from app.use_cases.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.domain.exceptions import InvalidPageCursorException, VehicleDuplicateException, VehicleValidationException, VehicleNotFoundException, CustomerNotFoundException
+from app.infrastructure.repositories.customer_repository import AsyncCustomerRepository
 
 router = APIRouter(prefix="/api/v1/vehicles", tags=["Vehicles"])
 
-def get_vehicle_use_case(db: Session = Depends(get_db)) -> VehicleUseCase:
-    repository = VehicleRepository(db)
-    customer_repo = CustomerRepository(db)
+def get_vehicle_use_case(db: AsyncSession = Depends(get_async_db)) -> VehicleUseCase:
+    repository = AsyncVehicleRepository(db)
+    customer_repo = AsyncCustomerRepository(db)
     return VehicleUseCase(repository, customer_repo)
 
 @router.post("/create", response_model=VehicleRead, status_code=status.HTTP_201_CREATED)
-def create_vehicle(
+async def create_vehicle(
     vehicle_data: VehicleCreate,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
     "Allows to create a new vehicle"
     try:
-        return use_case.create_vehicle(vehicle_data)
+        return await use_case.create_vehicle(vehicle_data)
     except VehicleDuplicateException as e:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except VehicleValidationException as e:
@@ -39,26 +43,48 @@ def create_vehicle(
 
 #--------------------------------------------------------------------------------------------
 
+@router.post("/bulk-create", response_model=BulkCreateResponse)
+async def bulk_create_vehicles(
+    payload: VehicleBulkCreate,
+    use_case: VehicleUseCase = Depends(get_vehicle_use_case),
+):
+    "Allows to create many vehicles at once; rejected rows are reported by index and the rest are created"
+    try:
+        return await use_case.create_vehicles(payload.items)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+
+#--------------------------------------------------------------------------------------------
+
 @router.get("/list", response_model=list[VehicleRead])
-def get_all_vehicles(
+async def get_all_vehicles(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
-    "Allows to get all vehicles"
+    "Allows to get the vehicles, one keyset page at a time (next page in the X-Next-Cursor header)"
     try:
-        return use_case.get_all_vehicles()
+        items, next_cursor = await use_case.get_vehicles_page(limit, cursor, is_active=is_active)
+    except InvalidPageCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal server error")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 #--------------------------------------------------------------------------------------------
 
 @router.get("/detail/{vehicle_id}", response_model=VehicleRead)
-def get_vehicle_by_id(
+async def get_vehicle_by_id(
     vehicle_id: UUID,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
     "Allows to get a vehicle by id"
     try:
-        vehicle = use_case.get_vehicle_by_id(vehicle_id)
+        vehicle = await use_case.get_vehicle_by_id(vehicle_id)
     except VehicleNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -68,14 +94,14 @@ def get_vehicle_by_id(
 #--------------------------------------------------------------------------------------------
 
 @router.put("/update/{vehicle_id}", response_model=VehicleRead)
-def update_vehicle(
+async def update_vehicle(
     vehicle_id: UUID,
     vehicle_data: VehicleUpdate,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
     "Allows to update a vehicle by id"
     try:
-        updated = use_case.update_vehicle(vehicle_id, vehicle_data)
+        updated = await use_case.update_vehicle(vehicle_id, vehicle_data)
     except VehicleNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except VehicleDuplicateException as e:
@@ -91,13 +117,13 @@ def update_vehicle(
 #--------------------------------------------------------------------------------------------
 
 @router.patch("/disable/{vehicle_id}", status_code=status.HTTP_200_OK)
-def disable_vehicle(
+async def disable_vehicle(
     vehicle_id: UUID,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
     "Allows to disable (soft delete) a vehicle by id"
     try:
-        use_case.disable_vehicle(vehicle_id)
+        await use_case.disable_vehicle(vehicle_id)
     except VehicleNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -107,13 +133,13 @@ def disable_vehicle(
 #--------------------------------------------------------------------------------------------
 
 @router.get("/customer/{customer_id}", response_model=list[VehicleRead])
-def get_vehicles_by_customer_id(
+async def get_vehicles_by_customer_id(
     customer_id: UUID,
     use_case: VehicleUseCase = Depends(get_vehicle_use_case),
 ):
     "Allows to get all vehicles by customer id"
     try:
-        return use_case.get_vehicles_by_customer_id(customer_id)
+        return await use_case.get_vehicles_by_customer_id(customer_id)
     except CustomerNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
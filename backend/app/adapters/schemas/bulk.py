@@ -0,0 +1,15 @@
+from uuid import UUID
+from app.adapters.schemas.base import BaseSchema
+
+# Rows accepted by one bulk create request.
+MAX_BULK_ITEMS = 1000
+
+class BulkCreateRowError(BaseSchema):
+    # Position of the row in the request items.
+    index: int
+    detail: str
+
+class BulkCreateResponse(BaseSchema):
+    created: int
+    ids: list[UUID]
+    errors: list[BulkCreateRowError]
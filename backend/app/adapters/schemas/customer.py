@@ -1,8 +1,9 @@
 from typing import Optional
 from uuid import UUID
 from app.adapters.schemas.base import BaseSchema
+from app.adapters.schemas.bulk import MAX_BULK_ITEMS
 from pydantic.networks import EmailStr
-from pydantic import constr
+from pydantic import conlist, constr
 
 class CustomerBase(BaseSchema):
     name: constr(min_length=2, max_length=100, strip_whitespace=True)
@@ -13,6 +14,9 @@ class CustomerBase(BaseSchema):
 class CustomerCreate(CustomerBase):
     pass
 
+class CustomerBulkCreate(BaseSchema):
+    items: conlist(CustomerCreate, min_length=1, max_length=MAX_BULK_ITEMS)
+
 class CustomerUpdate(CustomerBase):
     pass
 
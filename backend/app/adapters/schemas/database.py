@@ -0,0 +1,17 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class PoolStatsResponse(BaseModel):
+    pool_class: str
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    wait_ms_total: float
+    wait_ms_max: float
+    timeouts: int
+
+class DatabasePoolStatsResponse(BaseModel):
+    sync_pool: PoolStatsResponse
+    async_pool: PoolStatsResponse
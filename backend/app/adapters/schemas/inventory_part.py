@@ -1,6 +1,8 @@
 from uuid import UUID
 from typing import Optional
 from app.adapters.schemas.base import BaseSchema
+from app.adapters.schemas.bulk import MAX_BULK_ITEMS
+from pydantic import conlist
 
 class InventoryPartBase(BaseSchema):
     name: str
@@ -12,12 +14,40 @@ class InventoryPartBase(BaseSchema):
 class InventoryPartCreate(InventoryPartBase):
     pass
 
+class InventoryPartBulkCreate(BaseSchema):
+    items: conlist(InventoryPartCreate, min_length=1, max_length=MAX_BULK_ITEMS)
+
 class InventoryPartUpdate(InventoryPartBase):
     pass
 
 class InventoryPartRead(InventoryPartBase):
     id: UUID
 
+class InventoryPartPriceChange(BaseSchema):
+    id: UUID
+    cost: Optional[float] = None
+    final_price: Optional[float] = None
+
+class InventoryPartPriceListRequest(BaseSchema):
+    items: list[InventoryPartPriceChange]
+
+class InventoryPartPriceListResponse(BaseSchema):
+    updated_parts: int
+    refreshed_orders: int
+
+class InventoryPartImportError(BaseSchema):
+    line: int
+    detail: str
+
+class InventoryPartImportResponse(BaseSchema):
+    inserted: int
+    updated: int
+    # Rows replaced by a later line of the file with the same name.
+    duplicates: int
+    rejected: int
+    refreshed_orders: int
+    errors: list[InventoryPartImportError]
+
 class PartDetailByInventoryPart(BaseSchema):
     id: UUID
     name: str
@@ -23,9 +23,35 @@ class RepairOrderUpdate(RepairOrderBase):
 
 class RepairOrderRead(RepairOrderBase):
     id: UUID
+    parts_total: float
+    expected_profit: float
     vehicle: VehicleSimpleResponse
     customer: CustomerSimpleResponse
     date_in: datetime
 
+class RepairOrderTotalsRead(BaseSchema):
+    repair_order_id: UUID
+    labor_cost: float
+    parts_total: float
+    parts_profit: float
+    total_cost_repair: float
+    expected_profit: float
+
+class RepairOrderExportRow(BaseSchema):
+    id: UUID
+    status: RepairOrderStatus
+    is_active: bool
+    date_in: datetime
+    date_expected_out: Optional[datetime]
+    date_out: Optional[datetime]
+    customer_id: UUID
+    customer_name: str
+    vehicle_id: UUID
+    license_plate: str
+    labor_cost: float
+    parts_total: float
+    total_cost_repair: float
+    expected_profit: float
+
 class RepairOrderUpdateStatusRequest(BaseSchema):
     status: RepairOrderStatus
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 from uuid import UUID
 from app.adapters.schemas.customer import CustomerSimpleResponse
 from app.adapters.schemas.vehicle import VehicleSimpleResponse
@@ -9,3 +10,43 @@ class OptimizedRepairOrderResponse(BaseModel):
     vehicle: VehicleSimpleResponse
     total_cost_repair: float
     expected_profit: float
+
+class OptimizationPlanResponse(BaseModel):
+    orders: list[OptimizedRepairOrderResponse]
+    total_profit: float
+    upper_bound: float
+    optimality_gap: float
+    search_completed: bool
+
+class PartDeltaRequest(BaseModel):
+    part_id: UUID
+    stock_delta: int = 0
+    final_price_change_pct: float = 0.0
+    cost_change_pct: float = 0.0
+
+class ScenarioRequest(BaseModel):
+    name: Optional[str] = None
+    changes: list[PartDeltaRequest] = []
+
+class WhatIfRequest(BaseModel):
+    scenarios: list[ScenarioRequest] = Field(min_length=1, max_length=50)
+    time_budget_ms: Optional[int] = Field(None, ge=1)
+
+class ScenarioOrderResponse(BaseModel):
+    repair_order_id: UUID
+    total_cost_repair: float
+    expected_profit: float
+
+class ScenarioResultResponse(BaseModel):
+    name: Optional[str]
+    total_profit: float
+    upper_bound: float
+    search_completed: bool
+    orders: list[ScenarioOrderResponse]
+
+class OptimizationCacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_entries: int
@@ -1,5 +1,7 @@
 from uuid import UUID
 from app.adapters.schemas.base import BaseSchema
+from app.adapters.schemas.bulk import MAX_BULK_ITEMS
+from pydantic import conlist
 from app.adapters.schemas.customer import CustomerSimpleResponse
 
 class VehicleBase(BaseSchema):
@@ -12,6 +14,9 @@ class VehicleBase(BaseSchema):
 class VehicleCreate(VehicleBase):
     customer_id: UUID
 
+class VehicleBulkCreate(BaseSchema):
+    items: conlist(VehicleCreate, min_length=1, max_length=MAX_BULK_ITEMS)
+
 class VehicleUpdate(VehicleBase):
     customer_id: UUID
 
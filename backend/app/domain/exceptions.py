@@ -97,6 +97,21 @@ class InvalidRepairOrderDataException(RepairOrderOptimizationException):
         super().__init__(f"Repair order '{repair_order_id}' has invalid data: {reason}")
 
 
+class InvalidOptimizationCursorException(RepairOrderOptimizationException):
+    def __init__(self, cursor: str):
+        super().__init__(f"Invalid optimization cursor: '{cursor}'")
+
+
+class InvalidOptimizationScenarioException(RepairOrderOptimizationException):
+    def __init__(self, scenario: str, reason: str):
+        super().__init__(f"Scenario '{scenario}' is invalid: {reason}")
+
+
 class OptimizationAlgorithmException(RepairOrderOptimizationException):
     def __init__(self, message: str = "Unexpected error occurred during optimization process."):
         super().__init__(message)
+
+
+class InvalidPageCursorException(Exception):
+    def __init__(self, cursor: str):
+        super().__init__(f"Invalid page cursor: '{cursor}'")
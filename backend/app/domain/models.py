@@ -48,6 +48,8 @@ class RepairOrder:
     date_out: Optional[datetime]
     total_cost_repair: Optional[float]
     is_active: bool
+    parts_total: float = 0.0
+    expected_profit: float = 0.0
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -0,0 +1,53 @@
+"""Add materialized parts_total and expected_profit to repair_orders
+
+Revision ID: 3f8b2c7d91e4
+Revises: 6d225a4deb97
+Create Date: 2026-10-18 10:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8b2c7d91e4'
+down_revision: Union[str, None] = '6d225a4deb97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('repair_orders', sa.Column('parts_total', sa.Float(), nullable=False, server_default='0.0'))
+    op.add_column('repair_orders', sa.Column('expected_profit', sa.Float(), nullable=False, server_default='0.0'))
+    op.alter_column("repair_orders", "parts_total", server_default=None)
+    op.alter_column("repair_orders", "expected_profit", server_default=None)
+    # Backfill from the active lines, the same sums RepairOrderRepository.refresh_totals keeps up to date.
+    op.execute("""
+        UPDATE repair_orders SET
+            parts_total = COALESCE(totals.parts_total, 0),
+            expected_profit = repair_orders.labor_cost + COALESCE(totals.parts_profit, 0)
+        FROM (
+            SELECT rop.repair_order_id,
+                   SUM(ip.final_price * rop.quantity) AS parts_total,
+                   SUM((ip.final_price - ip.cost) * rop.quantity) AS parts_profit
+            FROM repair_order_parts rop
+            JOIN inventory_parts ip ON ip.id = rop.part_id
+            WHERE rop.is_active
+            GROUP BY rop.repair_order_id
+        ) AS totals
+        WHERE totals.repair_order_id = repair_orders.id
+    """)
+    op.execute("UPDATE repair_orders SET expected_profit = labor_cost WHERE id NOT IN (SELECT repair_order_id FROM repair_order_parts WHERE is_active)")
+    op.create_index(
+        'ix_repair_orders_status_is_active_expected_profit',
+        'repair_orders',
+        ['status', 'is_active', sa.text('expected_profit DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_repair_orders_status_is_active_expected_profit', table_name='repair_orders')
+    op.drop_column('repair_orders', 'expected_profit')
+    op.drop_column('repair_orders', 'parts_total')
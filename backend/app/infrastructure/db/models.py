@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, Float, Enum, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, String, Integer, Float, Enum, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, declarative_base
 from app.domain.enums import RepairOrderStatus
@@ -56,6 +56,10 @@ class RepairOrder(Base):
     date_expected_out = Column(DateTime, nullable=True)
     date_out = Column(DateTime, nullable=True)
     total_cost_repair = Column(Float, nullable=False, default=0)
+    # Kept in sync by RepairOrderRepository.refresh_totals on every write to the
+    # order, its lines or the prices of its parts.
+    parts_total = Column(Float, nullable=False, default=0)
+    expected_profit = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     is_active = Column(Boolean, nullable=False, default=True)
@@ -64,6 +68,10 @@ class RepairOrder(Base):
     customer = relationship("Customer", back_populates="repair_orders", lazy="select")
     parts = relationship("RepairOrderPart", back_populates="repair_order", lazy="select")
 
+    __table_args__ = (
+        Index("ix_repair_orders_status_is_active_expected_profit", status, is_active, expected_profit.desc()),
+    )
+
 class RepairOrderPart(Base):
     __tablename__ = "repair_order_parts"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -0,0 +1,140 @@
+"""
+Connection pool settings read from the environment, and pools that record
+how long checkouts take.
+
+    DB_POOL_SIZE        connections kept open per engine (default 5)
+    DB_MAX_OVERFLOW     extra connections allowed under load (default 10)
+    DB_POOL_TIMEOUT     seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE     seconds before a connection is replaced, -1 to never (default 1800)
+    DB_POOL_PRE_PING    test connections on checkout (default true)
+    DB_PGBOUNCER        PgBouncer transaction pooling: no prepared statements (default false)
+
+Each uvicorn worker opens two engines (sync and async), so a deployment
+needs workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections at most.
+"""
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PoolStats:
+    pool_class: str
+    # None when the pool does not keep a fixed set of connections (SQLite).
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    checkouts: int
+    wait_ms_total: float
+    wait_ms_max: float
+    timeouts: int
+
+
+class _CheckoutStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+class _InstrumentedPool:
+    "Times every checkout, including opening a new connection, and counts pool timeouts"
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = _CheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.checkout_stats.record_timeout()
+            raise
+        self.checkout_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # Called when the pool is invalidated; keep counting on the same stats.
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    "Keyword arguments for create_engine / create_async_engine on the given database"
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # SQLAlchemy picks the pool for SQLite; only the sync driver needs the thread check off.
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_float("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+    if backend == "postgresql" and is_async and _env_bool("DB_PGBOUNCER", False):
+        # A transaction pooler hands each transaction to any server connection,
+        # where prepared statements of another client do not exist. psycopg2
+        # does not prepare statements, so only asyncpg needs this.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
+
+
+def pool_stats(pool: Pool) -> PoolStats:
+    checkout = getattr(pool, "checkout_stats", None) or _CheckoutStats()
+    queued = isinstance(pool, QueuePool)
+    return PoolStats(
+        pool_class=type(pool).__name__,
+        size=pool.size() if queued else None,
+        checked_in=pool.checkedin() if queued else None,
+        checked_out=pool.checkedout() if queued else None,
+        overflow=pool.overflow() if queued else None,
+        checkouts=checkout.checkouts,
+        wait_ms_total=round(1000 * checkout.wait_total, 3),
+        wait_ms_max=round(1000 * checkout.wait_max, 3),
+        timeouts=checkout.timeouts,
+    )
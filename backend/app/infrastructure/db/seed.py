@@ -160,6 +160,7 @@ def seed_database():
                 repair_order_part = RepairOrderPartORM(
                     **repair_order_part_data)
                 repair_order_part_repo.add(repair_order_part)
+                repair_order_repo.refresh_totals([repair_order.id])
 
     session.commit()
     session.close()
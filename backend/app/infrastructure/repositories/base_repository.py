@@ -1,9 +1,96 @@
-from typing import TypeVar, Generic, Type, Optional
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from threading import Lock
+from typing import Iterable, TypeVar, Generic, Type, Optional
+from uuid import UUID
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
 T = TypeVar("T")
 
+# Writes committed through the repositories of this process, per table. Readers
+# use them as cheap version stamps for data derived from those tables.
+_change_counters: dict[str, int] = defaultdict(int)
+_change_lock = Lock()
+# Session.info key of the open unit of work: the models written inside it,
+# whose counters are bumped once it commits.
+_UNIT_OF_WORK = "unit_of_work"
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    # Id of the last item when more rows follow; pass it as `after` for the next page.
+    next_after: Optional[UUID]
+
+def keyset_page_select(stmt, model, limit: int, after: Optional[UUID], filters: dict):
+    """
+    Narrows `stmt` to one keyset page in id order: rows after the `after` id
+    that match the non-None equality filters. It reads limit + 1 rows so the
+    caller knows whether another page follows. Each page is an index range
+    scan on the primary key, however deep it is.
+    """
+    for column, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(getattr(model, column) == value)
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    return stmt.order_by(model.id).limit(limit + 1)
+
+def to_page(rows: list, limit: int) -> Page:
+    if len(rows) > limit:
+        return Page(items=rows[:limit], next_after=rows[limit - 1].id)
+    return Page(items=rows, next_after=None)
+
+def get_change_counter(model) -> int:
+    return _change_counters[model.__tablename__]
+
+def mark_changed(model) -> None:
+    with _change_lock:
+        _change_counters[model.__tablename__] += 1
+
+@contextmanager
+def unit_of_work(db: Session):
+    """
+    Groups the writes of every repository on `db` into one transaction: inside
+    the block they only flush, and it commits once at the end or rolls back on
+    error. Change counters are bumped after that commit. A nested block joins
+    the outer one.
+    """
+    if _UNIT_OF_WORK in db.info:
+        yield
+        return
+    changed = db.info[_UNIT_OF_WORK] = set()
+    try:
+        yield
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        del db.info[_UNIT_OF_WORK]
+    for model in changed:
+        mark_changed(model)
+
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession):
+    if _UNIT_OF_WORK in db.info:
+        yield
+        return
+    changed = db.info[_UNIT_OF_WORK] = set()
+    try:
+        yield
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        del db.info[_UNIT_OF_WORK]
+    for model in changed:
+        mark_changed(model)
+
 class BaseRepository(Generic[T]):
     def __init__(self, db_session: Session, model: Type[T]):
         self.db = db_session
@@ -17,10 +104,67 @@ class BaseRepository(Generic[T]):
     def get_all(self) -> list[T]:
         return self.db.query(self.model).all()
 
-    def add(self, obj: T) -> T:
+    def get_page(self, limit: int, after: Optional[UUID] = None, **filters) -> Page[T]:
+        stmt = keyset_page_select(self._page_select(), self.model, limit, after, filters)
+        return to_page(self.db.execute(stmt).scalars().all(), limit)
+
+    def _page_select(self):
+        "Base statement of get_page; override to eager load what the list response serializes"
+        return select(self.model)
+
+    def change_counter(self) -> int:
+        return get_change_counter(self.model)
+
+    def _mark_changed(self) -> None:
+        mark_changed(self.model)
+
+    def unit_of_work(self):
+        "Opens a unit of work on this repository's session, shared by every repository on it"
+        return unit_of_work(self.db)
+
+    def in_unit_of_work(self) -> bool:
+        return _UNIT_OF_WORK in self.db.info
+
+    def release(self) -> None:
+        "Ends the read transaction so the connection goes back to the pool; for generators that outlive the request"
+        self.db.rollback()
+
+    def _commit(self, *also_changed) -> None:
+        "Commits the writes and bumps the counters of their tables, or only flushes inside a unit of work"
+        changed = self.db.info.get(_UNIT_OF_WORK)
+        if changed is None:
+            self.db.commit()
+            for model in (self.model, *also_changed):
+                mark_changed(model)
+        else:
+            self.db.flush()
+            changed.update((self.model, *also_changed))
+
+    def get_existing_values(self, column: str, values: Iterable) -> set:
+        "Which of the values are already stored in the column, checked with one IN query"
+        values = {value for value in values if value is not None}
+        if not values:
+            return set()
+        field = getattr(self.model, column)
+        return set(self.db.execute(select(field).where(field.in_(values))).scalars())
+
+    def add_many(self, objs: list) -> None:
+        "Inserts the domain objects as one executemany in a single transaction; nothing is read back"
+        if not objs:
+            return
+        self.db.execute(insert(self.model), [asdict(obj) for obj in objs])
+        self._commit()
+
+    def add(self, obj: T, refresh: bool = True) -> T:
+        """
+        Stores the object. Outside a unit of work it is reloaded after the
+        commit unless `refresh` is False; inside one the flushed object already
+        holds its values, as every column default is set on the Python side.
+        """
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        self._commit()
+        if refresh and not self.in_unit_of_work():
+            self.db.refresh(obj)
         return obj
 
     def disable(self, id: str) -> bool:
@@ -28,16 +172,101 @@ class BaseRepository(Generic[T]):
         if not obj:
             return False
         setattr(obj, "is_active", False)
-        self.db.commit()
+        self._commit()
         return True
 
-    def update(self, id: str, updated_data: dict) -> Optional[T]:
+    def update(self, id: str, updated_data: dict, refresh: bool = True) -> Optional[T]:
         obj = self.get_by_id(id)
         if not obj:
             return None
         for key, value in updated_data.items():
             setattr(obj, key, value)
-        self.db.commit()
-        self.db.refresh(obj)
+        self._commit()
+        if refresh and not self.in_unit_of_work():
+            self.db.refresh(obj)
+        return obj
+
+
+class AsyncBaseRepository(Generic[T]):
+    "BaseRepository on an AsyncSession; its writes bump the same change counters"
+    def __init__(self, db_session: AsyncSession, model: Type[T]):
+        self.db = db_session
+        self.model = model
+
+    async def get_by_id(self, id: str) -> Optional[T]:
+        result = await self.db.execute(select(self.model).where(self.model.id == id).limit(1))
+        return result.scalars().first()
+
+    async def get_all(self) -> list[T]:
+        result = await self.db.execute(select(self.model))
+        return list(result.scalars())
+
+    async def get_page(self, limit: int, after: Optional[UUID] = None, **filters) -> Page[T]:
+        stmt = keyset_page_select(self._page_select(), self.model, limit, after, filters)
+        result = await self.db.execute(stmt)
+        return to_page(list(result.scalars()), limit)
+
+    def _page_select(self):
+        return select(self.model)
+
+    def change_counter(self) -> int:
+        return get_change_counter(self.model)
+
+    def _mark_changed(self) -> None:
+        mark_changed(self.model)
+
+    def unit_of_work(self):
+        return async_unit_of_work(self.db)
+
+    def in_unit_of_work(self) -> bool:
+        return _UNIT_OF_WORK in self.db.info
+
+    async def _commit(self, *also_changed) -> None:
+        changed = self.db.info.get(_UNIT_OF_WORK)
+        if changed is None:
+            await self.db.commit()
+            for model in (self.model, *also_changed):
+                mark_changed(model)
+        else:
+            await self.db.flush()
+            changed.update((self.model, *also_changed))
+
+    async def get_existing_values(self, column: str, values: Iterable) -> set:
+        values = {value for value in values if value is not None}
+        if not values:
+            return set()
+        field = getattr(self.model, column)
+        result = await self.db.execute(select(field).where(field.in_(values)))
+        return set(result.scalars())
+
+    async def add_many(self, objs: list) -> None:
+        if not objs:
+            return
+        await self.db.execute(insert(self.model), [asdict(obj) for obj in objs])
+        await self._commit()
+
+    async def add(self, obj: T, refresh: bool = True) -> T:
+        self.db.add(obj)
+        await self._commit()
+        if refresh and not self.in_unit_of_work():
+            await self.db.refresh(obj)
+        return obj
+
+    async def disable(self, id: str) -> bool:
+        obj = await self.get_by_id(id)
+        if not obj:
+            return False
+        setattr(obj, "is_active", False)
+        await self._commit()
+        return True
+
+    async def update(self, id: str, updated_data: dict, refresh: bool = True) -> Optional[T]:
+        obj = await self.get_by_id(id)
+        if not obj:
+            return None
+        for key, value in updated_data.items():
+            setattr(obj, key, value)
+        await self._commit()
+        if refresh and not self.in_unit_of_work():
+            await self.db.refresh(obj)
         return obj
-        
\ No newline at end of file
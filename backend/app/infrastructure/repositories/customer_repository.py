@@ -1,8 +1,10 @@
 from app.infrastructure.db.models import Customer as CustomerORM
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
 from app.domain.models import Customer
-from app.infrastructure.repositories.base_repository import BaseRepository
+from app.infrastructure.repositories.base_repository import AsyncBaseRepository, BaseRepository
 from typing import Optional
 
 class CustomerRepository(BaseRepository[CustomerORM]):
@@ -44,4 +46,31 @@ class CustomerRepository(BaseRepository[CustomerORM]):
         return self.db.query(CustomerORM).filter(CustomerORM.email == email).first()
 
     def get_by_phone(self, phone: str) -> Optional[CustomerORM]:
-        return self.db.query(CustomerORM).filter(CustomerORM.phone == phone).first()
\ No newline at end of file
+        return self.db.query(CustomerORM).filter(CustomerORM.phone == phone).first()
+
+
+class AsyncCustomerRepository(AsyncBaseRepository[CustomerORM]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, CustomerORM)
+
+    async def add(self, customer: Customer) -> CustomerORM:
+        return await super().add(CustomerORM(
+            id=customer.id,
+            name=customer.name,
+            email=customer.email,
+            phone=customer.phone,
+            address=customer.address,
+            is_active=customer.is_active,
+        ))
+
+    async def get_all(self) -> list[CustomerORM]:
+        result = await self.db.execute(select(self.model).where(self.model.is_active == True))
+        return list(result.scalars())
+
+    async def get_by_email(self, email: str) -> Optional[CustomerORM]:
+        result = await self.db.execute(select(CustomerORM).where(CustomerORM.email == email).limit(1))
+        return result.scalars().first()
+
+    async def get_by_phone(self, phone: str) -> Optional[CustomerORM]:
+        result = await self.db.execute(select(CustomerORM).where(CustomerORM.phone == phone).limit(1))
+        return result.scalars().first()
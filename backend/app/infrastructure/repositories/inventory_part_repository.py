@@ -1,9 +1,41 @@
+import csv
+import io
+from dataclasses import dataclass
 from app.infrastructure.db.models import InventoryPart as InventoryPartORM
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, String, Table, delete, exists, func, insert,
+                        select, true, update)
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Session
 from uuid import UUID
 from app.domain.models import InventoryPart
 from app.infrastructure.repositories.base_repository import BaseRepository
-from typing import Optional
+from typing import Iterable, Optional
+
+# Per-connection staging table of a catalog import. Each row carries the id it
+# gets if it is inserted and its line in the file, so the last line wins when a
+# name is repeated.
+catalog_staging = Table(
+    "inventory_part_import",
+    MetaData(),
+    Column("line", Integer, nullable=False),
+    Column("id", PGUUID(as_uuid=True), nullable=False),
+    Column("name", String, nullable=False),
+    Column("description", String, nullable=True),
+    Column("stock_quantity", Integer, nullable=False),
+    Column("cost", Float, nullable=False),
+    Column("final_price", Float, nullable=False),
+    Index("ix_inventory_part_import_name", "name"),
+    prefixes=["TEMPORARY"],
+)
+CATALOG_STAGING_COLUMNS = [column.name for column in catalog_staging.columns]
+
+
+@dataclass
+class CatalogImportResult:
+    inserted: int
+    updated_ids: list[UUID]
+    # Rows dropped because a later line of the file has the same name.
+    superseded: int
 
 
 class InventoryPartRepository(BaseRepository[InventoryPartORM]):
@@ -16,6 +48,17 @@ class InventoryPartRepository(BaseRepository[InventoryPartORM]):
     def get_by_id(self, id: UUID) -> Optional[InventoryPart]:
         return super().get_by_id(id)
 
+    def get_by_ids(self, ids: Iterable[UUID]) -> list[InventoryPart]:
+        return self.db.query(self.model).filter(self.model.id.in_(list(ids))).all()
+
+    def get_stock_and_prices(self) -> list[tuple[UUID, int, float, float]]:
+        "Returns (id, stock_quantity, cost, final_price) for every active part without hydrating ORM objects"
+        stmt = (
+            select(self.model.id, self.model.stock_quantity, self.model.cost, self.model.final_price)
+            .where(self.model.is_active == True)
+        )
+        return self.db.execute(stmt).all()
+
     def get_by_name(self, name: str) -> Optional[InventoryPart]:
         return self.db.query(self.model).filter(self.model.name == name).first()
 
@@ -40,6 +83,95 @@ class InventoryPartRepository(BaseRepository[InventoryPartORM]):
             is_active=db_obj.is_active,
         )
 
+    def move_stock(self, part_id: UUID, delta: int) -> Optional[int]:
+        """
+        Adds `delta` units (negative to take them) to the stock of a part with
+        one conditional UPDATE, so concurrent edits can neither oversell the
+        part nor overwrite each other. Returns the new stock, or None when the
+        part does not have -delta units left.
+        """
+        stmt = (
+            update(self.model)
+            .where(self.model.id == part_id, self.model.stock_quantity >= -delta)
+            .values(stock_quantity=self.model.stock_quantity + delta)
+            .returning(self.model.stock_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        stock = self.db.execute(stmt).scalar_one_or_none()
+        if stock is not None:
+            self._commit()
+        return stock
+
+    def update_prices(self, changes: list[dict]) -> None:
+        "Writes cost and final_price of many parts as one executemany; each change holds id, cost and final_price"
+        if not changes:
+            return
+        self.db.execute(update(self.model), changes)
+        self._commit()
+
+    def import_catalog(self, batches: Iterable[list[dict]]) -> CatalogImportResult:
+        """
+        Loads the batches into the staging table (COPY on PostgreSQL, one
+        executemany per batch elsewhere) and merges it into the catalog by name
+        with one UPDATE ... FROM and one INSERT ... SELECT, in one transaction.
+        Rows are dicts keyed by CATALOG_STAGING_COLUMNS.
+        """
+        connection = self.db.connection()
+        # SQLite runs DDL outside the transaction, so a failed import may leave it behind.
+        catalog_staging.drop(connection, checkfirst=True)
+        catalog_staging.create(connection)
+        for batch in batches:
+            self._stage(connection, batch)
+
+        newer = catalog_staging.alias("newer")
+        superseded = self.db.execute(
+            delete(catalog_staging).where(
+                catalog_staging.c.line < select(func.max(newer.c.line)).where(newer.c.name == catalog_staging.c.name).scalar_subquery()
+            )
+        ).rowcount
+
+        parts = self.model.__table__
+        updated_ids = list(self.db.execute(
+            update(parts)
+            .where(parts.c.name == catalog_staging.c.name)
+            .values(
+                description=catalog_staging.c.description,
+                stock_quantity=catalog_staging.c.stock_quantity,
+                cost=catalog_staging.c.cost,
+                final_price=catalog_staging.c.final_price,
+            )
+            .returning(parts.c.id)
+        ).scalars())
+        columns = ["id", "name", "description", "stock_quantity", "cost", "final_price"]
+        inserted = self.db.execute(
+            insert(parts).from_select(
+                columns + ["is_active"],
+                select(*[catalog_staging.c[name] for name in columns], true())
+                .where(~exists().where(parts.c.name == catalog_staging.c.name)),
+            )
+        ).rowcount
+
+        catalog_staging.drop(connection)
+        self._commit()
+        return CatalogImportResult(inserted=inserted, updated_ids=updated_ids, superseded=superseded)
+
+    def _stage(self, connection, batch: list[dict]) -> None:
+        if not batch:
+            return
+        if connection.dialect.driver != "psycopg2":
+            connection.execute(insert(catalog_staging), batch)
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([row[name] for name in CATALOG_STAGING_COLUMNS] for row in batch)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {catalog_staging.name} ({', '.join(CATALOG_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
     def update(self, id: UUID, updated_data: dict) -> Optional[InventoryPart]:
         return super().update(id, updated_data)
 
@@ -1,8 +1,10 @@
+from dataclasses import asdict
 from typing import Optional
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 from uuid import UUID
 from datetime import datetime
-from app.infrastructure.db.models import RepairOrderPart as RepairOrderPartORM
+from app.infrastructure.db.models import RepairOrderPart as RepairOrderPartORM, InventoryPart as InventoryPartORM
 from app.infrastructure.repositories.base_repository import BaseRepository
 from app.domain.models import RepairOrderPart
 
@@ -69,5 +71,49 @@ class RepairOrderPartRepository(BaseRepository[RepairOrderPartORM]):
             .all()
         )
 
+    def get_part_details_by_order_id(self, repair_order_id: UUID) -> list[tuple[UUID, str, Optional[str], float, float, int]]:
+        "Returns (id, name, description, cost, final_price, quantity_used) of the parts on the active lines of an order"
+        stmt = (
+            select(
+                InventoryPartORM.id,
+                InventoryPartORM.name,
+                InventoryPartORM.description,
+                InventoryPartORM.cost,
+                InventoryPartORM.final_price,
+                self.model.quantity.label("quantity_used"),
+            )
+            .join(InventoryPartORM, InventoryPartORM.id == self.model.part_id)
+            .where(self.model.repair_order_id == repair_order_id, self.model.is_active == True)
+        )
+        return self.db.execute(stmt).all()
+
+    def sync_order_lines(
+        self,
+        new_lines: list[RepairOrderPart],
+        quantities: dict[UUID, int],
+        disabled_ids: list[UUID],
+    ) -> None:
+        """
+        Applies the diff of an order's lines as one write: the new lines in one
+        executemany, the new quantities (by line id) in another and the removed
+        lines disabled by one UPDATE.
+        """
+        now = datetime.now()
+        if new_lines:
+            self.db.execute(insert(self.model), [asdict(line) for line in new_lines])
+        if quantities:
+            self.db.execute(
+                update(self.model),
+                [{"id": line_id, "quantity": quantity, "updated_at": now} for line_id, quantity in quantities.items()],
+            )
+        if disabled_ids:
+            self.db.execute(
+                update(self.model)
+                .where(self.model.id.in_(disabled_ids))
+                .values(is_active=False, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        self._commit()
+
     def delete(self, id: UUID) -> bool:
         return super().disable(id)
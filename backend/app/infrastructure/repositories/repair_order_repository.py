@@ -1,11 +1,22 @@
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import and_, func, literal, null, or_, select, union_all, update
 from sqlalchemy.orm import Session
 from uuid import UUID
 from datetime import datetime
-from app.infrastructure.db.models import RepairOrder as RepairOrderORM
-from app.infrastructure.repositories.base_repository import BaseRepository
+from app.infrastructure.db.models import (RepairOrder as RepairOrderORM,
+                                        RepairOrderPart as RepairOrderPartORM,
+                                        Customer as CustomerORM,
+                                        Vehicle as VehicleORM,
+                                        InventoryPart as InventoryPartORM)
+from app.domain.enums import RepairOrderStatus
+from app.infrastructure.repositories.base_repository import BaseRepository, get_change_counter
 from app.domain.models import RepairOrder
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import selectinload
+
+OPEN_STATUSES = (RepairOrderStatus.PENDING, RepairOrderStatus.IN_PROGRESS)
+
+_line_total = InventoryPartORM.final_price * RepairOrderPartORM.quantity
+_line_profit = (InventoryPartORM.final_price - InventoryPartORM.cost) * RepairOrderPartORM.quantity
 
 class RepairOrderRepository(BaseRepository[RepairOrderORM]):
     def __init__(self, db: Session):
@@ -17,6 +28,19 @@ class RepairOrderRepository(BaseRepository[RepairOrderORM]):
     def get_all(self) -> list[RepairOrderORM]:
         return super().get_all()
 
+    def _page_select(self):
+        return select(RepairOrderORM).options(
+            selectinload(RepairOrderORM.vehicle),
+            selectinload(RepairOrderORM.customer),
+        )
+
+    def change_counter(self) -> int:
+        "Also counts writes to the lines, customers and vehicles served with the orders"
+        return (super().change_counter()
+                + get_change_counter(RepairOrderPartORM)
+                + get_change_counter(CustomerORM)
+                + get_change_counter(VehicleORM))
+
     def add(self, repair_order: RepairOrderORM) -> RepairOrderORM:
         orm_repair_order = RepairOrderORM(
             id=repair_order.id,
@@ -29,6 +53,8 @@ class RepairOrderRepository(BaseRepository[RepairOrderORM]):
             date_expected_out=repair_order.date_expected_out,
             date_out=repair_order.date_out,
             total_cost_repair=0,
+            parts_total=0,
+            expected_profit=0,
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
@@ -44,6 +70,8 @@ class RepairOrderRepository(BaseRepository[RepairOrderORM]):
             date_expected_out=db_obj.date_expected_out,
             date_out=db_obj.date_out,
             total_cost_repair=db_obj.total_cost_repair,
+            parts_total=db_obj.parts_total,
+            expected_profit=db_obj.expected_profit,
             created_at=db_obj.created_at,
             updated_at=db_obj.updated_at,
         )
@@ -54,18 +82,263 @@ class RepairOrderRepository(BaseRepository[RepairOrderORM]):
     def get_by_vehicle_id(self, vehicle_id: UUID) -> list[RepairOrderORM]:
         return self.db.query(RepairOrderORM).filter(RepairOrderORM.vehicle_id == vehicle_id).all()
     
-    def get_all_pending_with_parts(self) -> list[RepairOrderORM]:
+    def get_order_totals(self, ids: Optional[Iterable[UUID]] = None) -> list[tuple[UUID, float, float, float]]:
+        """
+        Returns (order id, labor cost, parts total, parts profit) per order in one
+        grouped query over its active lines: parts total is sum(final_price * qty)
+        and parts profit sum((final_price - cost) * qty). Without ids, every
+        active pending order is returned.
+        """
+        stmt = (
+            select(
+                RepairOrderORM.id,
+                RepairOrderORM.labor_cost,
+                func.coalesce(func.sum(_line_total), 0.0).label("parts_total"),
+                func.coalesce(func.sum(_line_profit), 0.0).label("parts_profit"),
+            )
+            .outerjoin(
+                RepairOrderPartORM,
+                and_(RepairOrderPartORM.repair_order_id == RepairOrderORM.id, RepairOrderPartORM.is_active == True),
+            )
+            .outerjoin(InventoryPartORM, InventoryPartORM.id == RepairOrderPartORM.part_id)
+            .group_by(RepairOrderORM.id, RepairOrderORM.labor_cost)
+        )
+        if ids is None:
+            stmt = stmt.where(RepairOrderORM.status == RepairOrderStatus.PENDING, RepairOrderORM.is_active == True)
+        else:
+            stmt = stmt.where(RepairOrderORM.id.in_(list(ids)))
+        return self.db.execute(stmt).all()
+
+    def refresh_totals(self, ids: Iterable[UUID]) -> None:
+        """
+        Recomputes parts_total, expected_profit and total_cost_repair of the given
+        orders from their active lines and the current part prices, in a single
+        UPDATE with correlated sums.
+        """
+        ids = list(ids)
+        if ids:
+            self._refresh_totals_where(RepairOrderORM.id.in_(ids))
+
+    def refresh_open_totals_for_parts(self, part_ids: Iterable[UUID]) -> int:
+        """
+        Re-values every active pending or in-progress order with an active line
+        of any of the parts, after their price or cost changed, in one UPDATE.
+        Closed orders keep the totals they were closed with. Returns the number
+        of orders updated.
+        """
+        part_ids = list(part_ids)
+        if not part_ids:
+            return 0
+        using_parts = (
+            select(RepairOrderPartORM.repair_order_id)
+            .where(RepairOrderPartORM.part_id.in_(part_ids), RepairOrderPartORM.is_active == True)
+        )
+        return self._refresh_totals_where(
+            RepairOrderORM.id.in_(using_parts),
+            RepairOrderORM.status.in_(OPEN_STATUSES),
+            RepairOrderORM.is_active == True,
+        )
+
+    def _refresh_totals_where(self, *criteria) -> int:
+        parts_total = self._line_sum(_line_total)
+        stmt = (
+            update(RepairOrderORM)
+            .where(*criteria)
+            .values(
+                parts_total=parts_total,
+                total_cost_repair=RepairOrderORM.labor_cost + parts_total,
+                expected_profit=RepairOrderORM.labor_cost + self._line_sum(_line_profit),
+            )
+            # Loaded orders are expired by the commit (the one closing the unit of work, if open).
+            .execution_options(synchronize_session=False)
+        )
+        updated = self.db.execute(stmt).rowcount
+        self._commit()
+        return updated
+
+    def _line_sum(self, expression):
+        # Sum of `expression` over the active lines of the order being updated.
+        return (
+            select(func.coalesce(func.sum(expression), 0.0))
+            .select_from(RepairOrderPartORM)
+            .join(InventoryPartORM, InventoryPartORM.id == RepairOrderPartORM.part_id)
+            .where(RepairOrderPartORM.repair_order_id == RepairOrderORM.id, RepairOrderPartORM.is_active == True)
+            .scalar_subquery()
+        )
+
+    def get_most_profitable_pending(self, limit: int) -> list[RepairOrderORM]:
+        "Active pending orders by stored expected profit, served by the (status, is_active, expected_profit) index"
+        return (
+            self.db.query(RepairOrderORM)
+            .options(
+                selectinload(RepairOrderORM.vehicle),
+                selectinload(RepairOrderORM.customer),
+            )
+            .filter(RepairOrderORM.status == RepairOrderStatus.PENDING, RepairOrderORM.is_active == True)
+            .order_by(RepairOrderORM.expected_profit.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def stream_export_rows(
+        self,
+        batch_size: int,
+        status: Optional[RepairOrderStatus] = None,
+        is_active: Optional[bool] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> Iterator[tuple]:
+        """
+        Yields every matching order in id order with its customer, vehicle and
+        stored totals as flat rows, fetched `batch_size` at a time through a
+        server-side cursor, so memory stays flat however many orders there are.
+
+        The request's session is closed before a streamed response is sent, so
+        the rows are read in a transaction of their own that is ended once the
+        stream finishes or is abandoned.
+        """
+        stmt = (
+            select(
+                RepairOrderORM.id,
+                RepairOrderORM.status,
+                RepairOrderORM.is_active,
+                RepairOrderORM.date_in,
+                RepairOrderORM.date_expected_out,
+                RepairOrderORM.date_out,
+                RepairOrderORM.customer_id,
+                CustomerORM.name.label("customer_name"),
+                RepairOrderORM.vehicle_id,
+                VehicleORM.license_plate,
+                RepairOrderORM.labor_cost,
+                RepairOrderORM.parts_total,
+                RepairOrderORM.total_cost_repair,
+                RepairOrderORM.expected_profit,
+            )
+            .join(CustomerORM, CustomerORM.id == RepairOrderORM.customer_id)
+            .join(VehicleORM, VehicleORM.id == RepairOrderORM.vehicle_id)
+            .order_by(RepairOrderORM.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if status is not None:
+            stmt = stmt.where(RepairOrderORM.status == status)
+        if is_active is not None:
+            stmt = stmt.where(RepairOrderORM.is_active == is_active)
+        if date_from is not None:
+            stmt = stmt.where(RepairOrderORM.date_in >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(RepairOrderORM.date_in < date_to)
+
+        result = self.db.execute(stmt)
+        try:
+            for partition in result.partitions():
+                yield from partition
+        finally:
+            result.close()
+            self.db.rollback()
+
+    def get_pending_candidate_lines(
+        self,
+    ) -> tuple[list[tuple[UUID, UUID, float, UUID, int]], list[tuple[UUID, UUID, int]]]:
+        """
+        Returns, in one query, (order id, customer id, labor cost, part id,
+        quantity) for the active lines of pending orders that the current stock
+        could fulfill on its own, sorted by order, and (order id, part id,
+        quantity needed) for every part that keeps another pending order out:
+        more of it needed than is in stock, or inactive. The lines of those
+        orders are not loaded; see get_pending_lines().
+        """
+        needs = self._blocking_needs()
+        candidates = (
+            self._pending_lines_select()
+            .add_columns(literal(False).label("blocked"))
+            .where(RepairOrderORM.id.not_in(select(needs.c.repair_order_id)))
+        )
+        blocking = select(
+            needs.c.repair_order_id,
+            null(),
+            null(),
+            needs.c.part_id,
+            needs.c.quantity,
+            literal(True).label("blocked"),
+        )
+        backlog = union_all(candidates, blocking).subquery()
+        rows = self.db.execute(select(backlog).order_by(backlog.c.blocked, backlog.c.id)).all()
+        lines = [tuple(row[:5]) for row in rows if not row.blocked]
+        blocked = [(row[0], row[3], row[4]) for row in rows if row.blocked]
+        return lines, blocked
+
+    def get_pending_lines(self, ids: Iterable[UUID]) -> list[tuple[UUID, UUID, float, UUID, int]]:
+        "Returns the active lines of the given pending orders, shaped and sorted like the candidate lines"
+        ids = list(ids)
+        if not ids:
+            return []
+        return self.db.execute(
+            self._pending_lines_select().where(RepairOrderORM.id.in_(ids)).order_by(RepairOrderORM.id)
+        ).all()
+
+    def _pending_lines_select(self):
         return (
-        self.db.query(RepairOrderORM)
-        .join(RepairOrderORM.parts)
-        .filter(
-            RepairOrderORM.status == "pending",
-            RepairOrderORM.is_active == True
-        )
-        .options(joinedload(RepairOrderORM.parts))
-        .distinct()
-        .all()
-    )
+            select(
+                RepairOrderORM.id,
+                RepairOrderORM.customer_id,
+                RepairOrderORM.labor_cost,
+                RepairOrderPartORM.part_id,
+                RepairOrderPartORM.quantity,
+            )
+            .join(RepairOrderPartORM, RepairOrderPartORM.repair_order_id == RepairOrderORM.id)
+            .where(
+                RepairOrderORM.status == RepairOrderStatus.PENDING,
+                RepairOrderORM.is_active == True,
+                RepairOrderPartORM.is_active == True,
+            )
+        )
+
+    def _blocking_needs(self):
+        # Total quantity of each part a pending order needs, kept only where the
+        # part is inactive, missing or short of stock.
+        needs = (
+            select(
+                RepairOrderPartORM.repair_order_id,
+                RepairOrderPartORM.part_id,
+                func.sum(RepairOrderPartORM.quantity).label("quantity"),
+            )
+            .join(RepairOrderORM, RepairOrderORM.id == RepairOrderPartORM.repair_order_id)
+            .where(
+                RepairOrderORM.status == RepairOrderStatus.PENDING,
+                RepairOrderORM.is_active == True,
+                RepairOrderPartORM.is_active == True,
+            )
+            .group_by(RepairOrderPartORM.repair_order_id, RepairOrderPartORM.part_id)
+            .subquery()
+        )
+        return (
+            select(needs.c.repair_order_id, needs.c.part_id, needs.c.quantity)
+            .outerjoin(InventoryPartORM, and_(InventoryPartORM.id == needs.c.part_id, InventoryPartORM.is_active == True))
+            .where(or_(InventoryPartORM.id.is_(None), needs.c.quantity > InventoryPartORM.stock_quantity))
+            .cte("blocking_needs")
+        )
+
+    def get_customer_and_vehicle_summaries(self, ids: Iterable[UUID]) -> list[tuple[UUID, UUID, str, bool, UUID, str, bool]]:
+        """
+        Returns (order id, customer id, customer name, customer is_active,
+        vehicle id, license plate, vehicle is_active) for the given orders in a
+        single joined query, without loading the ORM objects.
+        """
+        stmt = (
+            select(
+                RepairOrderORM.id,
+                CustomerORM.id.label("customer_id"),
+                CustomerORM.name.label("customer_name"),
+                CustomerORM.is_active.label("customer_is_active"),
+                VehicleORM.id.label("vehicle_id"),
+                VehicleORM.license_plate,
+                VehicleORM.is_active.label("vehicle_is_active"),
+            )
+            .join(CustomerORM, CustomerORM.id == RepairOrderORM.customer_id)
+            .join(VehicleORM, VehicleORM.id == RepairOrderORM.vehicle_id)
+            .where(RepairOrderORM.id.in_(list(ids)))
+        )
+        return self.db.execute(stmt).all()
 
     def get_by_id_with_relations(self, id: UUID) -> Optional[RepairOrderORM]:
         return (
@@ -1,8 +1,10 @@
 from app.infrastructure.db.models import Vehicle as VehicleORM
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from uuid import UUID
 from app.domain.models import Vehicle
-from app.infrastructure.repositories.base_repository import BaseRepository
+from app.infrastructure.repositories.base_repository import AsyncBaseRepository, BaseRepository
 from typing import Optional
 
 class VehicleRepository(BaseRepository[VehicleORM]):
@@ -51,4 +53,52 @@ class VehicleRepository(BaseRepository[VehicleORM]):
 
     def get_vehicles_by_customer_id(self, customer_id: UUID) -> list[VehicleORM]:
         return self.db.query(VehicleORM).filter(VehicleORM.customer_id == customer_id).all()
-    
\ No newline at end of file
+
+
+class AsyncVehicleRepository(AsyncBaseRepository[VehicleORM]):
+    """
+    Vehicles are read with their customer loaded up front, since VehicleRead
+    serializes it and an AsyncSession cannot lazy load it later.
+    """
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, VehicleORM)
+
+    def _select(self):
+        return select(VehicleORM).options(selectinload(VehicleORM.customer)).execution_options(populate_existing=True)
+
+    def _page_select(self):
+        return self._select()
+
+    async def add(self, vehicle: Vehicle) -> VehicleORM:
+        await super().add(VehicleORM(
+            id=vehicle.id,
+            brand=vehicle.brand,
+            model=vehicle.model,
+            year=vehicle.year,
+            license_plate=vehicle.license_plate,
+            color=vehicle.color,
+            customer_id=vehicle.customer_id,
+            is_active=vehicle.is_active,
+        ))
+        return await self.get_by_id(vehicle.id)
+
+    async def get_by_id(self, vehicle_id: UUID) -> Optional[VehicleORM]:
+        result = await self.db.execute(self._select().where(VehicleORM.id == vehicle_id).limit(1))
+        return result.scalars().first()
+
+    async def get_all(self) -> list[VehicleORM]:
+        result = await self.db.execute(self._select().order_by(VehicleORM.is_active.desc()))
+        return list(result.scalars())
+
+    async def update(self, vehicle_id: UUID, updates: dict) -> Optional[VehicleORM]:
+        if await super().update(vehicle_id, updates) is None:
+            return None
+        return await self.get_by_id(vehicle_id)
+
+    async def get_by_license_plate(self, license_plate: str) -> Optional[VehicleORM]:
+        result = await self.db.execute(select(VehicleORM).where(VehicleORM.license_plate == license_plate).limit(1))
+        return result.scalars().first()
+
+    async def get_vehicles_by_customer_id(self, customer_id: UUID) -> list[VehicleORM]:
+        result = await self.db.execute(self._select().where(VehicleORM.customer_id == customer_id))
+        return list(result.scalars())
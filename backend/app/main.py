@@ -6,7 +6,8 @@ from app.adapters.routers import (customer_router,
                                     inventory_part_router, 
                                     repair_order_router, 
                                     repair_order_part_router, 
-                                    repair_order_optimization_router)
+                                    repair_order_optimization_router,
+                                    database_router)
 
 app = FastAPI(
     title="Autoparts Service API",
@@ -23,6 +24,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(customer_router.router)
@@ -31,6 +33,7 @@ app.include_router(inventory_part_router.router)
 app.include_router(repair_order_router.router)
 app.include_router(repair_order_part_router.router)
 app.include_router(repair_order_optimization_router.router)
+app.include_router(database_router.router)
 
 @app.get("/", include_in_schema=False)
 def redirect_to_docs():
@@ -0,0 +1,38 @@
+from typing import Optional
+from uuid import UUID
+from app.adapters.schemas.bulk import BulkCreateResponse, BulkCreateRowError
+
+
+class BulkCreateErrors:
+    """
+    Collects the rejected rows of a bulk create payload, keeping the first
+    reason found for each row, so the whole payload is checked at once.
+    """
+    def __init__(self):
+        self.by_row: dict[int, str] = {}
+
+    def add(self, index: int, detail: str) -> None:
+        self.by_row.setdefault(index, detail)
+
+    def check_unique(self, field: str, values: list[Optional[str]], existing: set, duplicate_exception) -> None:
+        "Rejects the values already stored and the repeats of an earlier row of the payload"
+        first_row: dict[str, int] = {}
+        for index, value in enumerate(values):
+            if value is None:
+                continue
+            if value in existing:
+                self.add(index, str(duplicate_exception(field, value)))
+            elif value in first_row:
+                self.add(index, f"{field} '{value}' is repeated from row {first_row[value]}.")
+            else:
+                first_row[value] = index
+
+    def accepted(self, count: int) -> list[int]:
+        return [index for index in range(count) if index not in self.by_row]
+
+    def response(self, ids: list[UUID]) -> BulkCreateResponse:
+        return BulkCreateResponse(
+            created=len(ids),
+            ids=ids,
+            errors=[BulkCreateRowError(index=index, detail=detail) for index, detail in sorted(self.by_row.items())],
+        )
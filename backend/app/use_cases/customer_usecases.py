@@ -5,18 +5,21 @@ from app.adapters.schemas.customer import (
     CustomerUpdate,
     CustomerRead
 )
-from app.infrastructure.repositories.customer_repository import CustomerRepository
+from app.adapters.schemas.bulk import BulkCreateResponse
+from app.infrastructure.repositories.customer_repository import AsyncCustomerRepository
 import uuid
+from app.use_cases.bulk_create import BulkCreateErrors
+from app.use_cases.pagination import decode_page_cursor, encode_page_cursor
 from app.domain.exceptions import CustomerDuplicateException, CustomerNotFoundException
 
 class CustomerUseCase:
-    def __init__(self, repository: CustomerRepository):
+    def __init__(self, repository: AsyncCustomerRepository):
         self.repository = repository
 
-    def create_customer(self, customer_data: CustomerCreate) -> CustomerRead:
-        if customer_data.email and self.repository.get_by_email(customer_data.email):
+    async def create_customer(self, customer_data: CustomerCreate) -> CustomerRead:
+        if customer_data.email and await self.repository.get_by_email(customer_data.email):
             raise CustomerDuplicateException("email", customer_data.email)
-        if customer_data.phone and self.repository.get_by_phone(customer_data.phone):
+        if customer_data.phone and await self.repository.get_by_phone(customer_data.phone):
             raise CustomerDuplicateException("phone", customer_data.phone)
         new_customer = Customer(
             id=uuid.uuid4(),
@@ -24,26 +27,59 @@ class CustomerUseCase:
             email=customer_data.email,
             phone=customer_data.phone,
             address=customer_data.address,
-            is_active=customer_data.is_active,
+            is_active=True,
         )
-        orm_customer = self.repository.add(new_customer)
+        orm_customer = await self.repository.add(new_customer)
         return CustomerRead.model_validate(orm_customer)
 
-    def get_customer_by_id(self, customer_id: uuid.UUID) -> Optional[CustomerRead]:
-        customer = self.repository.get_by_id(customer_id)
+    async def create_customers(self, items: List[CustomerCreate]) -> BulkCreateResponse:
+        """
+        Creates the valid rows of the payload in one insert and reports the
+        others by index. Emails and phones are checked with one query each.
+        """
+        errors = BulkCreateErrors()
+        for index, item in enumerate(items):
+            if not item.phone:
+                errors.add(index, "Customer phone is required.")
+            elif not item.address:
+                errors.add(index, "Customer address is required.")
+        emails = [item.email for item in items]
+        phones = [item.phone for item in items]
+        errors.check_unique("email", emails, await self.repository.get_existing_values("email", emails), CustomerDuplicateException)
+        errors.check_unique("phone", phones, await self.repository.get_existing_values("phone", phones), CustomerDuplicateException)
+
+        new_customers = [
+            Customer(
+                id=uuid.uuid4(),
+                name=items[index].name,
+                email=items[index].email,
+                phone=items[index].phone,
+                address=items[index].address,
+                is_active=True,
+            )
+            for index in errors.accepted(len(items))
+        ]
+        await self.repository.add_many(new_customers)
+        return errors.response([customer.id for customer in new_customers])
+
+    async def get_customer_by_id(self, customer_id: uuid.UUID) -> Optional[CustomerRead]:
+        customer = await self.repository.get_by_id(customer_id)
         if not customer:
             raise CustomerNotFoundException(customer_id)
         return CustomerRead.model_validate(customer)
 
-    def get_all_customers(self) -> List[CustomerRead]:
-        customers = self.repository.get_all()
-        return [CustomerRead.model_validate(c) for c in customers]
+    async def get_customers_page(
+        self, limit: int, cursor: Optional[str] = None, is_active: Optional[bool] = None
+    ) -> tuple[List[CustomerRead], Optional[str]]:
+        "Returns one keyset page of customers and the cursor of the next one, if any"
+        page = await self.repository.get_page(limit, decode_page_cursor(cursor), is_active=is_active)
+        return [CustomerRead.model_validate(c) for c in page.items], encode_page_cursor(page.next_after)
 
-    def update_customer(self, customer_id: uuid.UUID, data: CustomerUpdate) -> Optional[CustomerRead]:
-        updated_customer = self.repository.update(customer_id, data.model_dump(exclude_unset=True))
+    async def update_customer(self, customer_id: uuid.UUID, data: CustomerUpdate) -> Optional[CustomerRead]:
+        updated_customer = await self.repository.update(customer_id, data.model_dump(exclude_unset=True))
         if not updated_customer:
             raise CustomerNotFoundException(customer_id)
         return CustomerRead.model_validate(updated_customer)
 
-    def disable_customer(self, customer_id: uuid.UUID) -> bool:
-        return self.repository.disable(customer_id)
+    async def disable_customer(self, customer_id: uuid.UUID) -> bool:
+        return await self.repository.disable(customer_id)
@@ -1,13 +1,34 @@
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
 from app.domain.models import InventoryPart
-from app.adapters.schemas.inventory_part import InventoryPartCreate, InventoryPartUpdate, InventoryPartRead
-from app.domain.exceptions import InventoryPartDuplicateException, InventoryPartNotFoundException
-from typing import Optional
+from app.adapters.schemas.bulk import BulkCreateResponse
+from app.adapters.schemas.inventory_part import (InventoryPartCreate, InventoryPartUpdate, InventoryPartRead,
+                                                 InventoryPartPriceChange, InventoryPartPriceListResponse,
+                                                 InventoryPartImportError, InventoryPartImportResponse)
+from app.domain.exceptions import (InventoryPartDuplicateException, InventoryPartNotFoundException,
+                                   InventoryPartValidationException)
+from app.use_cases.repair_order_optimization.live_plan import LiveOptimizationPlan
+from typing import Iterator, Optional, TextIO
+import csv
+import math
 import uuid
+from app.use_cases.bulk_create import BulkCreateErrors
+from app.use_cases.pagination import decode_page_cursor, encode_page_cursor
+
+# Catalog rows held in memory and sent to the staging table at a time.
+IMPORT_BATCH_SIZE = 5000
+# Rejected rows reported with their line; the rest are only counted.
+IMPORT_MAX_ERRORS = 100
+IMPORT_REQUIRED_COLUMNS = ("name", "stock_quantity", "cost", "final_price")
 
 class InventoryPartUseCase:
-    def __init__(self, repository: InventoryPartRepository):
+    def __init__(self,
+                 repository: InventoryPartRepository,
+                 live_plan: Optional[LiveOptimizationPlan] = None,
+                 repair_order_repository: Optional[RepairOrderRepository] = None):
         self.repository = repository
+        self.live_plan = live_plan
+        self.repair_order_repository = repair_order_repository
 
     def create_inventory_part(self, inventory_part_data: InventoryPartCreate) -> InventoryPartRead:
         if inventory_part_data.name and self.repository.get_by_name(inventory_part_data.name):
@@ -23,10 +44,37 @@ class InventoryPartUseCase:
         )
         orm_inventory_part = self.repository.add(new_inventory_part)
         return InventoryPartRead.model_validate(orm_inventory_part)
+
+    def create_inventory_parts(self, items: list[InventoryPartCreate]) -> BulkCreateResponse:
+        """
+        Creates the valid rows of the payload in one insert and reports the
+        others by index. Names are checked against the catalog with one query.
+        """
+        errors = BulkCreateErrors()
+        names = [item.name for item in items]
+        errors.check_unique("name", names, self.repository.get_existing_values("name", names), InventoryPartDuplicateException)
+
+        new_inventory_parts = [
+            InventoryPart(
+                id=uuid.uuid4(),
+                name=items[index].name,
+                description=items[index].description,
+                stock_quantity=items[index].stock_quantity,
+                cost=items[index].cost,
+                final_price=items[index].final_price,
+                is_active=True,
+            )
+            for index in errors.accepted(len(items))
+        ]
+        self.repository.add_many(new_inventory_parts)
+        return errors.response([part.id for part in new_inventory_parts])
         
     
-    def get_all_inventory_parts(self) -> list[InventoryPart]:
-        return self.repository.get_all()
+    def get_inventory_parts_page(
+        self, limit: int, cursor: Optional[str] = None, is_active: Optional[bool] = None
+    ) -> tuple[list[InventoryPartRead], Optional[str]]:
+        page = self.repository.get_page(limit, decode_page_cursor(cursor), is_active=is_active)
+        return [InventoryPartRead.model_validate(p) for p in page.items], encode_page_cursor(page.next_after)
 
     def get_inventory_part_by_id(self, inventory_part_id: uuid.UUID) -> Optional[InventoryPart]:
         inventory_part = self.repository.get_by_id(inventory_part_id)
@@ -35,11 +83,130 @@ class InventoryPartUseCase:
         return InventoryPartRead.model_validate(inventory_part)
 
     def update_inventory_part(self, inventory_part_id: uuid.UUID, inventory_part_data: InventoryPartUpdate) -> Optional[InventoryPart]:
-        updated_inventory_part = self.repository.update(inventory_part_id, inventory_part_data.model_dump(exclude_unset=True))
-        if not updated_inventory_part:
-            raise InventoryPartNotFoundException(inventory_part_id)
+        changes = inventory_part_data.model_dump(exclude_unset=True)
+        with self.repository.unit_of_work():
+            updated_inventory_part = self.repository.update(inventory_part_id, changes)
+            if not updated_inventory_part:
+                raise InventoryPartNotFoundException(inventory_part_id)
+            if self.repair_order_repository is not None and ("cost" in changes or "final_price" in changes):
+                self.repair_order_repository.refresh_open_totals_for_parts([inventory_part_id])
+        self._refresh_live_plan(updated_inventory_part)
         return InventoryPartRead.model_validate(updated_inventory_part)
 
+    def update_prices(self, changes: list[InventoryPartPriceChange]) -> InventoryPartPriceListResponse:
+        """
+        Applies a price list: the parts are written in one batch and the totals
+        of the open orders using them are recomputed by one UPDATE.
+        """
+        ids = [change.id for change in changes]
+        if len(set(ids)) != len(ids):
+            raise InventoryPartValidationException("Each part can appear only once in a price list.")
+        for change in changes:
+            if change.cost is None and change.final_price is None:
+                raise InventoryPartValidationException(f"Price change for part {change.id} sets neither cost nor final price.")
+            if (change.cost is not None and change.cost < 0) or (change.final_price is not None and change.final_price < 0):
+                raise InventoryPartValidationException(f"Price change for part {change.id} cannot be negative.")
+
+        current = {part.id: part for part in self.repository.get_by_ids(ids)}
+        missing = [part_id for part_id in ids if part_id not in current]
+        if missing:
+            raise InventoryPartNotFoundException(missing[0])
+
+        refreshed_orders = 0
+        with self.repository.unit_of_work():
+            self.repository.update_prices([
+                {
+                    "id": change.id,
+                    "cost": change.cost if change.cost is not None else current[change.id].cost,
+                    "final_price": change.final_price if change.final_price is not None else current[change.id].final_price,
+                }
+                for change in changes
+            ])
+            if self.repair_order_repository is not None:
+                refreshed_orders = self.repair_order_repository.refresh_open_totals_for_parts(ids)
+        if self.live_plan is not None and ids:
+            self.live_plan.refresh(parts=self.repository.get_by_ids(ids))
+        return InventoryPartPriceListResponse(updated_parts=len(ids), refreshed_orders=refreshed_orders)
+
+    def import_catalog(self, csv_file: TextIO) -> InventoryPartImportResponse:
+        """
+        Imports a supplier catalog (name, description, stock_quantity, cost,
+        final_price columns) streaming it in batches into the repository.
+        Parts are matched by name: known ones get the file's values and the
+        rest are created. Invalid rows are skipped and counted.
+        """
+        reader = csv.DictReader(csv_file)
+        missing = [name for name in IMPORT_REQUIRED_COLUMNS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise InventoryPartValidationException(f"Catalog is missing the columns: {', '.join(missing)}.")
+        errors: list[InventoryPartImportError] = []
+        rejected = 0
+
+        def batches() -> Iterator[list[dict]]:
+            nonlocal rejected
+            batch = []
+            for row in reader:
+                try:
+                    batch.append(self._catalog_row(reader.line_num, row))
+                except InventoryPartValidationException as e:
+                    rejected += 1
+                    if len(errors) < IMPORT_MAX_ERRORS:
+                        errors.append(InventoryPartImportError(line=reader.line_num, detail=str(e)))
+                    continue
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        refreshed_orders = 0
+        with self.repository.unit_of_work():
+            result = self.repository.import_catalog(batches())
+            if self.repair_order_repository is not None:
+                for start in range(0, len(result.updated_ids), IMPORT_BATCH_SIZE):
+                    refreshed_orders += self.repair_order_repository.refresh_open_totals_for_parts(
+                        result.updated_ids[start:start + IMPORT_BATCH_SIZE]
+                    )
+        if self.live_plan is not None and (result.inserted or result.updated_ids):
+            self.live_plan.invalidate()
+        return InventoryPartImportResponse(
+            inserted=result.inserted,
+            updated=len(result.updated_ids),
+            duplicates=result.superseded,
+            rejected=rejected,
+            refreshed_orders=refreshed_orders,
+            errors=errors,
+        )
+
+    def _catalog_row(self, line: int, row: dict) -> dict:
+        name = (row.get("name") or "").strip()
+        if not name:
+            raise InventoryPartValidationException("Part name is required.")
+        try:
+            stock_quantity = int(row.get("stock_quantity") or "")
+            cost = float(row.get("cost") or "")
+            final_price = float(row.get("final_price") or "")
+        except ValueError:
+            raise InventoryPartValidationException(f"Part '{name}' needs numeric stock_quantity, cost and final_price.")
+        if not (math.isfinite(cost) and math.isfinite(final_price)) or min(stock_quantity, cost, final_price) < 0:
+            raise InventoryPartValidationException(f"Part '{name}' cannot have negative or infinite stock or prices.")
+        return {
+            "line": line,
+            "id": uuid.uuid4(),
+            "name": name,
+            "description": (row.get("description") or "").strip() or None,
+            "stock_quantity": stock_quantity,
+            "cost": cost,
+            "final_price": final_price,
+        }
+
     def disable_inventory_part(self, inventory_part_id: uuid.UUID) -> bool:
-        return self.repository.disable(inventory_part_id)
+        disabled = self.repository.disable(inventory_part_id)
+        if disabled:
+            self._refresh_live_plan(self.repository.get_by_id(inventory_part_id))
+        return disabled
+
+    def _refresh_live_plan(self, inventory_part: InventoryPart) -> None:
+        if self.live_plan is not None:
+            self.live_plan.refresh(parts=[inventory_part])
         
\ No newline at end of file
@@ -0,0 +1,23 @@
+from typing import Optional
+from uuid import UUID
+import base64
+from app.domain.exceptions import InvalidPageCursorException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_page_cursor(after: Optional[UUID]) -> Optional[str]:
+    "Opaque cursor for the page that starts after the given id"
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(str(after).encode()).decode()
+
+
+def decode_page_cursor(cursor: Optional[str]) -> Optional[UUID]:
+    if not cursor:
+        return None
+    try:
+        return UUID(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise InvalidPageCursorException(cursor)
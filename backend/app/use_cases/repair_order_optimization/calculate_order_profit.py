@@ -1,11 +1,25 @@
-from app.domain.models import RepairOrder
-from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from dataclasses import dataclass
+import numpy as np
+from .inventory_snapshot import InventorySnapshot
+from .requirement_matrix import RequirementMatrix
 
 
-def calculate_order_profit(order: RepairOrder, inventory_repo: InventoryPartRepository) -> float:
-    profit = 0.0
-    for ro_part in order.parts:
-        part = inventory_repo.get_by_id(ro_part.part_id)
-        unit_profit = part.final_price - part.cost
-        profit += unit_profit * ro_part.quantity
-    return profit + order.labor_cost
+@dataclass
+class OrderValuation:
+    parts_total: np.ndarray
+    profit: np.ndarray
+
+
+def calculate_orders_profit(
+    requirements: RequirementMatrix, snapshot: InventorySnapshot, labor_cost: np.ndarray
+) -> OrderValuation:
+    """
+    Values every row of the requirement matrix against a preloaded inventory
+    snapshot: part prices are gathered into matrix column order and multiplied
+    by the required quantities in one sparse product, without querying the
+    database. `labor_cost` is indexed like the matrix rows.
+    """
+    positions = requirements.align(snapshot)
+    parts_total = requirements.row_sums(requirements.column_values(snapshot.final_price, positions))
+    parts_profit = requirements.row_sums(requirements.column_values(snapshot.unit_profit, positions))
+    return OrderValuation(parts_total=parts_total, profit=parts_profit + labor_cost)
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import Iterable
+from uuid import UUID
+import numpy as np
+
+
+@dataclass
+class InventorySnapshot:
+    """
+    Columnar copy of the active inventory addressed by a part index: one array
+    per column plus the UUID -> index map used to translate order lines.
+    """
+    part_ids: list[UUID]
+    index: dict[UUID, int]
+    stock_quantity: np.ndarray
+    cost: np.ndarray
+    final_price: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[UUID, int, float, float]]) -> "InventorySnapshot":
+        "Builds the snapshot from (id, stock_quantity, cost, final_price) rows"
+        rows = list(rows)
+        part_ids, stock_quantity, cost, final_price = zip(*rows) if rows else ((), (), (), ())
+        part_ids = list(part_ids)
+        return cls(
+            part_ids=part_ids,
+            index={part_id: i for i, part_id in enumerate(part_ids)},
+            stock_quantity=np.array(stock_quantity, dtype=np.int64),
+            cost=np.array(cost, dtype=np.float64),
+            final_price=np.array(final_price, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_parts(cls, parts: Iterable) -> "InventorySnapshot":
+        return cls.from_rows((part.id, part.stock_quantity, part.cost, part.final_price) for part in parts)
+
+    def __len__(self) -> int:
+        return len(self.part_ids)
+
+    def stock_of(self, part_id: UUID) -> int:
+        index = self.index.get(part_id)
+        return 0 if index is None else int(self.stock_quantity[index])
+
+    @property
+    def unit_profit(self) -> np.ndarray:
+        return self.final_price - self.cost
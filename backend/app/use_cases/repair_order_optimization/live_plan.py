@@ -0,0 +1,373 @@
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from threading import RLock
+from typing import Iterable, Optional
+import heapq
+from uuid import UUID
+import numpy as np
+from app.domain.enums import RepairOrderStatus
+from app.domain.models import InventoryPart, RepairOrder
+from .inventory_snapshot import InventorySnapshot
+from .requirement_matrix import OrderLines, RequirementMatrix
+from .scenarios import Scenario, ScenarioOutcome, evaluate_scenarios
+from .solve_order_selection import solve_order_selection
+from .solver_pool import get_solver_pool
+
+
+@dataclass
+class PlannedOrder:
+    repair_order_id: UUID
+    customer_id: UUID
+    total_cost_repair: float
+    expected_profit: float
+
+
+@dataclass
+class PlanQuality:
+    total_profit: float
+    upper_bound: float
+    search_completed: bool
+
+    @property
+    def optimality_gap(self) -> float:
+        "Relative distance to the proven upper bound, 0 when the plan is optimal"
+        if self.upper_bound <= 0:
+            return 0.0
+        return max(0.0, (self.upper_bound - self.total_profit) / self.upper_bound)
+
+
+RankKey = tuple[float, str]
+# (order id, customer id, labor cost, part id, quantity), one per order line.
+CandidateLine = tuple[UUID, UUID, float, UUID, int]
+# (order id, part id, quantity needed) of a part that rules an order out.
+BlockedLine = tuple[UUID, UUID, int]
+
+
+def ranking_key(order: PlannedOrder) -> RankKey:
+    "Highest expected profit first, ties broken by id so the order is total"
+    return -order.expected_profit, str(order.repair_order_id)
+
+
+@dataclass
+class _PartState:
+    stock_quantity: int
+    cost: float
+    final_price: float
+
+
+class LiveOptimizationPlan:
+    """
+    In-memory optimization plan kept up to date from write events.
+
+    `load` solves the whole pending backlog once. Afterwards `refresh` applies
+    changed parts and orders: it re-solves only the orders connected to the
+    change through parts that were contended before or after it, and keeps
+    the selection of every other order. `selection` filters the cached plan
+    and only sorts what it returns.
+
+    `load` takes only the orders the current stock could fulfill; the others
+    are tracked by id with the parts that rule them out, and a part event
+    reaching the stock one of them needs makes the plan reload. `evaluate`
+    takes the lines of those a scenario's stock could unblock.
+
+    The plan lives in the process that owns it; writes made elsewhere (other
+    workers, scripts, direct SQL) are not seen until `invalidate` is called.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._version = 0
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._version += 1
+            self._matrix = RequirementMatrix()
+            self._parts: dict[UUID, _PartState] = {}
+            self._labor_cost: dict[UUID, float] = {}
+            self._customer: dict[UUID, UUID] = {}
+            self._blocking: dict[UUID, list[tuple[UUID, int]]] = {}
+            self._reload_at: dict[UUID, int] = {}
+            self._contended = np.zeros(0, dtype=bool)
+            self._selected: dict[UUID, PlannedOrder] = {}
+            # Orders and bound gap of every component whose search was cut off.
+            self._gaps: list[tuple[set[UUID], float]] = []
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def version(self) -> int:
+        "Changes on every applied event; pass it to `load` to detect events missed while loading"
+        return self._version
+
+    def has_orders(self) -> bool:
+        return len(self._labor_cost) > 0 or len(self._blocking) > 0
+
+    def quality(self) -> PlanQuality:
+        with self._lock:
+            total_profit = sum(order.expected_profit for order in self._selected.values())
+            return PlanQuality(
+                total_profit=round(total_profit, 2),
+                upper_bound=round(total_profit + sum(gap for _, gap in self._gaps), 2),
+                search_completed=not self._gaps,
+            )
+
+    def selection(
+        self,
+        limit: Optional[int] = None,
+        min_profit: Optional[float] = None,
+        customer_id: Optional[UUID] = None,
+        after: Optional[RankKey] = None,
+    ) -> list[PlannedOrder]:
+        """
+        Selected orders matching the filters in `ranking_key` order, starting
+        after the `after` key. With a limit only a bounded heap of `limit`
+        orders is kept instead of sorting every match.
+        """
+        with self._lock:
+            matches = [
+                order for order in self._selected.values()
+                if (min_profit is None or order.expected_profit >= min_profit)
+                and (customer_id is None or order.customer_id == customer_id)
+                and (after is None or ranking_key(order) > after)
+            ]
+        if limit is None:
+            return sorted(matches, key=ranking_key)
+        return heapq.nsmallest(limit, matches, key=ranking_key)
+
+    def load(
+        self,
+        lines: Iterable[CandidateLine],
+        snapshot: InventorySnapshot,
+        version: int | None = None,
+        time_budget_ms: Optional[float] = None,
+        blocked: Iterable[BlockedLine] = (),
+    ) -> None:
+        """
+        Rebuilds the plan from the candidate lines of the pending backlog
+        (sorted by order), the lines that rule the other pending orders out and
+        an inventory snapshot. If events were applied since `version` was read,
+        the loaded data may predate them, so the plan is kept for this read but
+        reloaded next time.
+        """
+        with self._lock:
+            stale = version is not None and version != self._version
+            self.invalidate()
+            self._parts = {
+                part_id: _PartState(int(stock), float(cost), float(price))
+                for part_id, stock, cost, price in zip(
+                    snapshot.part_ids,
+                    snapshot.stock_quantity.tolist(),
+                    snapshot.cost.tolist(),
+                    snapshot.final_price.tolist(),
+                )
+            }
+            for _, order_lines in groupby(lines, key=itemgetter(0)):
+                self._set_order(self._matrix, self._labor_cost, self._customer, list(order_lines))
+            for order_id, part_id, quantity in blocked:
+                self._blocking.setdefault(order_id, []).append((part_id, quantity))
+                self._reload_at[part_id] = min(quantity, self._reload_at.get(part_id, quantity))
+            self._resolve(np.ones(len(self._matrix.part_ids), dtype=bool), (), time_budget_ms)
+            self._loaded = not stale
+
+    def improve(self, time_budget_ms: float) -> None:
+        """
+        Searches the components that were cut off again with a new time budget,
+        keeping the previous plan if the new search does not do better.
+        """
+        with self._lock:
+            if not self._loaded or not self._gaps:
+                return
+            seed_columns = np.zeros(len(self._matrix.part_ids), dtype=bool)
+            for orders, _ in self._gaps:
+                for order_id in orders:
+                    for part_id in self._parts_of(order_id):
+                        seed_columns[self._matrix.part_index[part_id]] = True
+
+            previous_selected, previous_gaps = dict(self._selected), list(self._gaps)
+            affected = self._resolve(seed_columns, (), time_budget_ms)
+
+            def profit_of(selected: dict[UUID, PlannedOrder]) -> float:
+                return sum(selected[order_id].expected_profit for order_id in affected if order_id in selected)
+
+            if profit_of(self._selected) < profit_of(previous_selected):
+                self._selected, self._gaps = previous_selected, previous_gaps
+            else:
+                self._version += 1
+
+    def refresh(
+        self,
+        parts: Iterable[InventoryPart] = (),
+        orders: Iterable[tuple[RepairOrder, OrderLines]] = (),
+    ) -> None:
+        """
+        Applies changed inventory parts and changed orders (with their active
+        lines) and re-solves the affected part of the plan.
+        """
+        with self._lock:
+            self._version += 1
+            if not self._loaded:
+                return
+
+            seeds: set[UUID] = set()
+            for part in parts:
+                if part.is_active:
+                    self._parts[part.id] = _PartState(int(part.stock_quantity), float(part.cost), float(part.final_price))
+                    if part.stock_quantity >= self._reload_at.get(part.id, part.stock_quantity + 1):
+                        # An order left out at load time may be fulfillable now.
+                        self._loaded = False
+                        return
+                else:
+                    self._parts.pop(part.id, None)
+                seeds.add(part.id)
+
+            changed_orders = []
+            for order, lines in orders:
+                lines = list(lines)
+                self._blocking.pop(order.id, None)
+                seeds.update(self._parts_of(order.id))
+                seeds.update(part_id for part_id, _ in lines)
+                if order.status == RepairOrderStatus.PENDING and order.is_active and lines:
+                    self._labor_cost[order.id] = float(order.labor_cost)
+                    self._customer[order.id] = order.customer_id
+                    self._matrix.set_row(order.id, lines)
+                else:
+                    self._labor_cost.pop(order.id, None)
+                    self._customer.pop(order.id, None)
+                    self._matrix.remove_row(order.id)
+                changed_orders.append(order.id)
+
+            seed_columns = np.zeros(len(self._matrix.part_ids), dtype=bool)
+            for part_id in seeds:
+                col = self._matrix.part_index.get(part_id)
+                if col is not None:
+                    seed_columns[col] = True
+            self._resolve(seed_columns, changed_orders)
+
+    def unblocked_by(self, scenarios: list[Scenario]) -> list[UUID]:
+        "Orders left out at load time that the stock of at least one scenario could fulfill"
+        with self._lock:
+            orders = []
+            for scenario in scenarios:
+                stock_delta: dict[UUID, int] = {}
+                for change in scenario.changes:
+                    stock_delta[change.part_id] = stock_delta.get(change.part_id, 0) + change.stock_delta
+                if not any(delta > 0 for delta in stock_delta.values()):
+                    continue
+                orders.extend(
+                    order_id for order_id, needs in self._blocking.items()
+                    if all(self._stock_of(part_id) + stock_delta.get(part_id, 0) >= quantity for part_id, quantity in needs)
+                )
+            return sorted(set(orders))
+
+    def evaluate(
+        self,
+        scenarios: list[Scenario],
+        time_budget_ms: Optional[float] = None,
+        blocked: Iterable[CandidateLine] = (),
+    ) -> list[ScenarioOutcome]:
+        """
+        Solves what-if scenarios against the loaded backlog without changing
+        the plan. The lines of orders left out at load time (see
+        `unblocked_by`) are added to a copy of the matrix.
+        """
+        with self._lock:
+            matrix, labor_cost = self._matrix, self._labor_cost
+            blocked = list(blocked)
+            if blocked:
+                matrix, labor_cost = matrix.copy(), dict(labor_cost)
+                for _, order_lines in groupby(blocked, key=itemgetter(0)):
+                    self._set_order(matrix, labor_cost, {}, list(order_lines))
+            return evaluate_scenarios(
+                matrix,
+                self._column("stock_quantity", np.int64, matrix),
+                self._column("cost", np.float64, matrix),
+                self._column("final_price", np.float64, matrix),
+                self._labor_cost_column(matrix, labor_cost),
+                scenarios,
+                time_budget_ms,
+            )
+
+    @staticmethod
+    def _set_order(
+        matrix: RequirementMatrix, labor_costs: dict[UUID, float], customers: dict[UUID, UUID], lines: list[CandidateLine]
+    ) -> None:
+        order_id, customer_id, labor_cost, _, _ = lines[0]
+        labor_costs[order_id] = float(labor_cost)
+        customers[order_id] = customer_id
+        matrix.set_row(order_id, ((part_id, quantity) for *_, part_id, quantity in lines))
+
+    def _stock_of(self, part_id: UUID) -> int:
+        part = self._parts.get(part_id)
+        return part.stock_quantity if part is not None else 0
+
+    def _parts_of(self, order_id: UUID) -> list[UUID]:
+        row = self._matrix.order_index.get(order_id)
+        if row is None:
+            return []
+        return [self._matrix.part_ids[col] for col, _ in self._matrix.row(row)]
+
+    def _column(self, attribute: str, dtype, matrix: Optional[RequirementMatrix] = None) -> np.ndarray:
+        part_ids = (matrix if matrix is not None else self._matrix).part_ids
+        values = (getattr(self._parts.get(part_id), attribute, 0) for part_id in part_ids)
+        return np.fromiter(values, dtype=dtype, count=len(part_ids))
+
+    def _labor_cost_column(
+        self, matrix: Optional[RequirementMatrix] = None, labor_cost: Optional[dict[UUID, float]] = None
+    ) -> np.ndarray:
+        order_ids = (matrix if matrix is not None else self._matrix).order_ids
+        labor_cost = self._labor_cost if labor_cost is None else labor_cost
+        values = (labor_cost.get(order_id, 0.0) for order_id in order_ids)
+        return np.fromiter(values, dtype=np.float64, count=len(order_ids))
+
+    def _resolve(
+        self, seed_columns: np.ndarray, changed_orders: Iterable[UUID], time_budget_ms: Optional[float] = None
+    ) -> set[UUID]:
+        matrix = self._matrix
+        stock = self._column("stock_quantity", np.int64)
+        final_price = self._column("final_price", np.float64)
+        unit_profit = final_price - self._column("cost", np.float64)
+        labor_cost = self._labor_cost_column()
+        parts_total = matrix.row_sums(final_price)
+        profit = matrix.row_sums(unit_profit) + labor_cost
+
+        candidates = matrix.fulfillable(stock) & (profit > 0)
+        contended = matrix.consumption(np.flatnonzero(candidates)) > stock
+        linking = contended.copy()
+        linking[:len(self._contended)] |= self._contended
+        self._contended = contended
+
+        affected = np.flatnonzero(matrix.rows_reached(seed_columns, linking))
+        affected_ids = set(changed_orders)
+        affected_ids.update(matrix.order_ids[row] for row in affected.tolist())
+        for order_id in affected_ids:
+            self._selected.pop(order_id, None)
+        # Cut-off components are closed under the linking parts, so any of them
+        # touched here is re-solved as a whole.
+        self._gaps = [(orders, gap) for orders, gap in self._gaps if orders.isdisjoint(affected_ids)]
+
+        rows = affected[candidates[affected]]
+        plan = solve_order_selection(
+            profit[rows].tolist(),
+            [matrix.row(row) for row in rows.tolist()],
+            stock.tolist(),
+            executor=get_solver_pool(),
+            time_budget_ms=time_budget_ms,
+        )
+        for row in rows[plan.selected].tolist():
+            order_id = matrix.order_ids[row]
+            self._selected[order_id] = PlannedOrder(
+                repair_order_id=order_id,
+                customer_id=self._customer[order_id],
+                total_cost_repair=round(float(labor_cost[row] + parts_total[row]), 2),
+                expected_profit=round(float(profit[row]), 2),
+            )
+        for members, gap in plan.gaps:
+            self._gaps.append(({matrix.order_ids[row] for row in rows[members].tolist()}, gap))
+        return affected_ids
+
+
+# Plan shared by the routers of this process.
+shared_plan = LiveOptimizationPlan()
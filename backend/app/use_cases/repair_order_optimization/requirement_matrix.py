@@ -0,0 +1,246 @@
+from typing import Iterable, Sequence
+from uuid import UUID
+import numpy as np
+from app.domain.models import RepairOrder
+from .inventory_snapshot import InventorySnapshot
+
+# Order lines as (part id, quantity) pairs.
+OrderLines = Iterable[tuple[UUID, int]]
+
+_INITIAL_CAPACITY = 64
+
+
+class RequirementMatrix:
+    """
+    Sparse order x part matrix of the quantities each pending order needs.
+
+    Entries are stored CSR-style: every row owns a contiguous slice of the
+    entry arrays (`_row_start`/`_row_end`). Replacing a row zeroes its old
+    slice and appends the new entries at the end, so a single order can be
+    updated in O(row) and the matrix can be kept across optimizer runs; dead
+    slices are compacted once they outnumber the live entries. Zeroed entries
+    add nothing to any reduction, which lets every query below run as one
+    vectorized pass over the entry arrays. Row indices are only stable until
+    the next update; use `order_index` to find an order again.
+    """
+
+    def __init__(self):
+        self.order_ids: list[UUID] = []
+        self.order_index: dict[UUID, int] = {}
+        self.part_ids: list[UUID] = []
+        self.part_index: dict[UUID, int] = {}
+        self._live: list[bool] = []
+        self._row_start: list[int] = []
+        self._row_end: list[int] = []
+        self._entry_row = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._entry_col = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._entry_qty = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._size = 0
+        self._dead = 0
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[RepairOrder]) -> "RequirementMatrix":
+        matrix = cls()
+        for order in orders:
+            matrix.set_row(
+                order.id,
+                ((ro_part.part_id, ro_part.quantity) for ro_part in order.parts if ro_part.is_active),
+            )
+        return matrix
+
+    def copy(self) -> "RequirementMatrix":
+        "Independent copy, so rows can be added without touching this matrix"
+        matrix = RequirementMatrix()
+        matrix.order_ids = list(self.order_ids)
+        matrix.order_index = dict(self.order_index)
+        matrix.part_ids = list(self.part_ids)
+        matrix.part_index = dict(self.part_index)
+        matrix._live = list(self._live)
+        matrix._row_start = list(self._row_start)
+        matrix._row_end = list(self._row_end)
+        matrix._entry_row = self._entry_row.copy()
+        matrix._entry_col = self._entry_col.copy()
+        matrix._entry_qty = self._entry_qty.copy()
+        matrix._size = self._size
+        matrix._dead = self._dead
+        return matrix
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.order_ids), len(self.part_ids)
+
+    def __contains__(self, order_id: UUID) -> bool:
+        index = self.order_index.get(order_id)
+        return index is not None and self._live[index]
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(np.asarray(self._live, dtype=bool))
+
+    # -- updates ---------------------------------------------------------------
+
+    def set_row(self, order_id: UUID, lines: OrderLines) -> int:
+        "Replaces the requirements of an order, adding the row if it is new"
+        merged: dict[int, int] = {}
+        for part_id, quantity in lines:
+            col = self._column(part_id)
+            merged[col] = merged.get(col, 0) + quantity
+
+        row = self.order_index.get(order_id)
+        if row is None:
+            row = len(self.order_ids)
+            self.order_ids.append(order_id)
+            self.order_index[order_id] = row
+            self._live.append(True)
+            self._row_start.append(self._size)
+            self._row_end.append(self._size)
+        else:
+            self._clear(row)
+            self._live[row] = True
+
+        self._reserve(len(merged))
+        start = self._size
+        end = start + len(merged)
+        self._entry_row[start:end] = row
+        self._entry_col[start:end] = list(merged.keys())
+        self._entry_qty[start:end] = list(merged.values())
+        self._row_start[row] = start
+        self._row_end[row] = end
+        self._size = end
+
+        if self._dead > self._size - self._dead:
+            self._compact()
+        return self.order_index[order_id]
+
+    def remove_row(self, order_id: UUID) -> None:
+        row = self.order_index.get(order_id)
+        if row is None or not self._live[row]:
+            return
+        self._clear(row)
+        self._live[row] = False
+        if self._dead > self._size - self._dead:
+            self._compact()
+
+    def _column(self, part_id: UUID) -> int:
+        col = self.part_index.get(part_id)
+        if col is None:
+            col = len(self.part_ids)
+            self.part_ids.append(part_id)
+            self.part_index[part_id] = col
+        return col
+
+    def _clear(self, row: int) -> None:
+        start, end = self._row_start[row], self._row_end[row]
+        self._entry_qty[start:end] = 0
+        self._dead += end - start
+        self._row_end[row] = start
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._entry_qty)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_entry_row", "_entry_col", "_entry_qty"):
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, grown)
+
+    def _compact(self) -> None:
+        # Drops zeroed entries and removed rows; live rows keep their relative
+        # order but may get a new index.
+        live = np.asarray(self._live, dtype=bool)
+        new_index = np.cumsum(live) - 1
+        keep = np.flatnonzero(self._entry_qty[:self._size])
+        keep = keep[np.argsort(self._entry_row[keep], kind="stable")]
+        size = len(keep)
+        self._entry_row[:size] = new_index[self._entry_row[keep]]
+        self._entry_col[:size] = self._entry_col[keep]
+        self._entry_qty[:size] = self._entry_qty[keep]
+        self._size = size
+        self._dead = 0
+
+        self.order_ids = [order_id for order_id, alive in zip(self.order_ids, self._live) if alive]
+        self.order_index = {order_id: row for row, order_id in enumerate(self.order_ids)}
+        self._live = [True] * len(self.order_ids)
+        counts = np.bincount(self._entry_row[:size], minlength=len(self.order_ids))
+        ends = np.cumsum(counts)
+        self._row_start = (ends - counts).tolist()
+        self._row_end = ends.tolist()
+
+    # -- queries ---------------------------------------------------------------
+
+    def row(self, row: int) -> list[tuple[int, int]]:
+        start, end = self._row_start[row], self._row_end[row]
+        return list(zip(self._entry_col[start:end].tolist(), self._entry_qty[start:end].tolist()))
+
+    def align(self, snapshot: InventorySnapshot) -> np.ndarray:
+        "Position of every matrix column in the snapshot, -1 for parts it does not hold"
+        return np.fromiter(
+            (snapshot.index.get(part_id, -1) for part_id in self.part_ids),
+            dtype=np.int64,
+            count=len(self.part_ids),
+        )
+
+    def column_values(self, snapshot_column: np.ndarray, positions: np.ndarray, missing=0) -> np.ndarray:
+        "Gathers a snapshot column into matrix column order"
+        values = np.full(len(self.part_ids), missing, dtype=snapshot_column.dtype)
+        known = positions >= 0
+        values[known] = snapshot_column[positions[known]]
+        return values
+
+    def row_sums(self, column_values: np.ndarray) -> np.ndarray:
+        "Sum of quantity * value over every row (one sparse matrix-vector product)"
+        size = self._size
+        weights = self._entry_qty[:size] * column_values[self._entry_col[:size]]
+        return np.bincount(self._entry_row[:size], weights=weights, minlength=len(self.order_ids))
+
+    def fulfillable(self, stock: np.ndarray) -> np.ndarray:
+        "Mask of live rows whose every part fits in `stock` on its own"
+        size = self._size
+        short = self._entry_qty[:size] > stock[self._entry_col[:size]]
+        blocked = np.bincount(self._entry_row[:size], weights=short, minlength=len(self.order_ids)) > 0
+        return np.asarray(self._live, dtype=bool) & ~blocked
+
+    def consumption(self, rows: Sequence[int] | np.ndarray) -> np.ndarray:
+        "Total quantity of every part needed by the given rows"
+        selected = np.zeros(len(self.order_ids), dtype=bool)
+        selected[np.asarray(rows, dtype=np.int64)] = True
+        size = self._size
+        entries = selected[self._entry_row[:size]]
+        return np.bincount(
+            self._entry_col[:size][entries],
+            weights=self._entry_qty[:size][entries],
+            minlength=len(self.part_ids),
+        ).astype(np.int64)
+
+    def remaining(self, stock: np.ndarray, rows: Sequence[int] | np.ndarray) -> np.ndarray:
+        "Stock left once the given rows are fulfilled"
+        return stock - self.consumption(rows)
+
+    def rows_reached(self, seed_columns: np.ndarray, linking_columns: np.ndarray) -> np.ndarray:
+        """
+        Mask of rows reachable from the seed columns: rows using a reached
+        column are reached, and their columns flagged in `linking_columns`
+        are reached in turn.
+        """
+        size = self._size
+        entry_row = self._entry_row[:size]
+        entry_col = self._entry_col[:size]
+        used = self._entry_qty[:size] > 0
+        columns = np.zeros(len(self.part_ids), dtype=bool)
+        columns[:len(seed_columns)] = seed_columns
+        rows = np.zeros(len(self.order_ids), dtype=bool)
+        while True:
+            touched = np.zeros(len(self.order_ids), dtype=bool)
+            touched[entry_row[used & columns[entry_col]]] = True
+            new_rows = touched & ~rows
+            if not new_rows.any():
+                return rows
+            rows |= new_rows
+            linked = np.zeros(len(self.part_ids), dtype=bool)
+            linked[entry_col[used & new_rows[entry_row]]] = True
+            linked &= linking_columns & ~columns
+            if not linked.any():
+                return rows
+            columns |= linked
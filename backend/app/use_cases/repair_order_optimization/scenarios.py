@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from typing import Optional
+from uuid import UUID
+import numpy as np
+from .requirement_matrix import RequirementMatrix
+from .solve_order_selection import solve_order_selection
+from .solver_pool import get_solver_pool
+
+
+@dataclass
+class PartDelta:
+    part_id: UUID
+    stock_delta: int = 0
+    final_price_change_pct: float = 0.0
+    cost_change_pct: float = 0.0
+
+
+@dataclass
+class Scenario:
+    name: Optional[str] = None
+    changes: list[PartDelta] = field(default_factory=list)
+
+
+@dataclass
+class ScenarioOrder:
+    repair_order_id: UUID
+    total_cost_repair: float
+    expected_profit: float
+
+
+@dataclass
+class ScenarioOutcome:
+    name: Optional[str]
+    total_profit: float
+    upper_bound: float
+    search_completed: bool
+    orders: list[ScenarioOrder]
+
+
+def evaluate_scenarios(
+    matrix: RequirementMatrix,
+    stock: np.ndarray,
+    cost: np.ndarray,
+    final_price: np.ndarray,
+    labor_cost: np.ndarray,
+    scenarios: list[Scenario],
+    time_budget_ms: Optional[float] = None,
+) -> list[ScenarioOutcome]:
+    """
+    Solves the backlog once per scenario with the part columns adjusted by its
+    deltas. The matrix rows are extracted once and shared by every scenario;
+    only the column vectors and the profit of each order are rebuilt. Columns
+    are in matrix column order and the inputs are left untouched; stock never
+    drops below zero.
+    """
+    live = matrix.live_rows()
+    rows = [matrix.row(row) for row in live.tolist()]
+    outcomes = []
+    for scenario in scenarios:
+        scenario_stock = stock.copy()
+        scenario_cost = cost.copy()
+        scenario_price = final_price.copy()
+        for change in scenario.changes:
+            col = matrix.part_index.get(change.part_id)
+            if col is None:
+                continue  # no pending order uses the part
+            scenario_stock[col] = max(0, scenario_stock[col] + change.stock_delta)
+            scenario_price[col] *= 1 + change.final_price_change_pct / 100
+            scenario_cost[col] *= 1 + change.cost_change_pct / 100
+
+        parts_total = matrix.row_sums(scenario_price)
+        profit = matrix.row_sums(scenario_price - scenario_cost) + labor_cost
+        result = solve_order_selection(
+            profit[live].tolist(),
+            rows,
+            scenario_stock.tolist(),
+            executor=get_solver_pool(),
+            time_budget_ms=time_budget_ms,
+        )
+        orders = [
+            ScenarioOrder(
+                repair_order_id=matrix.order_ids[row],
+                total_cost_repair=round(float(labor_cost[row] + parts_total[row]), 2),
+                expected_profit=round(float(profit[row]), 2),
+            )
+            for row in live[result.selected].tolist()
+        ]
+        orders.sort(key=lambda order: (-order.expected_profit, str(order.repair_order_id)))
+        outcomes.append(ScenarioOutcome(
+            name=scenario.name,
+            total_profit=round(result.total_profit, 2),
+            upper_bound=round(result.upper_bound, 2),
+            search_completed=result.proven_optimal,
+            orders=orders,
+        ))
+    return outcomes
@@ -1,12 +1,39 @@
-from typing import List
+from typing import Iterator, List, Optional
+from uuid import UUID
+import base64
 from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
-from app.adapters.schemas.repair_order_optimization import OptimizedRepairOrderResponse
+from app.adapters.schemas.repair_order_optimization import (OptimizedRepairOrderResponse,
+                                                           OptimizationPlanResponse,
+                                                           WhatIfRequest,
+                                                           ScenarioResultResponse)
 from app.adapters.schemas.customer import CustomerSimpleResponse
 from app.adapters.schemas.vehicle import VehicleSimpleResponse
-from app.domain.exceptions import NoAvailableRepairOrdersException, InvalidRepairOrderDataException
-from .validate_order_inventory import is_order_fulfillable
-from .calculate_order_profit import calculate_order_profit
+from app.domain.exceptions import (NoAvailableRepairOrdersException,
+                                   InvalidRepairOrderDataException,
+                                   InvalidOptimizationCursorException,
+                                   InvalidOptimizationScenarioException)
+from .inventory_snapshot import InventorySnapshot
+from .live_plan import LiveOptimizationPlan, PlannedOrder, RankKey
+from .result_cache import VersionedResultCache
+from .scenarios import PartDelta, Scenario
+
+# Orders whose customer and vehicle are loaded per query while streaming.
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(order: OptimizedRepairOrderResponse | PlannedOrder) -> str:
+    "Opaque cursor pointing right after the given order in the ranking"
+    raw = f"{order.expected_profit!r}|{order.repair_order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> RankKey:
+    try:
+        profit, repair_order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return -float(profit), str(UUID(repair_order_id))
+    except ValueError:
+        raise InvalidOptimizationCursorException(cursor)
 
 
 class SelectRepairOrdersByProfitUseCase:
@@ -14,48 +41,179 @@ class SelectRepairOrdersByProfitUseCase:
         self,
         repair_order_repository: RepairOrderRepository,
         inventory_part_repository: InventoryPartRepository,
+        live_plan: Optional[LiveOptimizationPlan] = None,
+        result_cache: Optional[VersionedResultCache] = None,
     ):
         self.repair_order_repository = repair_order_repository
         self.inventory_part_repository = inventory_part_repository
+        self.live_plan = live_plan
+        self.result_cache = result_cache
 
-    def execute(self) -> List[OptimizedRepairOrderResponse]:
-        orders = self.repair_order_repository.get_all_pending_with_parts()
-        if not orders:
-            raise NoAvailableRepairOrdersException()
-        
-        stock = {part.id: part.stock_quantity for part in self.inventory_part_repository.get_all()}
-        part_prices = {part.id: part.final_price for part in self.inventory_part_repository.get_all()}
-        optimized_orders: List[OptimizedRepairOrderResponse] = []
-
-        for order in orders:
-            if order.labor_cost < 0:
-                raise InvalidRepairOrderDataException(order.id, "Labor cost cannot be negative")
-            if not order.parts:
-                raise InvalidRepairOrderDataException(order.id, "Order has no associated parts")
-
-            if not is_order_fulfillable(order, stock): 
-                continue
-
-            parts_total = sum(
-                part_prices.get(ro_part.part_id, 0.0) * ro_part.quantity
-                for ro_part in order.parts
+    def execute(
+        self,
+        limit: Optional[int] = None,
+        min_profit: Optional[float] = None,
+        customer_id: Optional[UUID] = None,
+        cursor: Optional[str] = None,
+        time_budget_ms: Optional[float] = None,
+    ) -> List[OptimizedRepairOrderResponse]:
+        after = decode_cursor(cursor) if cursor else None
+        # Loading bumps the plan version, so the key is read after it.
+        plan = self._plan(time_budget_ms)
+
+        def compute() -> List[OptimizedRepairOrderResponse]:
+            planned = plan.selection(limit=limit, min_profit=min_profit, customer_id=customer_id, after=after)
+            return self._build_responses(planned)
+
+        if self.result_cache is None:
+            return compute()
+        key = self._version_key("list") + (limit, min_profit, customer_id, after, time_budget_ms)
+        return list(self.result_cache.get_or_compute(key, compute))
+
+    def execute_with_report(
+        self,
+        limit: Optional[int] = None,
+        min_profit: Optional[float] = None,
+        customer_id: Optional[UUID] = None,
+        cursor: Optional[str] = None,
+        time_budget_ms: Optional[float] = None,
+    ) -> OptimizationPlanResponse:
+        "Like `execute`, plus the profit of the whole plan, its proven upper bound and whether the search finished"
+        after = decode_cursor(cursor) if cursor else None
+        plan = self._plan(time_budget_ms)
+
+        def compute() -> OptimizationPlanResponse:
+            planned = plan.selection(limit=limit, min_profit=min_profit, customer_id=customer_id, after=after)
+            quality = plan.quality()
+            return OptimizationPlanResponse(
+                orders=self._build_responses(planned),
+                total_profit=quality.total_profit,
+                upper_bound=quality.upper_bound,
+                optimality_gap=round(quality.optimality_gap, 4),
+                search_completed=quality.search_completed,
+            )
+
+        if self.result_cache is None:
+            return compute()
+        key = self._version_key("plan") + (limit, min_profit, customer_id, after, time_budget_ms)
+        return self.result_cache.get_or_compute(key, compute)
+
+    def stream(
+        self,
+        min_profit: Optional[float] = None,
+        customer_id: Optional[UUID] = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+    ) -> Iterator[OptimizedRepairOrderResponse]:
+        """
+        Solves eagerly, so errors surface before the first item, and then
+        yields the whole plan building responses one batch at a time. The
+        batches run after the request scope closed the session, so the
+        connection they use is released once the stream ends.
+        """
+        planned = self._plan().selection(min_profit=min_profit, customer_id=customer_id)
+
+        def batches() -> Iterator[OptimizedRepairOrderResponse]:
+            try:
+                for start in range(0, len(planned), batch_size):
+                    yield from self._build_responses(planned[start:start + batch_size])
+            finally:
+                self.repair_order_repository.release()
+
+        return batches()
+
+    def evaluate_scenarios(self, request: WhatIfRequest) -> List[ScenarioResultResponse]:
+        "Solves stock and price what-if scenarios on top of the current plan without writing anything"
+        scenarios = [
+            Scenario(
+                name=item.name,
+                changes=[PartDelta(**change.model_dump()) for change in item.changes],
             )
-            total_cost_repair = round(order.labor_cost + parts_total, 2)
+            for item in request.scenarios
+        ]
+        self._validate_scenarios(scenarios)
+        plan = self._plan()
+        # Orders the current stock rules out are only loaded when a scenario's
+        # restock could let them in.
+        blocked = self.repair_order_repository.get_pending_lines(plan.unblocked_by(scenarios))
+        for order_id, _, labor_cost, _, _ in blocked:
+            if labor_cost < 0:
+                raise InvalidRepairOrderDataException(order_id, "Labor cost cannot be negative")
+        outcomes = plan.evaluate(scenarios, request.time_budget_ms, blocked)
+        return [ScenarioResultResponse.model_validate(outcome, from_attributes=True) for outcome in outcomes]
 
-            profit = calculate_order_profit(order, self.inventory_part_repository)
+    def _validate_scenarios(self, scenarios: List[Scenario]) -> None:
+        part_ids = {change.part_id for scenario in scenarios for change in scenario.changes}
+        known = {part.id for part in self.inventory_part_repository.get_by_ids(part_ids)} if part_ids else set()
+        for position, scenario in enumerate(scenarios):
+            label = scenario.name or f"#{position + 1}"
+            for change in scenario.changes:
+                if change.part_id not in known:
+                    raise InvalidOptimizationScenarioException(label, f"part {change.part_id} does not exist")
+                if change.final_price_change_pct <= -100 or change.cost_change_pct <= -100:
+                    raise InvalidOptimizationScenarioException(label, "price and cost changes must be above -100%")
 
-            optimized_orders.append(
-                OptimizedRepairOrderResponse(
-                    repair_order_id=order.id,
-                    customer=CustomerSimpleResponse.model_validate(order.customer),
-                    vehicle=VehicleSimpleResponse.model_validate(order.vehicle),
-                    total_cost_repair=total_cost_repair,
-                    expected_profit=round(profit, 2)
-                )
-                )
+    def _version_key(self, kind: str) -> tuple:
+        # The live plan is refreshed after the repository commit, so its own
+        # version is part of the key to avoid caching a not-yet-refreshed plan.
+        return (
+            kind,
+            self.inventory_part_repository.change_counter(),
+            self.repair_order_repository.change_counter(),
+            self.live_plan.version() if self.live_plan is not None else None,
+        )
 
-            for ro_part in order.parts:
-                stock[ro_part.part_id] -= ro_part.quantity
+    def _plan(self, time_budget_ms: Optional[float] = None) -> LiveOptimizationPlan:
+        """
+        Loads the plan if needed. A time budget bounds the solve of a cold load;
+        on a loaded plan it is spent improving the components left unproven.
+        """
+        plan = self.live_plan if self.live_plan is not None else LiveOptimizationPlan()
+        if not plan.is_loaded():
+            self._load(plan, time_budget_ms)
+        elif time_budget_ms is not None:
+            plan.improve(time_budget_ms)
+        if not plan.has_orders():
+            raise NoAvailableRepairOrdersException()
+        return plan
 
-        return sorted(optimized_orders, key=lambda x: x.expected_profit, reverse=True)
-    
\ No newline at end of file
+    def _load(self, plan: LiveOptimizationPlan, time_budget_ms: Optional[float] = None) -> None:
+        version = plan.version()
+        # Pending orders without active lines are left out by the join on their
+        # lines: they have nothing to plan yet, so they are not reported as
+        # invalid data either.
+        lines, blocked = self.repair_order_repository.get_pending_candidate_lines()
+        if not lines and not blocked:
+            raise NoAvailableRepairOrdersException()
+
+        for order_id, _, labor_cost, _, _ in lines:
+            if labor_cost < 0:
+                raise InvalidRepairOrderDataException(order_id, "Labor cost cannot be negative")
+
+        snapshot = InventorySnapshot.from_rows(self.inventory_part_repository.get_stock_and_prices())
+        plan.load(lines, snapshot, version, time_budget_ms, blocked)
+
+    def _build_responses(self, planned: List[PlannedOrder]) -> List[OptimizedRepairOrderResponse]:
+        "Builds the responses with one query for the customers and vehicles of all the orders"
+        if not planned:
+            return []
+        summaries = {
+            row.id: row
+            for row in self.repair_order_repository.get_customer_and_vehicle_summaries(
+                [item.repair_order_id for item in planned]
+            )
+        }
+        return [
+            OptimizedRepairOrderResponse(
+                repair_order_id=item.repair_order_id,
+                customer=CustomerSimpleResponse(
+                    id=row.customer_id, name=row.customer_name, is_active=row.customer_is_active
+                ),
+                vehicle=VehicleSimpleResponse(
+                    id=row.vehicle_id, license_plate=row.license_plate, is_active=row.vehicle_is_active
+                ),
+                total_cost_repair=item.total_cost_repair,
+                expected_profit=item.expected_profit,
+            )
+            for item in planned
+            if (row := summaries.get(item.repair_order_id)) is not None
+        ]
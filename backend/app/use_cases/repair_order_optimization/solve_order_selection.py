@@ -0,0 +1,433 @@
+from bisect import bisect_right
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional, Sequence
+
+# Requirement row of a single order: (part index, quantity) pairs.
+Requirement = Sequence[tuple[int, int]]
+
+DEFAULT_MAX_NODES = 50_000
+# Components smaller than this are solved inline; shipping them to a worker
+# process costs more than the search itself.
+PARALLEL_MIN_ITEMS = 200
+SURROGATE_ROUNDS = 20
+# Nodes between two deadline checks.
+_CLOCK_INTERVAL = 256
+_EPSILON = 1e-9
+
+
+@dataclass
+class SelectionResult:
+    selected: list[int]
+    total_profit: float
+    nodes_explored: int = 0
+    proven_optimal: bool = True
+    upper_bound: float = 0.0
+    # Members and bound gap of every component whose search was cut off.
+    gaps: list[tuple[list[int], float]] = field(default_factory=list)
+
+
+def solve_order_selection(
+    profits: Sequence[float],
+    requirements: Sequence[Requirement],
+    stock: Sequence[int],
+    max_nodes: int = DEFAULT_MAX_NODES,
+    executor: Optional[Executor] = None,
+    time_budget_ms: Optional[float] = None,
+) -> SelectionResult:
+    """
+    Selects the subset of orders that maximizes total profit without consuming
+    more of any part than `stock` holds (a multi-dimensional 0/1 knapsack).
+    Parts are addressed by their index in `stock`.
+
+    Orders that cannot be fulfilled on their own or do not add profit are
+    discarded, and orders whose parts are not contended by the remaining
+    candidates are fixed into the plan. The rest is split into independent
+    components (orders linked through contended parts) and each one is solved
+    by a depth-first branch-and-bound seeded with a greedy plan, bounded by the
+    LP relaxation of a surrogate constraint and pruned with a dominance rule.
+    Large components run on `executor` when one is given. `max_nodes` is shared
+    between components by size, while `time_budget_ms` is a deadline common to
+    all of them. When a component runs out of either, the best plan found so
+    far is kept and the result has `proven_optimal=False`.
+    """
+    # monotonic() is system-wide, so the deadline also holds in worker processes.
+    deadline = monotonic() + time_budget_ms / 1000 if time_budget_ms is not None else None
+    rows = [_merge_row(row) for row in requirements]
+    candidates = [
+        i for i, row in enumerate(rows)
+        if profits[i] > 0 and all(stock[part] >= qty for part, qty in row)
+    ]
+
+    demand: dict[int, int] = {}
+    for i in candidates:
+        for part, qty in rows[i]:
+            demand[part] = demand.get(part, 0) + qty
+    contended = {part for part, total in demand.items() if total > stock[part]}
+
+    fixed = [i for i in candidates if not any(part in contended for part, _ in rows[i])]
+    free_profit = sum(profits[i] for i in fixed)
+    open_items = [i for i in candidates if any(part in contended for part, _ in rows[i])]
+
+    if not open_items:
+        return SelectionResult(
+            selected=sorted(fixed),
+            total_profit=free_profit,
+            upper_bound=free_profit,
+        )
+
+    contended_rows = [tuple((part, qty) for part, qty in rows[i] if part in contended) for i in open_items]
+    components = _components(contended_rows)
+    tasks = []
+    for members in components:
+        part_index: dict[int, int] = {}
+        local_rows = []
+        for j in members:
+            local_rows.append(tuple((part_index.setdefault(part, len(part_index)), qty) for part, qty in contended_rows[j]))
+        capacity = [int(stock[part]) for part in part_index]
+        budget = max(1, max_nodes * len(members) // len(open_items))
+        tasks.append(([float(profits[open_items[j]]) for j in members], local_rows, capacity, budget, deadline))
+
+    # Large components go to the executor while the rest is solved inline; a
+    # lone component gains nothing from another process.
+    pending = {}
+    if executor is not None:
+        large = [c for c, task in enumerate(tasks) if len(task[0]) >= PARALLEL_MIN_ITEMS]
+        if len(large) > 1 or (large and len(large) < len(tasks)):
+            pending = {c: executor.submit(_solve_component, *tasks[c]) for c in large}
+    outcomes = [None if c in pending else _solve_component(*task) for c, task in enumerate(tasks)]
+    for c, future in pending.items():
+        outcomes[c] = future.result()
+
+    selected = list(fixed)
+    total_profit = upper_bound = free_profit
+    nodes = 0
+    proven_optimal = True
+    gaps = []
+    for members, (chosen, best_profit, explored, completed, root_bound) in zip(components, outcomes):
+        selected.extend(open_items[members[j]] for j in chosen)
+        total_profit += best_profit
+        upper_bound += best_profit if completed else root_bound
+        nodes += explored
+        proven_optimal = proven_optimal and completed
+        if not completed:
+            gaps.append(([open_items[j] for j in members], max(0.0, root_bound - best_profit)))
+    return SelectionResult(
+        selected=sorted(selected),
+        total_profit=total_profit,
+        nodes_explored=nodes,
+        proven_optimal=proven_optimal,
+        upper_bound=upper_bound,
+        gaps=gaps,
+    )
+
+
+def _components(rows: list[tuple[tuple[int, int], ...]]) -> list[list[int]]:
+    "Groups items that share a part, directly or through other items (union-find)"
+    parent = list(range(len(rows)))
+
+    def find(j: int) -> int:
+        while parent[j] != j:
+            parent[j] = parent[parent[j]]
+            j = parent[j]
+        return j
+
+    owner: dict[int, int] = {}
+    for j, row in enumerate(rows):
+        for part, _ in row:
+            if part in owner:
+                a, b = find(owner[part]), find(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                owner[part] = j
+
+    groups: dict[int, list[int]] = {}
+    for j in range(len(rows)):
+        groups.setdefault(find(j), []).append(j)
+    return list(groups.values())
+
+
+def _solve_component(
+    profits: list[float], rows: list[tuple], capacity: list[int], max_nodes: int, deadline: Optional[float]
+) -> tuple[list[int], float, int, bool, float]:
+    # Module-level so it can be pickled into worker processes.
+    search = _BranchAndBound(profits, rows, capacity, max_nodes, deadline)
+    search.run()
+    return search.best_selection, search.best_profit, search.nodes, search.completed, search.root_bound
+
+
+def _merge_row(row: Requirement) -> tuple[tuple[int, int], ...]:
+    merged: dict[int, int] = {}
+    for part, qty in row:
+        merged[part] = merged.get(part, 0) + qty
+    return tuple((part, qty) for part, qty in merged.items() if qty > 0)
+
+
+def _surrogate_weights(
+    profits: list[float], rows: list[tuple], capacity: list[int], rounds: int = SURROGATE_ROUNDS
+) -> list[float]:
+    """
+    Multipliers for the surrogate constraint sum_k w_k * use_k <= sum_k w_k * stock_k.
+    Starts from w_k = 1 / stock_k and repeatedly raises the weight of parts the
+    fractional solution overuses, keeping the weights with the tightest bound.
+    """
+    weights = [1.0 / cap for cap in capacity]
+    best_weights, best_bound = weights, float("inf")
+    for step in range(rounds):
+        sizes = [sum(weights[k] * qty for k, qty in row) for row in rows]
+        room = sum(w * cap for w, cap in zip(weights, capacity))
+        usage = [0.0] * len(capacity)
+        bound = 0.0
+        for j in sorted(range(len(rows)), key=lambda j: -profits[j] / sizes[j]):
+            share = min(1.0, room / sizes[j])
+            bound += profits[j] * share
+            for k, qty in rows[j]:
+                usage[k] += qty * share
+            room -= sizes[j] * share
+            if share < 1.0:
+                break
+        if bound < best_bound:
+            best_weights, best_bound = weights, bound
+        rate = 1.0 / (1 + step) ** 0.5
+        weights = [w * max(used / cap, 1e-3) ** rate for w, used, cap in zip(weights, usage, capacity)]
+        scale = len(capacity) / sum(w * cap for w, cap in zip(weights, capacity))
+        weights = [w * scale for w in weights]
+    return best_weights
+
+
+class _BranchAndBound:
+    """Depth-first branch-and-bound over items sorted by surrogate efficiency."""
+
+    def __init__(
+        self, profits: list[float], rows: list[tuple], capacity: list[int], max_nodes: int,
+        deadline: Optional[float] = None,
+    ):
+        weights = _surrogate_weights(profits, rows, capacity)
+        sizes = [sum(weights[k] * qty for k, qty in row) for row in rows]
+
+        order = sorted(range(len(profits)), key=lambda j: (-profits[j] / sizes[j], -profits[j], j))
+        self.items = order
+        self.profits = [profits[j] for j in order]
+        self.rows = [rows[j] for j in order]
+        self.sizes = [sizes[j] for j in order]
+        self.residual = list(capacity)
+        self.room = sum(w * cap for w, cap in zip(weights, capacity))
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+
+        # Users of every part sorted by the quantity they need, so the items a
+        # reservation pushes out of stock are a contiguous slice.
+        users: list[list[tuple[int, int]]] = [[] for _ in capacity]
+        for j, row in enumerate(self.rows):
+            for k, qty in row:
+                users[k].append((qty, j))
+        for entries in users:
+            entries.sort()
+        self.user_needs = [[qty for qty, _ in entries] for entries in users]
+        self.user_items = [[j for _, j in entries] for entries in users]
+
+        self.dominated = self._dominance_lists()
+        # Number of reasons an item cannot be taken at the current node: parts
+        # out of stock or an excluded item that dominates it. Unblocked items
+        # are mirrored in a Fenwick tree so the LP bound is O(log n) per node.
+        self.blocked = [0] * len(order)
+        self.open_items = _FenwickTree(self.sizes, self.profits)
+
+        self.nodes = 0
+        self.completed = True
+        self.best_profit = 0.0
+        self.best_selection: list[int] = []
+        self.root_bound = 0.0
+
+    def run(self) -> None:
+        self._warm_start()
+        self.root_bound = self._bound(0, 0.0)
+        if self.root_bound <= self.best_profit + _EPSILON:
+            return
+        if self.deadline is not None and monotonic() >= self.deadline:
+            self.completed = False
+            return
+        self._search()
+
+    def _warm_start(self) -> None:
+        # Greedy passes by efficiency and by raw profit; keep the better one.
+        by_profit = sorted(range(len(self.items)), key=lambda j: (-self.profits[j], j))
+        for sequence in (range(len(self.items)), by_profit):
+            residual = list(self.residual)
+            profit = 0.0
+            chosen = []
+            for j in sequence:
+                row = self.rows[j]
+                if all(residual[k] >= qty for k, qty in row):
+                    for k, qty in row:
+                        residual[k] -= qty
+                    profit += self.profits[j]
+                    chosen.append(j)
+            if profit > self.best_profit:
+                self.best_profit = profit
+                self.best_selection = [self.items[j] for j in chosen]
+
+    def _dominance_lists(self) -> list[list[int]]:
+        """
+        Item `j` is dominated by item `i` when `i` earns at least as much and
+        needs no more of any part. If `i` is left out of a plan, `j` can be left
+        out as well: swapping `j` for `i` keeps the plan feasible and no worse.
+        """
+        user_sets = [set(items) for items in self.user_items]
+        needs = [dict(row) for row in self.rows]
+        dominated: list[list[int]] = [[] for _ in self.rows]
+        for i, need in enumerate(needs):
+            parts = sorted(need, key=lambda k: len(user_sets[k]))
+            candidates = user_sets[parts[0]].intersection(*(user_sets[k] for k in parts[1:]))
+            for j in candidates:
+                if j == i or self.profits[j] > self.profits[i]:
+                    continue
+                if self.profits[j] == self.profits[i] and j < i:
+                    continue
+                other = needs[j]
+                if all(other[k] >= qty for k, qty in need.items()):
+                    dominated[i].append(j)
+            dominated[i].sort()
+        return dominated
+
+    def _bound(self, start: int, profit: float) -> float:
+        # Dantzig bound of the surrogate knapsack over the unblocked items past
+        # `start`: take them in efficiency order, the critical one fractionally.
+        skipped_size, skipped_profit = self.open_items.prefix(start)
+        target = skipped_size + self.room
+        end, filled_size, filled_profit = self.open_items.search(target)
+        bound = profit + filled_profit - skipped_profit
+        if end < len(self.items):
+            bound += self.profits[end] * (target - filled_size) / self.sizes[end]
+        return bound
+
+    def _block(self, j: int) -> None:
+        if not self.blocked[j]:
+            self.open_items.add(j, -self.sizes[j], -self.profits[j])
+        self.blocked[j] += 1
+
+    def _unblock(self, j: int) -> None:
+        self.blocked[j] -= 1
+        if not self.blocked[j]:
+            self.open_items.add(j, self.sizes[j], self.profits[j])
+
+    def _take(self, j: int) -> list[int]:
+        residual = self.residual
+        pushed_out = []
+        for k, qty in self.rows[j]:
+            before = residual[k]
+            after = before - qty
+            residual[k] = after
+            needs = self.user_needs[k]
+            items = self.user_items[k]
+            for t in range(bisect_right(needs, after), bisect_right(needs, before)):
+                self._block(items[t])
+                pushed_out.append(items[t])
+        self.room -= self.sizes[j]
+        return pushed_out
+
+    def _release(self, j: int, pushed_out: list[int]) -> None:
+        for k, qty in self.rows[j]:
+            self.residual[k] += qty
+        for t in pushed_out:
+            self._unblock(t)
+        self.room += self.sizes[j]
+
+    def _search(self) -> None:
+        n = len(self.items)
+        blocked = self.blocked
+        pushed_out: list[list[int] | None] = [None] * n
+        chosen: list[int] = []
+        profit = 0.0
+        # Each frame is [depth, phase]: 0 = enter, 1 = exclude branch, 2 = leave.
+        frames = [[0, 0]]
+        while frames:
+            frame = frames[-1]
+            depth, phase = frame
+            if phase == 0:
+                self.nodes += 1
+                if profit > self.best_profit + _EPSILON:
+                    self.best_profit = profit
+                    self.best_selection = [self.items[j] for j in chosen]
+                if self.nodes >= self.max_nodes or (
+                    self.deadline is not None
+                    and self.nodes % _CLOCK_INTERVAL == 0
+                    and monotonic() >= self.deadline
+                ):
+                    self.completed = False
+                    break
+                if depth == n or self._bound(depth, profit) <= self.best_profit + _EPSILON:
+                    frames.pop()
+                    continue
+                frame[1] = 1
+                if not blocked[depth]:
+                    pushed_out[depth] = self._take(depth)
+                    profit += self.profits[depth]
+                    chosen.append(depth)
+                    frames.append([depth + 1, 0])
+                    continue
+            if frame[1] == 1:
+                if pushed_out[depth] is not None:
+                    self._release(depth, pushed_out[depth])
+                    pushed_out[depth] = None
+                    profit -= self.profits[depth]
+                    chosen.pop()
+                frame[1] = 2
+                for j in self.dominated[depth]:
+                    self._block(j)
+                frames.append([depth + 1, 0])
+                continue
+            for j in self.dominated[depth]:
+                self._unblock(j)
+            frames.pop()
+
+
+class _FenwickTree:
+    """Prefix sums of item sizes and profits with point updates."""
+
+    def __init__(self, sizes: list[float], profits: list[float]):
+        n = len(sizes)
+        self.sizes = [0.0] * (n + 1)
+        self.profits = [0.0] * (n + 1)
+        for i in range(1, n + 1):
+            self.sizes[i] += sizes[i - 1]
+            self.profits[i] += profits[i - 1]
+            parent = i + (i & -i)
+            if parent <= n:
+                self.sizes[parent] += self.sizes[i]
+                self.profits[parent] += self.profits[i]
+        self.top = 1 << n.bit_length()
+
+    def add(self, index: int, size: float, profit: float) -> None:
+        i = index + 1
+        n = len(self.sizes) - 1
+        while i <= n:
+            self.sizes[i] += size
+            self.profits[i] += profit
+            i += i & -i
+
+    def prefix(self, count: int) -> tuple[float, float]:
+        size = profit = 0.0
+        i = count
+        while i > 0:
+            size += self.sizes[i]
+            profit += self.profits[i]
+            i -= i & -i
+        return size, profit
+
+    def search(self, target: float) -> tuple[int, float, float]:
+        """Largest `count` whose size prefix fits in `target`, with its sums."""
+        n = len(self.sizes) - 1
+        count = 0
+        size = profit = 0.0
+        step = self.top
+        while step:
+            nxt = count + step
+            if nxt <= n and size + self.sizes[nxt] <= target:
+                count = nxt
+                size += self.sizes[nxt]
+                profit += self.profits[nxt]
+            step >>= 1
+        return count, size, profit
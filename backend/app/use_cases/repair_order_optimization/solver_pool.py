@@ -0,0 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Optional
+import multiprocessing
+import os
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_solver_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool the optimizer solves independent components on, created on
+    first use. OPTIMIZER_WORKERS sets its size (default: one per CPU); with a
+    single worker components are solved in the calling thread instead.
+    """
+    global _pool
+    workers = int(os.getenv("OPTIMIZER_WORKERS", os.cpu_count() or 1))
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the server's threads and locks.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
@@ -13,15 +13,20 @@ from app.domain.exceptions import (
     InventoryPartValidationException,
 )
 from datetime import datetime
+from typing import Iterable, Optional
+from app.use_cases.repair_order_optimization.live_plan import LiveOptimizationPlan
+from app.use_cases.pagination import decode_page_cursor, encode_page_cursor
 
 class RepairOrderPartUseCase:
     def __init__(self,
                  repair_order_part_repo: RepairOrderPartRepository,
                  repair_order_repo: RepairOrderRepository,
-                 part_repo: InventoryPartRepository):
+                 part_repo: InventoryPartRepository,
+                 live_plan: Optional[LiveOptimizationPlan] = None):
         self.repair_order_part_repo = repair_order_part_repo
         self.repair_order_repo = repair_order_repo
         self.part_repo = part_repo
+        self.live_plan = live_plan
 
     def create_repair_order_part(self, repair_order_part: RepairOrderPartCreate) -> RepairOrderPartRead:
         if repair_order_part.quantity <= 0:
@@ -40,11 +45,14 @@ class RepairOrderPartUseCase:
             repair_order_id=repair_order_part.repair_order_id,
             part_id=repair_order_part.part_id,
             quantity=repair_order_part.quantity,
-            is_active=repair_order_part.is_active,
+            is_active=True,
             created_at=datetime.now(),
             updated_at=datetime.now(),
         )
-        orm_repair_order_part = self.repair_order_part_repo.add(new_repair_order_part)
+        with self.repair_order_repo.unit_of_work():
+            orm_repair_order_part = self.repair_order_part_repo.add(new_repair_order_part)
+            self.repair_order_repo.refresh_totals([repair_order_part.repair_order_id])
+        self.refresh_live_plan(self.repair_order_repo.get_by_id(repair_order_part.repair_order_id))
         return RepairOrderPartRead.model_validate(orm_repair_order_part)
 
     def get_repair_order_part_by_id(self, repair_order_part_id: UUID) -> RepairOrderPartRead:
@@ -53,76 +61,103 @@ class RepairOrderPartUseCase:
             raise RepairOrderPartNotFoundException(repair_order_part_id)
         return RepairOrderPartRead.model_validate(repair_order_part)
 
-    def get_all_repair_order_parts(self) -> list[RepairOrderPartRead]:
-        return [RepairOrderPartRead.model_validate(order) for order in self.repair_order_part_repo.get_all()]
+    def get_repair_order_parts_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        repair_order_id: Optional[UUID] = None,
+        is_active: Optional[bool] = None,
+    ) -> tuple[list[RepairOrderPartRead], Optional[str]]:
+        page = self.repair_order_part_repo.get_page(
+            limit, decode_page_cursor(cursor), repair_order_id=repair_order_id, is_active=is_active
+        )
+        return [RepairOrderPartRead.model_validate(line) for line in page.items], encode_page_cursor(page.next_after)
 
    
     def update_repair_order_part(self, repair_order_part_id: UUID, data: RepairOrderPartUpdate) -> RepairOrderPartRead:
         if data.quantity <= 0:
             raise RepairOrderPartValidationException("Quantity must be greater than zero.")
 
-        updated_repair_order_part = self.repair_order_part_repo.update(repair_order_part_id, data.model_dump(exclude_unset=True))
-        if not updated_repair_order_part:
-            raise RepairOrderPartNotFoundException(repair_order_part_id)
+        with self.repair_order_repo.unit_of_work():
+            updated_repair_order_part = self.repair_order_part_repo.update(repair_order_part_id, data.model_dump(exclude_unset=True))
+            if not updated_repair_order_part:
+                raise RepairOrderPartNotFoundException(repair_order_part_id)
+            self.repair_order_repo.refresh_totals([updated_repair_order_part.repair_order_id])
+        self.refresh_live_plan(self.repair_order_repo.get_by_id(updated_repair_order_part.repair_order_id))
         return RepairOrderPartRead.model_validate(updated_repair_order_part)
 
+    def refresh_live_plan(self, repair_order, part_ids: Iterable[UUID] = ()) -> None:
+        "Pushes the current lines of an order, and the parts whose stock changed, to the live plan"
+        if self.live_plan is None:
+            return
+        lines = [(p.part_id, p.quantity) for p in self.repair_order_part_repo.get_by_order_id(repair_order.id)]
+        part_ids = list(part_ids)
+        parts = self.part_repo.get_by_ids(part_ids) if part_ids else []
+        self.live_plan.refresh(parts=parts, orders=[(repair_order, lines)])
+
     def sync_parts_for_order(self, repair_order_id: UUID, incoming_parts: list[RepairOrderPartRequest]) -> float:
-        "Sync parts for order"
-        total_cost = 0.0
+        """
+        Makes the active lines of the order match `incoming_parts`, moves the
+        stock by the difference with conditional updates and refreshes the
+        order totals, in one unit of work. The parts are loaded with one query.
+        Returns the parts total of the incoming lines.
+        """
+        incoming = {p.part_id: p.quantity for p in incoming_parts}
+        if len(incoming) != len(incoming_parts):
+            raise InventoryPartValidationException("Each part can appear only once in a repair order.")
+        existing = {line.part_id: line for line in self.repair_order_part_repo.get_by_order_id(repair_order_id)}
+        parts = {part.id: part for part in self.part_repo.get_by_ids(incoming)} if incoming else {}
 
-        existing_parts = self.repair_order_part_repo.get_by_order_id(repair_order_id)
-        existing_parts_dict = {p.part_id: p for p in existing_parts}
-        incoming_parts_dict = {p.part_id: p for p in incoming_parts}
-        for part_input in incoming_parts:
-            part_id = part_input.part_id
-            part = self.part_repo.get_by_id(part_id)
+        total_cost = 0.0
+        new_lines: list[RepairOrderPart] = []
+        quantities: dict[UUID, int] = {}
+        stock_deltas: dict[UUID, int] = {}
+        for part_id, quantity in incoming.items():
+            part = parts.get(part_id)
             if not part:
                 raise InventoryPartNotFoundException(part_id)
 
-            existing_relation = existing_parts_dict.get(part_id)
-
-            if existing_relation:
-                quantity_diff = part_input.quantity - existing_relation.quantity
-                new_stock = part.stock_quantity - quantity_diff
-                if new_stock < 0:
+            line = existing.get(part_id)
+            if line:
+                quantity_diff = quantity - line.quantity
+                if part.stock_quantity - quantity_diff < 0:
                     raise InventoryPartValidationException(
                         f"Not enough stock for part {part.name}. Needed diff: {quantity_diff}, available: {part.stock_quantity}"
                     )
-
-                self.repair_order_part_repo.update(
-                    existing_relation.id, {"quantity": part_input.quantity}
-                )
-                self.part_repo.update(part.id, {"stock_quantity": new_stock})
+                if quantity_diff:
+                    quantities[line.id] = quantity
             else:
-                if part.stock_quantity < part_input.quantity:
+                quantity_diff = quantity
+                if part.stock_quantity < quantity:
                     raise InventoryPartValidationException(
-                        f"Not enough stock for part {part.name}. Available: {part.stock_quantity}, requested: {part_input.quantity}"
+                        f"Not enough stock for part {part.name}. Available: {part.stock_quantity}, requested: {quantity}"
                     )
-
-                part_relation = RepairOrderPart(
+                new_lines.append(RepairOrderPart(
                     id=uuid.uuid4(),
                     repair_order_id=repair_order_id,
-                    part_id=part_input.part_id,
-                    quantity=part_input.quantity,
+                    part_id=part_id,
+                    quantity=quantity,
                     is_active=True,
                     created_at=datetime.now(),
                     updated_at=datetime.now()
-                )
-                self.repair_order_part_repo.add(part_relation)
-
-                self.part_repo.update(
-                    part.id, {"stock_quantity": part.stock_quantity - part_input.quantity}
-                )
-
-            total_cost += part.final_price * part_input.quantity
-
-        for existing in existing_parts:
-            if existing.part_id not in incoming_parts_dict:
-                part = self.part_repo.get_by_id(existing.part_id)
-                if part:
-                    self.part_repo.update(
-                        part.id, {"stock_quantity": part.stock_quantity + existing.quantity}
+                ))
+            stock_deltas[part_id] = -quantity_diff
+            total_cost += part.final_price * quantity
+
+        removed = [line for part_id, line in existing.items() if part_id not in incoming]
+        for line in removed:
+            stock_deltas[line.part_id] = line.quantity
+
+        with self.repair_order_repo.unit_of_work():
+            # The check above read a stock another edit may change meanwhile; the
+            # conditional moves are what hold. They lock the part rows in id
+            # order, so concurrent edits of the same parts cannot deadlock.
+            for part_id in sorted(stock_deltas):
+                delta = stock_deltas[part_id]
+                if delta and self.part_repo.move_stock(part_id, delta) is None:
+                    raise InventoryPartValidationException(
+                        f"Not enough stock for part {parts[part_id].name}. Requested: {-delta}, taken by another order meanwhile."
                     )
-                self.repair_order_part_repo.delete(existing.id)
-
+            self.repair_order_part_repo.sync_order_lines(new_lines, quantities, [line.id for line in removed])
+            self.repair_order_repo.refresh_totals([repair_order_id])
         return total_cost
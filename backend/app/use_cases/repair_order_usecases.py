@@ -12,13 +12,25 @@ from app.infrastructure.repositories.repair_order_repository import RepairOrderR
 from app.infrastructure.repositories.vehicle_repository import VehicleRepository
 from app.infrastructure.repositories.customer_repository import CustomerRepository
 from uuid import UUID
+from typing import Iterator, Literal
+import csv
+import io
 import uuid
 from datetime import datetime
-from app.adapters.schemas.repair_order import RepairOrderCreate, RepairOrderRead, RepairOrderUpdate
+from typing import Optional
+from app.use_cases.pagination import decode_page_cursor, encode_page_cursor
+from app.adapters.schemas.repair_order import (RepairOrderCreate, RepairOrderRead, RepairOrderUpdate, RepairOrderTotalsRead,
+                                               RepairOrderExportRow)
 from app.adapters.schemas.inventory_part import PartDetailByInventoryPart
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
 from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
 
+# Rows fetched per round trip while exporting, and CSV rows per written chunk.
+EXPORT_BATCH_SIZE = 1000
+
+ExportFormat = Literal["csv", "ndjson"]
+
+
 class RepairOrderUseCase:
     def __init__(self,
                  repair_order_repo: RepairOrderRepository,
@@ -67,8 +79,15 @@ class RepairOrderUseCase:
             raise RepairOrderNotFoundException(repair_order_id)
         return RepairOrderRead.model_validate(repair_order)
 
-    def get_all_repair_orders(self) -> list[RepairOrderRead]:
-        return [RepairOrderRead.model_validate(order) for order in self.repair_order_repo.get_all()]
+    def get_repair_orders_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[RepairOrderStatus] = None,
+        is_active: Optional[bool] = None,
+    ) -> tuple[list[RepairOrderRead], Optional[str]]:
+        page = self.repair_order_repo.get_page(limit, decode_page_cursor(cursor), status=status, is_active=is_active)
+        return [RepairOrderRead.model_validate(order) for order in page.items], encode_page_cursor(page.next_after)
    
     def update_repair_order(self, repair_order_id: UUID, data: RepairOrderUpdate) -> RepairOrderRead:
         self._validate_repair_order(data)
@@ -82,18 +101,27 @@ class RepairOrderUseCase:
         self._validate_status_transition(current_status, next_status)
 
         total_parts_cost = 0
-        if data.parts:
-            total_parts_cost = self.repair_order_part_usecase.sync_parts_for_order(
-                repair_order_id=repair_order_id,
-                incoming_parts=data.parts
-            )
-
-        total_cost = data.labor_cost + total_parts_cost
-        update_payload = data.model_dump(exclude_unset=True)
-        update_payload["total_cost_repair"] = total_cost
-        update_payload.pop("parts", None)
-
-        updated_order = self.repair_order_repo.update(repair_order_id, update_payload)
+        touched_part_ids = set()
+        # Lines, stock, order fields and totals are committed together or not at all.
+        with self.repair_order_repo.unit_of_work():
+            if data.parts:
+                touched_part_ids = {p.part_id for p in self.repair_order_part_repo.get_by_order_id(repair_order_id)}
+                touched_part_ids.update(p.part_id for p in data.parts)
+                total_parts_cost = self.repair_order_part_usecase.sync_parts_for_order(
+                    repair_order_id=repair_order_id,
+                    incoming_parts=data.parts
+                )
+
+            total_cost = data.labor_cost + total_parts_cost
+            update_payload = data.model_dump(exclude_unset=True)
+            update_payload["total_cost_repair"] = total_cost
+            update_payload.pop("parts", None)
+
+            self.repair_order_repo.update(repair_order_id, update_payload)
+            # Labor cost may have changed and lines kept outside `parts` still count.
+            self.repair_order_repo.refresh_totals([repair_order_id])
+        updated_order = self.repair_order_repo.get_by_id(repair_order_id)
+        self.repair_order_part_usecase.refresh_live_plan(updated_order, touched_part_ids)
         return RepairOrderRead.model_validate(updated_order)
 
     def update_repair_order_status(self, repair_order_id: UUID, data: RepairOrderUpdateStatusRequest) -> RepairOrderRead:
@@ -104,6 +132,7 @@ class RepairOrderUseCase:
         self._validate_status_transition(existing_order.status, data.status)
         update_payload = data.model_dump(exclude_unset=True)
         updated_order = self.repair_order_repo.update(repair_order_id, update_payload)
+        self.repair_order_part_usecase.refresh_live_plan(updated_order)
         return RepairOrderRead.model_validate(updated_order)
 
     def _validate_status_transition(self, current_status: RepairOrderStatus, next_status: RepairOrderStatus):
@@ -133,25 +162,62 @@ class RepairOrderUseCase:
         repair_orders = self.repair_order_repo.get_by_vehicle_id(vehicle_id)
         return [RepairOrderRead.model_validate(order) for order in repair_orders]
 
+    def get_most_profitable_pending_orders(self, limit: int) -> list[RepairOrderRead]:
+        return [RepairOrderRead.model_validate(order) for order in self.repair_order_repo.get_most_profitable_pending(limit)]
+
+    def export_repair_orders(
+        self,
+        export_format: ExportFormat = "csv",
+        status: Optional[RepairOrderStatus] = None,
+        is_active: Optional[bool] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Iterator[str]:
+        "Serializes the matching orders as CSV (with a header line) or NDJSON while they are read"
+        rows = (
+            RepairOrderExportRow.model_validate(row)
+            for row in self.repair_order_repo.stream_export_rows(
+                batch_size, status=status, is_active=is_active, date_from=date_from, date_to=date_to
+            )
+        )
+        if export_format == "ndjson":
+            return (row.model_dump_json() + "\n" for row in rows)
+        return self._csv_chunks(rows, batch_size)
+
+    def _csv_chunks(self, rows: Iterator[RepairOrderExportRow], batch_size: int) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RepairOrderExportRow.model_fields)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row.model_dump(mode="json").values())
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
     def get_parts_used_in_order(self, repair_order_id: UUID) -> list[PartDetailByInventoryPart]:
         order = self.repair_order_repo.get_by_id(repair_order_id)
         if not order:
             raise RepairOrderNotFoundException(repair_order_id)
 
-        relations = self.repair_order_part_repo.get_all_by_order_id(repair_order_id)
-        
-        result = []
-        for rel in relations:
-            part = self.inventory_part_repo.get_by_id(rel.part_id)
-            if not part:
-                continue  
-            result.append(PartDetailByInventoryPart(
-                id=part.id,
-                name=part.name,
-                description=part.description,
-                cost=part.cost,
-                final_price=part.final_price,
-                quantity_used=rel.quantity
-            ))
-        return result
+        return [
+            PartDetailByInventoryPart(**row._mapping)
+            for row in self.repair_order_part_repo.get_part_details_by_order_id(repair_order_id)
+        ]
+
+    def get_repair_order_totals(self, repair_order_id: UUID) -> RepairOrderTotalsRead:
+        totals = self.repair_order_repo.get_order_totals([repair_order_id])
+        if not totals:
+            raise RepairOrderNotFoundException(repair_order_id)
+        _, labor_cost, parts_total, parts_profit = totals[0]
+        return RepairOrderTotalsRead(
+            repair_order_id=repair_order_id,
+            labor_cost=labor_cost,
+            parts_total=round(parts_total, 2),
+            parts_profit=round(parts_profit, 2),
+            total_cost_repair=round(labor_cost + parts_total, 2),
+            expected_profit=round(labor_cost + parts_profit, 2),
+        )
         
\ No newline at end of file
@@ -5,22 +5,25 @@ from app.adapters.schemas.vehicle import (
     VehicleUpdate,
     VehicleRead
 )
-from app.infrastructure.repositories.vehicle_repository import VehicleRepository
-from app.infrastructure.repositories.customer_repository import CustomerRepository
+from app.adapters.schemas.bulk import BulkCreateResponse
+from app.infrastructure.repositories.vehicle_repository import AsyncVehicleRepository
+from app.infrastructure.repositories.customer_repository import AsyncCustomerRepository
 import uuid
+from app.use_cases.bulk_create import BulkCreateErrors
+from app.use_cases.pagination import decode_page_cursor, encode_page_cursor
 from app.domain.exceptions import VehicleDuplicateException, VehicleNotFoundException, VehicleValidationException, CustomerNotFoundException
 
 class VehicleUseCase:
-    def __init__(self, repository: VehicleRepository, customer_repo: CustomerRepository):
+    def __init__(self, repository: AsyncVehicleRepository, customer_repo: AsyncCustomerRepository):
         self.repository = repository
         self.customer_repo = customer_repo
 
-    def create_vehicle(self, vehicle_data: VehicleCreate) -> VehicleRead:
-        if vehicle_data.license_plate and self.repository.get_by_license_plate(vehicle_data.license_plate):
+    async def create_vehicle(self, vehicle_data: VehicleCreate) -> VehicleRead:
+        if vehicle_data.license_plate and await self.repository.get_by_license_plate(vehicle_data.license_plate):
             raise VehicleDuplicateException("license_plate", vehicle_data.license_plate)
         if not vehicle_data.customer_id:
             raise VehicleValidationException("Customer ID is required.")
-        if not self.customer_repo.get_by_id(vehicle_data.customer_id):
+        if not await self.customer_repo.get_by_id(vehicle_data.customer_id):
             raise CustomerNotFoundException(vehicle_data.customer_id)
     
         new_vehicle = Vehicle(
@@ -33,32 +36,65 @@ class VehicleUseCase:
             customer_id=vehicle_data.customer_id,
             is_active=True,
         )
-        orm_vehicle = self.repository.add(new_vehicle)
+        orm_vehicle = await self.repository.add(new_vehicle)
         return VehicleRead.model_validate(orm_vehicle)
 
-    def get_vehicle_by_id(self, vehicle_id: uuid.UUID) -> Optional[VehicleRead]:
-        vehicle = self.repository.get_by_id(vehicle_id)
+    async def create_vehicles(self, items: List[VehicleCreate]) -> BulkCreateResponse:
+        """
+        Creates the valid rows of the payload in one insert and reports the
+        others by index. Plates and customers are checked with one query each.
+        """
+        errors = BulkCreateErrors()
+        plates = [item.license_plate for item in items]
+        errors.check_unique(
+            "license_plate", plates, await self.repository.get_existing_values("license_plate", plates), VehicleDuplicateException
+        )
+        customers = await self.customer_repo.get_existing_values("id", [item.customer_id for item in items])
+        for index, item in enumerate(items):
+            if item.customer_id not in customers:
+                errors.add(index, str(CustomerNotFoundException(item.customer_id)))
+
+        new_vehicles = [
+            Vehicle(
+                id=uuid.uuid4(),
+                brand=items[index].brand,
+                model=items[index].model,
+                year=items[index].year,
+                license_plate=items[index].license_plate,
+                color=items[index].color,
+                customer_id=items[index].customer_id,
+                is_active=True,
+            )
+            for index in errors.accepted(len(items))
+        ]
+        await self.repository.add_many(new_vehicles)
+        return errors.response([vehicle.id for vehicle in new_vehicles])
+
+    async def get_vehicle_by_id(self, vehicle_id: uuid.UUID) -> Optional[VehicleRead]:
+        vehicle = await self.repository.get_by_id(vehicle_id)
         if not vehicle:
             raise VehicleNotFoundException(vehicle_id)
         return VehicleRead.model_validate(vehicle)
 
-    def get_all_vehicles(self) -> List[VehicleRead]:
-        vehicles = self.repository.get_all()
-        return [VehicleRead.model_validate(v) for v in vehicles]
+    async def get_vehicles_page(
+        self, limit: int, cursor: Optional[str] = None, is_active: Optional[bool] = None
+    ) -> tuple[List[VehicleRead], Optional[str]]:
+        page = await self.repository.get_page(limit, decode_page_cursor(cursor), is_active=is_active)
+        return [VehicleRead.model_validate(v) for v in page.items], encode_page_cursor(page.next_after)
 
-    def update_vehicle(self, vehicle_id: uuid.UUID, data: VehicleUpdate) -> Optional[VehicleRead]:
+    async def update_vehicle(self, vehicle_id: uuid.UUID, data: VehicleUpdate) -> Optional[VehicleRead]:
         if not data.customer_id:
             raise VehicleValidationException("Customer ID is required.")
-        if not self.customer_repo.get_by_id(data.customer_id):
+        if not await self.customer_repo.get_by_id(data.customer_id):
             raise CustomerNotFoundException(data.customer_id)
-        updated_vehicle = self.repository.update(vehicle_id, data.model_dump(exclude_unset=True))
+        updated_vehicle = await self.repository.update(vehicle_id, data.model_dump(exclude_unset=True))
         if not updated_vehicle:
             raise VehicleNotFoundException(vehicle_id)
         return VehicleRead.model_validate(updated_vehicle)
 
-    def disable_vehicle(self, vehicle_id: uuid.UUID) -> bool:
-        return self.repository.disable(vehicle_id)
+    async def disable_vehicle(self, vehicle_id: uuid.UUID) -> bool:
+        return await self.repository.disable(vehicle_id)
 
-    def get_vehicles_by_customer_id(self, customer_id: uuid.UUID) -> List[VehicleRead]:
-        vehicles = self.repository.get_vehicles_by_customer_id(customer_id)
+    async def get_vehicles_by_customer_id(self, customer_id: uuid.UUID) -> List[VehicleRead]:
+        vehicles = await self.repository.get_vehicles_by_customer_id(customer_id)
         return [VehicleRead.model_validate(v) for v in vehicles]
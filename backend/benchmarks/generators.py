@@ -0,0 +1,167 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert, inspect
+from sqlalchemy.engine import Engine
+from app.domain.enums import RepairOrderStatus
+from app.infrastructure.db.models import (Base, Customer as CustomerORM, Vehicle as VehicleORM, InventoryPart as InventoryPartORM,
+                                          RepairOrder as RepairOrderORM, RepairOrderPart as RepairOrderPartORM)
+
+ORDERS_PER_CUSTOMER = 20
+_INSERT_CHUNK = 10_000
+
+
+@dataclass(frozen=True)
+class BacklogSpec:
+    orders: int
+    parts: int
+    # Average number of distinct parts per order (at least 1).
+    parts_per_order: float = 2.0
+    # Total demand of a part divided by its stock: 1.0 means every order fits,
+    # 2.0 means only about half of the demand can be served.
+    contention: float = 1.5
+    # Zipf-like exponent of part popularity; 0 picks parts uniformly.
+    skew: float = 0.0
+    seed: int = 0
+
+    @property
+    def label(self) -> str:
+        return (f"orders={self.orders} parts={self.parts} ppo={self.parts_per_order} "
+                f"contention={self.contention} skew={self.skew} seed={self.seed}")
+
+
+@dataclass
+class Backlog:
+    spec: BacklogSpec
+    part_ids: list[uuid.UUID]
+    stock: np.ndarray
+    cost: np.ndarray
+    final_price: np.ndarray
+    order_ids: list[uuid.UUID]
+    labor_cost: np.ndarray
+    # Lines of order i are line_part/line_qty[line_start[i]:line_start[i + 1]].
+    line_start: np.ndarray
+    line_part: np.ndarray
+    line_qty: np.ndarray
+
+    def requirements(self) -> list[list[tuple[int, int]]]:
+        "Order rows as (part index, quantity) pairs, the solver's input format"
+        parts, qtys = self.line_part.tolist(), self.line_qty.tolist()
+        starts = self.line_start.tolist()
+        return [list(zip(parts[starts[i]:starts[i + 1]], qtys[starts[i]:starts[i + 1]])) for i in range(len(self.order_ids))]
+
+    def profits(self) -> np.ndarray:
+        return self._line_sums(self.final_price - self.cost) + self.labor_cost
+
+    def parts_totals(self) -> np.ndarray:
+        return self._line_sums(self.final_price)
+
+    def _line_sums(self, unit_value: np.ndarray) -> np.ndarray:
+        "Sum of quantity * unit value of the part over the lines of each order"
+        order_of_line = np.repeat(np.arange(len(self.order_ids)), np.diff(self.line_start))
+        return np.bincount(order_of_line, weights=self.line_qty * unit_value[self.line_part], minlength=len(self.order_ids))
+
+
+def _uuids(rng: np.random.Generator, count: int) -> list[uuid.UUID]:
+    raw = rng.bytes(16 * count)
+    return [uuid.UUID(bytes=raw[16 * i:16 * i + 16], version=4) for i in range(count)]
+
+
+def generate_backlog(spec: BacklogSpec) -> Backlog:
+    "Builds a pending backlog; the same spec always yields the same data"
+    if spec.orders < 1 or spec.parts < 1 or spec.parts_per_order < 1 or spec.contention <= 0:
+        raise ValueError(f"invalid backlog spec: {spec.label}")
+    rng = np.random.default_rng(spec.seed)
+
+    popularity = 1.0 / np.arange(1, spec.parts + 1) ** spec.skew
+    popularity /= popularity.sum()
+
+    counts = np.minimum(1 + rng.poisson(spec.parts_per_order - 1, spec.orders), spec.parts)
+    line_start = np.concatenate(([0], np.cumsum(counts)))
+    line_part = rng.choice(spec.parts, size=int(line_start[-1]), p=popularity)
+    # Parts repeated within an order are merged by the optimizer; keep them as
+    # separate lines, the same way the API would store them.
+    line_qty = rng.integers(1, 4, size=len(line_part))
+
+    demand = np.bincount(line_part, weights=line_qty, minlength=spec.parts)
+    stock = np.floor(demand / spec.contention).astype(np.int64)
+    cost = np.round(rng.uniform(5, 200, spec.parts), 2)
+    final_price = np.round(cost * rng.uniform(1.1, 2.0, spec.parts), 2)
+    labor_cost = np.round(rng.uniform(20, 300, spec.orders), 2)
+
+    return Backlog(
+        spec=spec,
+        part_ids=_uuids(rng, spec.parts),
+        stock=stock,
+        cost=cost,
+        final_price=final_price,
+        order_ids=_uuids(rng, spec.orders),
+        labor_cost=labor_cost,
+        line_start=line_start,
+        line_part=line_part,
+        line_qty=line_qty,
+    )
+
+
+def _insert(connection, table, rows) -> None:
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        connection.execute(insert(table), rows[start:start + _INSERT_CHUNK])
+
+
+def reset_schema(engine: Engine, drop_existing: bool = False) -> None:
+    """
+    Creates the application tables. A database that already has tables is
+    refused unless `drop_existing`, in which case the application tables are
+    dropped first.
+    """
+    existing = inspect(engine).get_table_names()
+    if existing:
+        if not drop_existing:
+            raise ValueError(
+                f"{engine.url.render_as_string(hide_password=True)} already has tables "
+                f"({', '.join(sorted(existing)[:5])}); pass --drop-existing to drop them"
+            )
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def load_backlog(engine: Engine, backlog: Backlog) -> None:
+    "Writes the backlog, with the customers and vehicles its orders need, in bulk"
+    rng = np.random.default_rng(backlog.spec.seed + 1)
+    customers = max(1, len(backlog.order_ids) // ORDERS_PER_CUSTOMER)
+    customer_ids = _uuids(rng, customers)
+    vehicle_ids = _uuids(rng, customers)
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        _insert(connection, CustomerORM.__table__, [
+            {"id": customer_id, "name": f"Customer {i}", "phone": f"{i:011d}", "address": "Bench St", "is_active": True}
+            for i, customer_id in enumerate(customer_ids)
+        ])
+        _insert(connection, VehicleORM.__table__, [
+            {"id": vehicle_id, "customer_id": customer_id, "license_plate": f"BENCH-{i}", "model": "Bench",
+             "brand": "Bench", "color": "gray", "year": 2020, "is_active": True}
+            for i, (vehicle_id, customer_id) in enumerate(zip(vehicle_ids, customer_ids))
+        ])
+        _insert(connection, InventoryPartORM.__table__, [
+            {"id": part_id, "name": f"Part {i}", "stock_quantity": stock, "cost": cost,
+             "final_price": price, "is_active": True}
+            for i, (part_id, stock, cost, price) in enumerate(zip(
+                backlog.part_ids, backlog.stock.tolist(), backlog.cost.tolist(), backlog.final_price.tolist()))
+        ])
+        _insert(connection, RepairOrderORM.__table__, [
+            {"id": order_id, "customer_id": customer_ids[i % customers], "vehicle_id": vehicle_ids[i % customers],
+             "status": RepairOrderStatus.PENDING, "labor_cost": labor, "total_cost_repair": labor + parts_total,
+             "parts_total": parts_total, "expected_profit": profit, "date_in": now,
+             "created_at": now, "updated_at": now, "is_active": True}
+            for i, (order_id, labor, parts_total, profit) in enumerate(zip(
+                backlog.order_ids, backlog.labor_cost.tolist(), backlog.parts_totals().tolist(), backlog.profits().tolist()))
+        ])
+        order_of_line = np.repeat(np.arange(len(backlog.order_ids)), np.diff(backlog.line_start)).tolist()
+        line_ids = _uuids(rng, len(order_of_line))
+        _insert(connection, RepairOrderPartORM.__table__, [
+            {"id": line_id, "repair_order_id": backlog.order_ids[order], "part_id": backlog.part_ids[part],
+             "quantity": qty, "created_at": now, "updated_at": now, "is_active": True}
+            for line_id, order, part, qty in zip(line_ids, order_of_line, backlog.line_part.tolist(), backlog.line_qty.tolist())
+        ])
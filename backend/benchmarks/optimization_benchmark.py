@@ -0,0 +1,310 @@
+"""
+Benchmarks SelectRepairOrdersByProfitUseCase and the calculate_order_profit
+valuation on generated backlogs and writes the measurements as JSON.
+
+    python -m benchmarks.optimization_benchmark --preset smoke --output bench.json
+    python -m benchmarks.optimization_benchmark --orders 100000 --parts 5000 \\
+        --contention 1.2 2.0 --parts-per-order 2 4 --baseline bench.json
+
+Every case gets a fresh database (a temporary SQLite file unless
+--database-url is given), so runs are independent and reproducible. A
+--database-url that already has tables is refused unless --drop-existing is
+passed, which drops its application tables.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Optional
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases.repair_order_optimization.calculate_order_profit import calculate_orders_profit
+from app.use_cases.repair_order_optimization.inventory_snapshot import InventorySnapshot
+from app.use_cases.repair_order_optimization.live_plan import LiveOptimizationPlan
+from app.use_cases.repair_order_optimization.requirement_matrix import RequirementMatrix
+from app.use_cases.repair_order_optimization.select_orders_by_profit import SelectRepairOrdersByProfitUseCase
+from app.use_cases.repair_order_optimization.solve_order_selection import solve_order_selection
+from benchmarks.generators import Backlog, BacklogSpec, generate_backlog, load_backlog, reset_schema
+
+PRESETS = {
+    "smoke": dict(orders=[1_000], parts=[100]),
+    "medium": dict(orders=[10_000, 100_000], parts=[1_000, 5_000]),
+    "large": dict(orders=[1_000_000], parts=[50_000]),
+}
+
+# Backlogs up to this size are solved exactly by `exact_profit`, which shares
+# no code with the solver; the use case is scored against that optimum.
+EXACT_MAX_ORDERS = 20
+EXACT_MAX_STATES = 1_000_000
+# Larger backlogs up to this size are searched again with a much larger budget,
+# only to get a tighter upper bound the plan must stay under.
+REFERENCE_MAX_ORDERS = 5_000
+REFERENCE_MAX_NODES = 10_000_000
+REFERENCE_TIME_BUDGET_MS = 5_000
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+@contextmanager
+def measure(counter: QueryCounter, trace_memory: bool):
+    "Collects wall time, SQL statements and (optionally) peak traced memory of the block"
+    stats = {}
+    queries = counter.count
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats["wall_time_s"] = round(time.perf_counter() - start, 4)
+        stats["queries"] = counter.count - queries
+        if trace_memory:
+            stats["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+
+
+def greedy_profit(profits: np.ndarray, requirements: list, stock: np.ndarray) -> float:
+    "First-come-first-served by profit, the selection rule the optimizer replaced"
+    residual = stock.astype(np.int64).copy()
+    total = 0.0
+    for i in np.argsort(-profits, kind="stable").tolist():
+        if profits[i] <= 0:
+            break
+        row = requirements[i]
+        if all(residual[part] >= qty for part, qty in row):
+            for part, qty in row:
+                residual[part] -= qty
+            total += float(profits[i])
+    return total
+
+
+def exact_profit(profits: np.ndarray, requirements: list, stock: np.ndarray) -> Optional[float]:
+    """
+    Best total profit by dynamic programming over the stock left after each
+    order, independent of solve_order_selection. Only parts the kept orders
+    could run short of are part of the state; returns None if the states
+    outgrow EXACT_MAX_STATES.
+    """
+    stock = stock.tolist()
+    rows = []
+    for profit, row in zip(profits.tolist(), requirements):
+        need: dict[int, int] = {}
+        for part, qty in row:
+            need[part] = need.get(part, 0) + qty
+        if profit > 0 and all(qty <= stock[part] for part, qty in need.items()):
+            rows.append((profit, need))
+    demand: dict[int, int] = {}
+    for _, need in rows:
+        for part, qty in need.items():
+            demand[part] = demand.get(part, 0) + qty
+    tracked = {part: k for k, part in enumerate(sorted(p for p, qty in demand.items() if qty > stock[p]))}
+
+    best = {tuple(stock[part] for part in tracked): 0.0}
+    for profit, need in rows:
+        need = [(tracked[part], qty) for part, qty in need.items() if part in tracked]
+        states = dict(best)
+        for residual, value in best.items():
+            if all(residual[k] >= qty for k, qty in need):
+                left = list(residual)
+                for k, qty in need:
+                    left[k] -= qty
+                left = tuple(left)
+                if states.get(left, -1.0) < value + profit:
+                    states[left] = value + profit
+        best = states
+        if len(best) > EXACT_MAX_STATES:
+            return None
+    return max(best.values())
+
+
+def reference_quality(backlog: Backlog) -> dict:
+    profits = backlog.profits()
+    requirements = backlog.requirements()
+    quality = {"greedy_profit": round(greedy_profit(profits, requirements, backlog.stock), 2)}
+    exact = exact_profit(profits, requirements, backlog.stock) if len(backlog.order_ids) <= EXACT_MAX_ORDERS else None
+    if exact is not None:
+        quality["exact_profit"] = round(exact, 2)
+    elif len(backlog.order_ids) <= REFERENCE_MAX_ORDERS:
+        reference = solve_order_selection(
+            profits.tolist(), requirements, backlog.stock.tolist(),
+            max_nodes=REFERENCE_MAX_NODES, time_budget_ms=REFERENCE_TIME_BUDGET_MS,
+        )
+        quality["reference_upper_bound"] = round(reference.upper_bound, 2)
+    return quality
+
+
+def measure_valuation(backlog: Backlog, counter: QueryCounter, trace_memory: bool) -> dict:
+    "Times calculate_orders_profit over the whole backlog as a requirement matrix and inventory snapshot"
+    requirements = RequirementMatrix()
+    for order_id, row in zip(backlog.order_ids, backlog.requirements()):
+        requirements.set_row(order_id, ((backlog.part_ids[part], qty) for part, qty in row))
+    snapshot = InventorySnapshot.from_rows(zip(
+        backlog.part_ids, backlog.stock.tolist(), backlog.cost.tolist(), backlog.final_price.tolist()
+    ))
+    # Rows were added in backlog order, so the labor costs line up with them.
+    with measure(counter, trace_memory) as stats:
+        valuation = calculate_orders_profit(requirements, snapshot, backlog.labor_cost)
+    stats["orders"] = len(requirements.order_ids)
+    stats["per_order_us"] = round(1e6 * stats["wall_time_s"] / max(1, stats["orders"]), 4)
+    stats["matches_backlog"] = bool(np.allclose(valuation.profit, backlog.profits()))
+    return stats
+
+
+def run_case(
+    spec: BacklogSpec,
+    database_url: Optional[str],
+    time_budget_ms: Optional[int],
+    trace_memory: bool,
+    drop_existing: bool = False,
+) -> dict:
+    backlog = generate_backlog(spec)
+    with tempfile.TemporaryDirectory() as directory:
+        url = database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine(url)
+        try:
+            reset_schema(engine, drop_existing)
+        except ValueError:
+            engine.dispose()
+            raise
+        load_backlog(engine, backlog)
+        counter = QueryCounter(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        result = {"case": asdict(spec), "label": spec.label, "lines": int(len(backlog.line_part))}
+        with Session() as db:
+            use_case = SelectRepairOrdersByProfitUseCase(
+                RepairOrderRepository(db), InventoryPartRepository(db), LiveOptimizationPlan()
+            )
+            with measure(counter, trace_memory) as cold:
+                report = use_case.execute_with_report(time_budget_ms=time_budget_ms)
+            with measure(counter, trace_memory) as warm:
+                use_case.execute()
+        result["select_cold"] = cold
+        result["select_warm"] = warm
+        result["calculate_order_profit"] = measure_valuation(backlog, counter, trace_memory)
+        result["quality"] = {
+            "profit": report.total_profit,
+            "upper_bound": report.upper_bound,
+            "optimality_gap": report.optimality_gap,
+            "search_completed": report.search_completed,
+            "selected_orders": len(report.orders),
+            **reference_quality(backlog),
+        }
+        quality = result["quality"]
+        for name in ("exact_profit", "greedy_profit", "reference_upper_bound"):
+            if quality.get(name):
+                quality[f"vs_{name.removesuffix('_profit')}"] = round(quality["profit"] / quality[name], 6)
+        engine.dispose()
+    return result
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    "Cases whose time, query count or profit got worse than the baseline by more than `tolerance`"
+    with open(baseline_path) as handle:
+        baseline = {item["label"]: item for item in json.load(handle)["results"]}
+    regressions = []
+    for item in results:
+        before = baseline.get(item["label"])
+        if before is None:
+            continue
+        checks = [
+            ("select_cold.wall_time_s", before["select_cold"]["wall_time_s"], item["select_cold"]["wall_time_s"], 1),
+            ("select_cold.queries", before["select_cold"]["queries"], item["select_cold"]["queries"], 1),
+            ("calculate_order_profit.wall_time_s", before.get("calculate_order_profit", {}).get("wall_time_s"),
+             item["calculate_order_profit"]["wall_time_s"], 1),
+            ("quality.profit", before["quality"]["profit"], item["quality"]["profit"], -1),
+        ]
+        for metric, old, new, direction in checks:
+            if old and direction * (new - old) / old > tolerance:
+                regressions.append(f"{item['label']}: {metric} {old} -> {new}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="smoke")
+    parser.add_argument("--orders", type=int, nargs="+")
+    parser.add_argument("--parts", type=int, nargs="+")
+    parser.add_argument("--parts-per-order", type=float, nargs="+", default=[2.0])
+    parser.add_argument("--contention", type=float, nargs="+", default=[1.5])
+    parser.add_argument("--skew", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-budget-ms", type=int)
+    parser.add_argument("--database-url", help="Empty database to run against instead of a temporary SQLite file")
+    parser.add_argument("--drop-existing", action="store_true",
+                        help="Drop the application tables of a --database-url that already has tables")
+    parser.add_argument("--trace-memory", action=argparse.BooleanOptionalAction, default=True,
+                        help="Record peak traced memory (slows the measured code down)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    grid = itertools.product(
+        args.orders or preset["orders"], args.parts or preset["parts"],
+        args.parts_per_order, args.contention, args.skew,
+    )
+    results = []
+    for orders, parts, parts_per_order, contention, skew in grid:
+        spec = BacklogSpec(orders, parts, parts_per_order, contention, skew, args.seed)
+        print(f"running {spec.label}", file=sys.stderr)
+        # After the first case the tables are the ones the benchmark created.
+        try:
+            results.append(run_case(spec, args.database_url, args.time_budget_ms, args.trace_memory,
+                                    drop_existing=args.drop_existing or bool(results)))
+        except ValueError as e:
+            parser.error(str(e))
+
+    document = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(document, handle, indent=2, default=str)
+    print(f"wrote {len(results)} cases to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Load test of concurrent repair order edits competing for the same parts.
+
+Every worker thread has its own session and orders, and keeps replacing their
+lines with random quantities of a few shared parts through
+RepairOrderPartUseCase.sync_parts_for_order. Afterwards every part must hold
+its initial stock minus the units on active lines (no lost updates) and never
+less than zero (no oversell).
+
+    python -m benchmarks.stock_contention_benchmark --workers 8 --edits 200 --parts 4
+    python -m benchmarks.stock_contention_benchmark --database-url postgresql://... --workers 32
+
+The run gets a fresh database (a temporary SQLite file unless --database-url
+is given). A --database-url that already has tables is refused unless
+--drop-existing is passed, which drops its application tables.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.adapters.schemas.repair_order_part import RepairOrderPartRequest
+from app.domain.enums import RepairOrderStatus
+from app.domain.exceptions import InventoryPartValidationException
+from app.infrastructure.db.models import (Customer as CustomerORM, Vehicle as VehicleORM,
+                                          InventoryPart as InventoryPartORM, RepairOrder as RepairOrderORM,
+                                          RepairOrderPart as RepairOrderPartORM)
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_part_repository import RepairOrderPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
+from benchmarks.generators import reset_schema
+
+
+def _load(engine, workers: int, orders_per_worker: int, parts: int, stock: int) -> tuple[list[list[uuid.UUID]], list[uuid.UUID]]:
+    customer_id, vehicle_id = uuid.uuid4(), uuid.uuid4()
+    part_ids = [uuid.uuid4() for _ in range(parts)]
+    order_ids = [[uuid.uuid4() for _ in range(orders_per_worker)] for _ in range(workers)]
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(insert(CustomerORM.__table__), [
+            {"id": customer_id, "name": "Load Test", "phone": "00000000000", "address": "Load St", "is_active": True}
+        ])
+        connection.execute(insert(VehicleORM.__table__), [
+            {"id": vehicle_id, "customer_id": customer_id, "license_plate": "LOAD-1", "model": "Load",
+             "brand": "Load", "color": "gray", "year": 2020, "is_active": True}
+        ])
+        connection.execute(insert(InventoryPartORM.__table__), [
+            {"id": part_id, "name": f"Hot part {i}", "stock_quantity": stock, "cost": 10.0, "final_price": 20.0, "is_active": True}
+            for i, part_id in enumerate(part_ids)
+        ])
+        connection.execute(insert(RepairOrderORM.__table__), [
+            {"id": order_id, "customer_id": customer_id, "vehicle_id": vehicle_id, "status": RepairOrderStatus.PENDING,
+             "labor_cost": 50.0, "total_cost_repair": 50.0, "parts_total": 0.0, "expected_profit": 50.0,
+             "date_in": now, "created_at": now, "updated_at": now, "is_active": True}
+            for ids in order_ids for order_id in ids
+        ])
+    return order_ids, part_ids
+
+
+def _worker(Session, order_ids: list[uuid.UUID], part_ids: list[uuid.UUID], edits: int, max_quantity: int,
+            seed: int, counts: dict, lock: threading.Lock) -> None:
+    rng = random.Random(seed)
+    local = {"applied": 0, "rejected": 0, "failed": 0}
+    with Session() as db:
+        use_case = RepairOrderPartUseCase(RepairOrderPartRepository(db), RepairOrderRepository(db), InventoryPartRepository(db))
+        for edit in range(edits):
+            chosen = rng.sample(part_ids, rng.randint(0, len(part_ids)))
+            incoming = [RepairOrderPartRequest(part_id=part_id, quantity=rng.randint(1, max_quantity)) for part_id in chosen]
+            try:
+                use_case.sync_parts_for_order(order_ids[edit % len(order_ids)], incoming)
+                local["applied"] += 1
+            except InventoryPartValidationException:
+                local["rejected"] += 1
+            except OperationalError:
+                # Lock timeouts (SQLite allows one writer at a time); the edit was rolled back.
+                db.rollback()
+                local["failed"] += 1
+    with lock:
+        for key, value in local.items():
+            counts[key] += value
+
+
+def check_stock(engine, part_ids: list[uuid.UUID], stock: int) -> dict:
+    "Parts whose stock does not match the units on active lines (lost updates) or fell below zero (oversold)"
+    used = (
+        select(RepairOrderPartORM.part_id, func.sum(RepairOrderPartORM.quantity).label("used"))
+        .where(RepairOrderPartORM.is_active == True)
+        .group_by(RepairOrderPartORM.part_id)
+        .subquery()
+    )
+    stmt = (
+        select(InventoryPartORM.stock_quantity, func.coalesce(used.c.used, 0))
+        .outerjoin(used, used.c.part_id == InventoryPartORM.id)
+        .where(InventoryPartORM.id.in_(part_ids))
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(stmt).all()
+    return {
+        "lost_updates": sum(1 for current, used_units in rows if current != stock - used_units),
+        "oversold_parts": sum(1 for current, _ in rows if current < 0),
+    }
+
+
+def run_contention(
+    database_url: Optional[str] = None,
+    workers: int = 8,
+    edits: int = 200,
+    parts: int = 4,
+    orders_per_worker: int = 4,
+    stock: int = 50,
+    max_quantity: int = 3,
+    seed: int = 0,
+    drop_existing: bool = False,
+) -> dict:
+    "Runs `workers` threads doing `edits` order edits each and checks the stock left"
+    with tempfile.TemporaryDirectory() as directory:
+        url = database_url or f"sqlite:///{os.path.join(directory, 'contention.db')}"
+        options = {"connect_args": {"timeout": 30}} if url.startswith("sqlite") else {}
+        engine = create_engine(url, pool_size=workers, max_overflow=0, **options)
+        try:
+            reset_schema(engine, drop_existing)
+        except ValueError:
+            engine.dispose()
+            raise
+        order_ids, part_ids = _load(engine, workers, orders_per_worker, parts, stock)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        counts = {"applied": 0, "rejected": 0, "failed": 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=_worker, args=(Session, order_ids[i], part_ids, edits, max_quantity, seed + i, counts, lock))
+            for i in range(workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - start
+
+        result = {
+            "workers": workers,
+            "parts": parts,
+            "edits": workers * edits,
+            **counts,
+            "wall_time_s": round(wall_time, 4),
+            "edits_per_s": round(workers * edits / wall_time, 1),
+            **check_stock(engine, part_ids, stock),
+        }
+        engine.dispose()
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to run against instead of a temporary SQLite file")
+    parser.add_argument("--drop-existing", action="store_true",
+                        help="Drop the application tables of a --database-url that already has tables")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--edits", type=int, default=200, help="Edits per worker")
+    parser.add_argument("--parts", type=int, default=4, help="Parts shared by every order")
+    parser.add_argument("--orders-per-worker", type=int, default=4)
+    parser.add_argument("--stock", type=int, default=50, help="Initial stock of each part")
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the result as JSON to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        result = run_contention(args.database_url, args.workers, args.edits, args.parts,
+                                args.orders_per_worker, args.stock, args.max_quantity, args.seed, args.drop_existing)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(result, handle, indent=2)
+    return 1 if result["lost_updates"] or result["oversold_parts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
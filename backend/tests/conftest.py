@@ -1,12 +1,14 @@
 import pytest
 from app.main import app
 from app.adapters.routers.repair_order_router import get_db
-from tests.test_db import override_get_db, init_test_db
+from app.infrastructure.db.session import get_async_db
+from tests.test_db import override_get_db, override_get_async_db, init_test_db
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     init_test_db()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
 @pytest.fixture
 def db():
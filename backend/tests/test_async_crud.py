@@ -0,0 +1,41 @@
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.infrastructure.db.models import Customer as CustomerORM
+from app.infrastructure.repositories.base_repository import get_change_counter
+
+client = TestClient(app)
+
+def test_customer_and_vehicle_crud_on_async_session():
+    """Test the async customer and vehicle routes end to end, including the customer loaded with each vehicle."""
+    suffix = str(uuid4())[:8]
+    counter = get_change_counter(CustomerORM)
+    response = client.post("/api/v1/customers/create", json={
+        "name": "Rosa Vera", "email": f"rosa.{suffix}@example.com", "phone": f"55{int(suffix, 16) % 10**8:08d}", "address": "9 Main St",
+    })
+    assert response.status_code == 201, response.text
+    customer = response.json()
+    assert customer["is_active"] is True
+    assert get_change_counter(CustomerORM) == counter + 1
+
+    response = client.post("/api/v1/vehicles/create", json={
+        "license_plate": f"ASY {suffix}", "model": "Clio", "brand": "Renault", "year": 2020, "color": "blue",
+        "customer_id": customer["id"],
+    })
+    assert response.status_code == 201, response.text
+    vehicle = response.json()
+    assert vehicle["customer"] == {"id": customer["id"], "name": "Rosa Vera", "is_active": True}
+
+    response = client.put(f"/api/v1/vehicles/update/{vehicle['id']}", json={
+        "license_plate": f"ASY {suffix}", "model": "Clio", "brand": "Renault", "year": 2021, "color": "red",
+        "customer_id": customer["id"],
+    })
+    assert response.status_code == 200, response.text
+    assert (response.json()["year"], response.json()["customer"]["id"]) == (2021, customer["id"])
+
+    by_customer = client.get(f"/api/v1/vehicles/customer/{customer['id']}").json()
+    assert [v["license_plate"] for v in by_customer] == [f"ASY {suffix}"]
+    assert client.get(f"/api/v1/customers/detail/{customer['id']}").json()["name"] == "Rosa Vera"
+    assert client.get(f"/api/v1/customers/detail/{uuid4()}").status_code == 404
+    assert client.patch(f"/api/v1/customers/disable/{customer['id']}").status_code == 200
+    assert customer["id"] not in {c["id"] for c in client.get("/api/v1/customers/list", params={"is_active": True}).json()}
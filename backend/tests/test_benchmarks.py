@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, text
+from benchmarks.generators import BacklogSpec, generate_backlog
+from benchmarks.optimization_benchmark import exact_profit, run_case
+from benchmarks.stock_contention_benchmark import run_contention
+from tests.test_solve_order_selection import _brute_force_profit
+
+
+def test_backlog_generator_is_deterministic():
+    """Test that a spec always produces the same backlog and honours contention."""
+    spec = BacklogSpec(orders=300, parts=40, parts_per_order=3, contention=2.0, skew=1.0, seed=5)
+    first, second = generate_backlog(spec), generate_backlog(spec)
+
+    assert first.order_ids == second.order_ids
+    assert first.line_part.tolist() == second.line_part.tolist()
+    assert first.stock.tolist() == second.stock.tolist()
+    demand = sum(first.line_qty.tolist())
+    assert first.stock.sum() <= demand / 2
+
+
+def test_benchmark_case_reports_time_queries_and_quality():
+    """Test a tiny benchmark run end to end against a temporary database."""
+    result = run_case(BacklogSpec(orders=18, parts=6, contention=1.5), None, None, trace_memory=True)
+
+    assert result["select_cold"]["queries"] > 0 and result["select_cold"]["peak_memory_mb"] > 0
+    quality = result["quality"]
+    assert quality["profit"] == quality["exact_profit"]
+    assert quality["profit"] >= quality["greedy_profit"]
+    valuation = result["calculate_order_profit"]
+    assert (valuation["orders"], valuation["queries"], valuation["matches_backlog"]) == (18, 0, True)
+
+    quality = run_case(BacklogSpec(orders=60, parts=8, contention=1.5), None, None, trace_memory=False)["quality"]
+    assert "exact_profit" not in quality
+    assert quality["greedy_profit"] <= quality["profit"] <= quality["reference_upper_bound"]
+
+
+def test_benchmark_refuses_a_database_that_already_has_tables(tmp_path):
+    """Test that a --database-url with tables is left untouched unless dropping them was asked for."""
+    url = f"sqlite:///{tmp_path / 'existing.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE customers (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO customers (id) VALUES (1)"))
+
+    spec = BacklogSpec(orders=10, parts=4)
+    with pytest.raises(ValueError, match="already has tables"):
+        run_case(spec, url, None, trace_memory=False)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM customers")).scalar() == 1
+
+    with pytest.raises(ValueError, match="already has tables"):
+        run_contention(url, workers=1, edits=1)
+    assert run_case(spec, url, None, trace_memory=False, drop_existing=True)["quality"]["selected_orders"] > 0
+    engine.dispose()
+
+
+def test_exact_reference_matches_brute_force():
+    """Test the benchmark's exact reference against enumerating every subset, on rows repeating a part."""
+    for seed in range(4):
+        backlog = generate_backlog(BacklogSpec(orders=12, parts=5, parts_per_order=3, contention=2.0, seed=seed))
+        profits, requirements = backlog.profits(), backlog.requirements()
+        expected = _brute_force_profit(profits.tolist(), requirements, backlog.stock.tolist())
+        assert abs(exact_profit(profits, requirements, backlog.stock) - expected) < 1e-6
+
+
+def test_concurrent_order_edits_lose_no_stock_updates():
+    """Test that workers editing orders over the same parts at once neither lose stock updates nor oversell."""
+    result = run_contention(workers=4, edits=25, parts=3, orders_per_worker=2, stock=12)
+
+    assert result["applied"] + result["rejected"] + result["failed"] == result["edits"] == 100
+    assert result["applied"] > 0
+    assert (result["lost_updates"], result["oversold_parts"]) == (0, 0)
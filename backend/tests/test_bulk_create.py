@@ -0,0 +1,77 @@
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.adapters.schemas.inventory_part import InventoryPartCreate
+from app.infrastructure.db.models import InventoryPart as InventoryPartORM
+from app.infrastructure.repositories.base_repository import get_change_counter
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.use_cases.inventory_part_usecases import InventoryPartUseCase
+
+client = TestClient(app)
+
+def test_bulk_create_customers_and_vehicles_report_rejected_rows():
+    """Test that valid rows are created and duplicates, repeats and unknown customers are reported by index."""
+    suffix = str(uuid4())[:8]
+    phone = lambda n: f"{n}{int(suffix, 16) % 10**8:08d}"
+    taken = client.post("/api/v1/customers/create", json={
+        "name": "Taken", "email": f"taken.{suffix}@example.com", "phone": phone(10), "address": "1 Main St",
+    }).json()
+
+    response = client.post("/api/v1/customers/bulk-create", json={"items": [
+        {"name": "Ana", "email": f"ana.{suffix}@example.com", "phone": phone(11), "address": "2 Main St"},
+        {"name": "Taken again", "email": taken["email"], "phone": phone(12), "address": "3 Main St"},
+        {"name": "Ana twin", "email": f"ana.{suffix}@example.com", "phone": phone(13), "address": "4 Main St"},
+        {"name": "No phone", "address": "5 Main St"},
+        {"name": "Luis", "phone": phone(14), "address": "6 Main St"},
+    ]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2 and len(result["ids"]) == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3]
+    assert "already exists" in result["errors"][0]["detail"]
+    assert "repeated from row 0" in result["errors"][1]["detail"]
+    ana = client.get(f"/api/v1/customers/detail/{result['ids'][0]}").json()
+    assert (ana["name"], ana["is_active"]) == ("Ana", True)
+
+    response = client.post("/api/v1/vehicles/bulk-create", json={"items": [
+        {"license_plate": f"BLK {suffix}", "model": "Clio", "brand": "Renault", "year": 2020, "color": "blue",
+         "customer_id": result["ids"][0]},
+        {"license_plate": f"BLK {suffix}", "model": "Clio", "brand": "Renault", "year": 2021, "color": "red",
+         "customer_id": result["ids"][1]},
+        {"license_plate": f"BLK2 {suffix}", "model": "Golf", "brand": "VW", "year": 2019, "color": "gray",
+         "customer_id": str(uuid4())},
+    ]})
+    assert response.status_code == 200, response.text
+    vehicles = response.json()
+    assert vehicles["created"] == 1
+    assert [(error["index"], "not found" in error["detail"]) for error in vehicles["errors"]] == [(1, False), (2, True)]
+    created = client.get(f"/api/v1/vehicles/detail/{vehicles['ids'][0]}").json()
+    assert created["customer"]["id"] == result["ids"][0]
+
+    assert client.post("/api/v1/vehicles/bulk-create", json={"items": []}).status_code == 422
+
+def test_bulk_create_inventory_parts_checks_names_in_one_query(db):
+    """Test that the names of the whole payload are checked with one query and the rows inserted with one statement."""
+    suffix = str(uuid4())[:8]
+    use_case = InventoryPartUseCase(InventoryPartRepository(db))
+    use_case.create_inventory_part(InventoryPartCreate(name=f"Filter {suffix}", stock_quantity=1, cost=1.0, final_price=2.0))
+    counter = get_change_counter(InventoryPartORM)
+    items = [
+        InventoryPartCreate(name=f"Part {suffix} {i}", stock_quantity=i, cost=1.0, final_price=2.0) for i in range(50)
+    ] + [InventoryPartCreate(name=f"Filter {suffix}", stock_quantity=1, cost=1.0, final_price=2.0)]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = use_case.create_inventory_parts(items)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert result.created == 50
+    assert [error.index for error in result.errors] == [50]
+    assert sum(statement.lstrip().upper().startswith("SELECT") for statement in statements) == 1
+    assert sum(statement.lstrip().upper().startswith("INSERT") for statement in statements) == 1
+    assert get_change_counter(InventoryPartORM) == counter + 1
+    assert {part.stock_quantity for part in InventoryPartRepository(db).get_by_ids(result.ids)} == set(range(50))
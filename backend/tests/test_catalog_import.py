@@ -0,0 +1,72 @@
+import io
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.infrastructure.db.models import (Customer as CustomerORM, Vehicle as VehicleORM, InventoryPart as InventoryPartORM,
+                                          RepairOrder as RepairOrderORM, RepairOrderPart as RepairOrderPartORM)
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases import inventory_part_usecases
+from app.use_cases.inventory_part_usecases import InventoryPartUseCase
+
+client = TestClient(app)
+
+def test_catalog_import_upserts_by_name_and_reprices_open_orders(db):
+    """Test that an imported catalog updates known parts, creates new ones, skips bad rows and re-values open orders."""
+    suffix = str(uuid4())[:8]
+    customer = CustomerORM(id=uuid4(), name="Iris Paz", address="4 Main St", phone="123-456-7000")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"IMP {suffix}", color="black", customer_id=customer.id, brand="Seat", model="Ibiza", year=2018, is_active=True)
+    known = InventoryPartORM(id=uuid4(), name=f"Pastilla {suffix}", stock_quantity=1, cost=10.0, final_price=20.0, is_active=True)
+    order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=50.0, status="pending", is_active=True)
+    db.add_all([customer, vehicle, known, order])
+    db.add(RepairOrderPartORM(id=uuid4(), repair_order_id=order.id, part_id=known.id, quantity=2, is_active=True))
+    db.commit()
+
+    catalog = (
+        "name,description,stock_quantity,cost,final_price\n"
+        f"Pastilla {suffix},Ceramic,8,12.5,30\n"
+        f"Disco {suffix},,4,40,70\n"
+        f",No name,1,1,1\n"
+        f"Aceite {suffix},,many,5,9\n"
+        f"Disco {suffix},Vented,6,42,75\n"
+    )
+    response = client.post("/api/v1/inventory_parts/import", content=catalog.encode(), headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["duplicates"], result["rejected"]) == (1, 1, 1, 2)
+    assert result["refreshed_orders"] == 1
+    assert [error["line"] for error in result["errors"]] == [4, 5]
+
+    db.expire_all()
+    repo = InventoryPartRepository(db)
+    updated = repo.get_by_id(known.id)
+    assert (updated.description, updated.stock_quantity, updated.cost, updated.final_price) == ("Ceramic", 8, 12.5, 30.0)
+    created = repo.get_by_name(f"Disco {suffix}")
+    assert (created.description, created.stock_quantity, created.is_active) == ("Vented", 6, True)
+    stored = RepairOrderRepository(db).get_by_id(order.id)
+    assert (stored.parts_total, stored.expected_profit) == (60.0, 85.0)
+
+    response = client.post("/api/v1/inventory_parts/import", content=b"name,cost\nX,1\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
+
+def test_catalog_import_stages_in_batches(db, monkeypatch):
+    """Test that the file is staged one batch per statement and merged with one UPDATE and one INSERT."""
+    monkeypatch.setattr(inventory_part_usecases, "IMPORT_BATCH_SIZE", 4)
+    suffix = str(uuid4())[:8]
+    rows = "".join(f"Tornillo {suffix} {i},,{i},1,2\n" for i in range(10))
+    catalog = io.StringIO("name,description,stock_quantity,cost,final_price\n" + rows)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = InventoryPartUseCase(InventoryPartRepository(db)).import_catalog(catalog)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert (result.inserted, result.updated, result.rejected) == (10, 0, 0)
+    normalized = [" ".join(statement.split()).upper() for statement in statements]
+    assert sum(s.startswith("INSERT INTO INVENTORY_PART_IMPORT") for s in normalized) == 3
+    assert sum(s.startswith("UPDATE INVENTORY_PARTS") for s in normalized) == 1
+    assert sum(s.startswith("INSERT INTO INVENTORY_PARTS") for s in normalized) == 1
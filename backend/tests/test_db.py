@@ -1,5 +1,7 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.infrastructure.db.models import Base
 
 TEST_DATABASE_URL = "sqlite:///./test.db"  # O usa sqlite:///:memory:
@@ -7,6 +9,10 @@ TEST_DATABASE_URL = "sqlite:///./test.db"  # O usa sqlite:///:memory:
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient may run each request on its own event loop, so async connections are not pooled.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def override_get_db():
     db = TestingSessionLocal()
     try:
@@ -14,5 +20,9 @@ def override_get_db():
     finally:
         db.close()
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 def init_test_db():
     Base.metadata.create_all(bind=engine)
\ No newline at end of file
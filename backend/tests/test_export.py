@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.infrastructure.db.models import (RepairOrder as RepairOrderORM,
+                                        RepairOrderPart as RepairOrderPartORM,
+                                        Vehicle as VehicleORM,
+                                        Customer as CustomerORM)
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases.repair_order_usecases import RepairOrderUseCase
+
+client = TestClient(app)
+
+def _create_orders(db, count):
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+    customer = CustomerORM(id=uuid4(), name="Ines Mora", email=f"ines.{str(uuid4())[:8]}@example.com", address="8 Main St", phone="123-456-7897")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"EXP {str(uuid4())[:8]}", color="black", customer_id=customer.id, brand="Opel", model="Corsa", year=2016, is_active=True)
+    db.add_all([customer, vehicle])
+    db.commit()
+    orders = [
+        RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=float(i),
+                       status="completed" if i % 2 else "pending", is_active=True, total_cost_repair=float(i))
+        for i in range(count)
+    ]
+    db.add_all(orders)
+    db.commit()
+    return orders, vehicle
+
+def test_export_streams_csv_and_ndjson(db):
+    """Test that both export formats carry every matching order with its customer, vehicle and totals."""
+    orders, vehicle = _create_orders(db, 5)
+
+    response = client.get("/api/v1/repair_orders/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(row["id"] for row in rows) == sorted(str(order.id) for order in orders)
+    assert {row["license_plate"] for row in rows} == {vehicle.license_plate}
+
+    response = client.get("/api/v1/repair_orders/export", params={"format": "ndjson", "status": "completed"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["labor_cost"] for line in lines) == [1.0, 3.0]
+    assert {line["customer_name"] for line in lines} == {"Ines Mora"}
+
+def test_export_csv_is_written_in_batches(db):
+    """Test that CSV rows are emitted in chunks of the batch size, after a single header line."""
+    _create_orders(db, 5)
+    use_case = RepairOrderUseCase(RepairOrderRepository(db), None, None, None, None, None)
+    chunks = list(use_case.export_repair_orders("csv", batch_size=2))
+    assert [chunk.count("\n") for chunk in chunks] == [3, 2, 1]
+    assert chunks[0].startswith("id,status,is_active,date_in")
@@ -0,0 +1,154 @@
+from random import Random
+from uuid import uuid4
+from app.infrastructure.db.models import (RepairOrder as RepairOrderORM,
+                                        RepairOrderPart as RepairOrderPartORM,
+                                        InventoryPart as InventoryPartORM)
+from app.use_cases.repair_order_optimization.inventory_snapshot import InventorySnapshot
+from app.use_cases.repair_order_optimization.live_plan import LiveOptimizationPlan
+from app.use_cases.repair_order_optimization.scenarios import PartDelta, Scenario
+
+
+def _order(labor_cost, *lines):
+    return RepairOrderORM(id=uuid4(), labor_cost=labor_cost, status="pending", is_active=True, parts=[
+        RepairOrderPartORM(part_id=part.id, quantity=quantity, is_active=True) for part, quantity in lines
+    ])
+
+
+def _lines(orders):
+    return [
+        (order.id, order.customer_id, order.labor_cost, ro_part.part_id, ro_part.quantity)
+        for order in orders for ro_part in order.parts
+    ]
+
+
+def _selected(plan):
+    return {planned.repair_order_id for planned in plan.selection()}
+
+
+def test_live_plan_applies_write_events():
+    """Test that stock, price and status events update the cached plan."""
+    brakes = InventoryPartORM(id=uuid4(), name="Pastillas", stock_quantity=2, cost=10.0, final_price=30.0, is_active=True)
+    oil = InventoryPartORM(id=uuid4(), name="Aceite", stock_quantity=10, cost=5.0, final_price=8.0, is_active=True)
+    big = _order(50.0, (brakes, 2))     # profit 90
+    small = _order(10.0, (brakes, 1))   # profit 30
+    other = _order(5.0, (oil, 1))       # profit 8, never contended
+
+    plan = LiveOptimizationPlan()
+    plan.load(_lines([big, small, other]), InventorySnapshot.from_parts([brakes, oil]), plan.version())
+    assert plan.is_loaded()
+    assert _selected(plan) == {big.id, other.id}
+
+    # More stock lets both brake orders through.
+    brakes.stock_quantity = 3
+    plan.refresh(parts=[brakes])
+    assert _selected(plan) == {big.id, small.id, other.id}
+
+    # Completing an order releases it from the plan.
+    big.status = "completed"
+    plan.refresh(orders=[(big, [(brakes.id, 2)])])
+    assert _selected(plan) == {small.id, other.id}
+
+    # A price drop below cost makes the remaining oil order unprofitable.
+    oil.final_price = 0.0
+    plan.refresh(parts=[oil])
+    assert _selected(plan) == {small.id}
+    assert plan.selection()[0].expected_profit == 30.0
+
+
+def test_live_plan_load_detects_missed_events():
+    """Test that an event applied while loading forces a reload on the next read."""
+    part = InventoryPartORM(id=uuid4(), name="Filtro", stock_quantity=5, cost=20.0, final_price=50.0, is_active=True)
+    plan = LiveOptimizationPlan()
+    version = plan.version()
+    plan.refresh(parts=[part])
+    plan.load(_lines([_order(30.0, (part, 1))]), InventorySnapshot.from_parts([part]), version)
+    assert not plan.is_loaded()
+    assert len(plan.selection()) == 1
+
+
+def test_live_plan_improves_cut_off_components():
+    """Test that a larger time budget closes the gap left by a cut-off load."""
+    parts = [InventoryPartORM(id=uuid4(), name=f"Pieza {k}", stock_quantity=6, cost=1.0, final_price=2.0, is_active=True) for k in range(6)]
+    rng = Random(3)
+    orders = [
+        _order(round(rng.uniform(5, 200), 2), *[(part, rng.randint(1, 3)) for part in rng.sample(parts, rng.randint(1, 3))])
+        for _ in range(60)
+    ]
+
+    plan = LiveOptimizationPlan()
+    plan.load(_lines(orders), InventorySnapshot.from_parts(parts), time_budget_ms=0)
+    cut = plan.quality()
+    assert not cut.search_completed and cut.optimality_gap > 0
+
+    plan.improve(time_budget_ms=60_000)
+    improved = plan.quality()
+    assert improved.search_completed and improved.optimality_gap == 0
+    assert cut.total_profit <= improved.total_profit <= cut.upper_bound
+
+
+def test_live_plan_evaluates_what_if_scenarios_without_changing_the_plan():
+    """Test that scenarios adjust stock and prices on a copy of the loaded columns."""
+    brakes = InventoryPartORM(id=uuid4(), name="Pastillas", stock_quantity=2, cost=10.0, final_price=30.0, is_active=True)
+    big = _order(50.0, (brakes, 2))     # profit 90
+    small = _order(10.0, (brakes, 1))   # profit 30
+    plan = LiveOptimizationPlan()
+    plan.load(_lines([big, small]), InventorySnapshot.from_parts([brakes]))
+
+    baseline, restocked, discounted = plan.evaluate([
+        Scenario(name="baseline"),
+        Scenario(name="restock", changes=[PartDelta(part_id=brakes.id, stock_delta=1)]),
+        Scenario(name="discount", changes=[PartDelta(part_id=brakes.id, final_price_change_pct=-50)]),
+    ])
+
+    assert [order.repair_order_id for order in baseline.orders] == [big.id]
+    assert restocked.total_profit == 120.0
+    assert [order.repair_order_id for order in restocked.orders] == [big.id, small.id]
+    assert discounted.total_profit == 60.0  # 2 * (15 - 10) + 50
+    assert _selected(plan) == {big.id}
+
+
+def test_live_plan_reloads_when_stock_revives_an_excluded_order():
+    """Test that restocking a part an excluded order was waiting for forces a reload."""
+    brakes = InventoryPartORM(id=uuid4(), name="Pastillas", stock_quantity=1, cost=10.0, final_price=30.0, is_active=True)
+    small = _order(10.0, (brakes, 1))
+    excluded_id = uuid4()
+
+    plan = LiveOptimizationPlan()
+    plan.load(_lines([small]), InventorySnapshot.from_parts([brakes]), blocked=[(excluded_id, brakes.id, 3)])
+    brakes.stock_quantity = 2
+    plan.refresh(parts=[brakes])
+    assert plan.is_loaded()
+
+    brakes.stock_quantity = 3
+    plan.refresh(parts=[brakes])
+    assert not plan.is_loaded()
+
+
+def test_live_plan_what_if_restock_revives_a_blocked_order():
+    """Test that a scenario restocking a part can select an order the current stock blocks."""
+    pads = InventoryPartORM(id=uuid4(), name="Pastillas", stock_quantity=2, cost=10.0, final_price=30.0, is_active=True)
+    oil = InventoryPartORM(id=uuid4(), name="Aceite", stock_quantity=0, cost=5.0, final_price=8.0, is_active=True)
+    small = _order(10.0, (pads, 1))     # profit 30
+    big = _order(500.0, (pads, 20))     # profit 900, needs 18 more pads
+    dry = _order(40.0, (oil, 1))        # needs oil, which no scenario restocks
+    plan = LiveOptimizationPlan()
+    plan.load(
+        _lines([small]), InventorySnapshot.from_parts([pads, oil]),
+        blocked=[(big.id, pads.id, 20), (dry.id, oil.id, 1)],
+    )
+    assert _selected(plan) == {small.id}
+
+    scenarios = [
+        Scenario(name="baseline"),
+        Scenario(name="short", changes=[PartDelta(part_id=pads.id, stock_delta=10)]),
+        Scenario(name="restock", changes=[PartDelta(part_id=pads.id, stock_delta=20)]),
+    ]
+    assert plan.unblocked_by(scenarios) == [big.id]
+    baseline, short, restocked = plan.evaluate(scenarios, blocked=_lines([big]))
+
+    assert baseline.total_profit == 30.0
+    assert short.total_profit == 30.0
+    assert restocked.total_profit == 930.0
+    assert {order.repair_order_id for order in restocked.orders} == {small.id, big.id}
+    assert _selected(plan) == {small.id}
+    assert plan.evaluate(scenarios)[2].total_profit == 30.0  # the plan's own matrix was left as it was
@@ -1,15 +1,27 @@
+import json
 import pytest
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlalchemy import event
 from uuid import uuid4
 from app.infrastructure.db.models import (RepairOrder as RepairOrderORM, 
                                         RepairOrderPart as RepairOrderPartORM, 
                                         InventoryPart as InventoryPartORM, 
                                         Vehicle as VehicleORM, 
                                         Customer as CustomerORM)
-from app.use_cases.repair_order_optimization.calculate_order_profit import calculate_order_profit
-from app.use_cases.repair_order_optimization.select_orders_by_profit import SelectRepairOrdersByProfitUseCase
+from app.use_cases.repair_order_optimization.calculate_order_profit import calculate_orders_profit
+from app.use_cases.repair_order_optimization.inventory_snapshot import InventorySnapshot
+from app.use_cases.repair_order_optimization.requirement_matrix import RequirementMatrix
+from app.use_cases.repair_order_optimization.select_orders_by_profit import SelectRepairOrdersByProfitUseCase, encode_cursor
+from app.use_cases.repair_order_optimization.result_cache import VersionedResultCache
+from app.use_cases.repair_order_optimization.live_plan import LiveOptimizationPlan, shared_plan
 from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
 from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
-from app.domain.exceptions import NoAvailableRepairOrdersException
+from app.infrastructure.repositories.repair_order_part_repository import RepairOrderPartRepository
+from app.adapters.schemas.repair_order_optimization import PartDeltaRequest, ScenarioRequest, WhatIfRequest
+from app.domain.exceptions import NoAvailableRepairOrdersException, InvalidOptimizationCursorException
+from app.main import app
+from tests.test_db import engine
 
 def test_calculate_order_profit_simple(db):
     """Test basic profit calculation for a repair order."""
@@ -40,10 +52,48 @@ def test_calculate_order_profit_simple(db):
     db.commit()
     db.refresh(repair_order)
 
-    repo = InventoryPartRepository(db)
-    profit = calculate_order_profit(repair_order, repo)
+    requirements = RequirementMatrix.from_orders([repair_order])
+    snapshot = InventorySnapshot.from_parts(InventoryPartRepository(db).get_by_ids(requirements.part_ids))
+    profit = calculate_orders_profit(requirements, snapshot, np.array([repair_order.labor_cost])).profit[0]
     assert profit == 90.0  # 2 * (50 - 20) + 30 = 90
 
+def test_calculate_orders_profit_batch_uses_snapshot():
+    """Test batch profit calculation against a preloaded inventory snapshot."""
+    filter_part = InventoryPartORM(id=uuid4(), name="Filtro", stock_quantity=5, cost=20.0, final_price=50.0)
+    oil_part = InventoryPartORM(id=uuid4(), name="Aceite", stock_quantity=5, cost=10.0, final_price=25.0)
+    snapshot = InventorySnapshot.from_parts([filter_part, oil_part])
+
+    orders = [
+        RepairOrderORM(id=uuid4(), labor_cost=30.0, parts=[
+            RepairOrderPartORM(part_id=filter_part.id, quantity=2, is_active=True),
+            RepairOrderPartORM(part_id=oil_part.id, quantity=4, is_active=True),
+        ]),
+        RepairOrderORM(id=uuid4(), labor_cost=0.0, parts=[
+            RepairOrderPartORM(part_id=oil_part.id, quantity=1, is_active=True),
+            RepairOrderPartORM(part_id=filter_part.id, quantity=3, is_active=False),
+        ]),
+    ]
+    requirements = RequirementMatrix.from_orders(orders)
+
+    valuation = calculate_orders_profit(requirements, snapshot, np.array([30.0, 0.0]))
+    assert valuation.parts_total.tolist() == [200.0, 25.0]  # 2 * 50 + 4 * 25, 1 * 25
+    assert valuation.profit.tolist() == [150.0, 15.0]  # 2 * 30 + 4 * 15 + 30, 1 * 15
+
+def test_inventory_snapshot_loads_only_active_parts(db):
+    """Test that the inventory snapshot holds the columns of active parts only."""
+    active = InventoryPartORM(id=uuid4(), name="Bujia", stock_quantity=7, cost=3.0, final_price=9.0, is_active=True)
+    inactive = InventoryPartORM(id=uuid4(), name="Bujia vieja", stock_quantity=4, cost=2.0, final_price=5.0, is_active=False)
+    db.add_all([active, inactive])
+    db.commit()
+
+    snapshot = InventorySnapshot.from_rows(InventoryPartRepository(db).get_stock_and_prices())
+
+    assert inactive.id not in snapshot.index
+    index = snapshot.index[active.id]
+    assert snapshot.stock_quantity[index] == 7
+    assert snapshot.unit_profit[index] == 6.0
+    assert snapshot.stock_of(inactive.id) == 0
+
 def test_select_orders_by_profit_returns_sorted_list(db):
     """Test that orders are returned sorted by profit."""
     # Clean up any existing orders
@@ -170,3 +220,320 @@ def test_no_orders_fulfilled_due_to_stock(db):
 
     result = use_case.execute()
     assert result == []
+
+def test_pending_orders_without_active_lines_are_skipped(db):
+    """Test that pending orders with no parts, or only removed ones, are left out of the plan instead of failing it."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Eva Gil", email="eva.gil@example.com", address="9 Main St", phone="123-456-7895")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"NOP {str(uuid4())[:4]}", color="white", customer_id=customer.id, brand="Kia", model="Rio", year=2019, is_active=True)
+    part = InventoryPartORM(id=uuid4(), name="Bujia", stock_quantity=5, cost=5.0, final_price=15.0, is_active=True)
+    empty = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=80.0, status="pending", is_active=True)
+    removed = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=60.0, status="pending", is_active=True)
+    db.add_all([customer, vehicle, part, empty, removed])
+    db.add(RepairOrderPartORM(repair_order_id=removed.id, part_id=part.id, quantity=1, is_active=False))
+    db.commit()
+
+    use_case = SelectRepairOrdersByProfitUseCase(
+        repair_order_repository=RepairOrderRepository(db),
+        inventory_part_repository=InventoryPartRepository(db)
+    )
+    with pytest.raises(NoAvailableRepairOrdersException):
+        use_case.execute()
+
+    order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=20.0, status="pending", is_active=True)
+    db.add_all([order, RepairOrderPartORM(repair_order_id=order.id, part_id=part.id, quantity=2)])
+    db.commit()
+
+    result = use_case.execute()
+    assert [item.repair_order_id for item in result] == [order.id]
+
+def test_select_orders_prefers_most_profitable_combination(db):
+    """Test that a cheap order does not take the stock a more profitable order needs."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Jane Doe", email="jane.doe@example.com", address="456 Main St", phone="123-456-7891")
+    license_plate = f"XYZ {str(uuid4())[:4]}"
+    vehicle = VehicleORM(id=uuid4(), license_plate=license_plate, color="blue", customer_id=customer.id, brand="Mazda", model="3", year=2021, is_active=True)
+    db.add_all([customer, vehicle])
+    db.commit()
+
+    part = InventoryPartORM(id=uuid4(), name="Pastillas", description="Pastillas de freno", stock_quantity=2, cost=10.0, final_price=30.0, is_active=True)
+    db.add(part)
+    db.commit()
+
+    cheap_order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=5.0, status="pending", is_active=True)
+    db.add_all([cheap_order, RepairOrderPartORM(repair_order_id=cheap_order.id, part_id=part.id, quantity=1)])
+    db.commit()
+    profitable_order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=100.0, status="pending", is_active=True)
+    db.add_all([profitable_order, RepairOrderPartORM(repair_order_id=profitable_order.id, part_id=part.id, quantity=2)])
+    db.commit()
+
+    use_case = SelectRepairOrdersByProfitUseCase(
+        repair_order_repository=RepairOrderRepository(db),
+        inventory_part_repository=InventoryPartRepository(db)
+    )
+
+    result = use_case.execute()
+    assert [order.repair_order_id for order in result] == [profitable_order.id]
+    assert result[0].expected_profit == 140.0  # 2 * (30 - 10) + 100 = 140
+
+def test_select_orders_result_cache_follows_repository_writes(db):
+    """Test that cached results are reused until a repository write changes the version."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Ana Perez", email="ana.perez@example.com", address="789 Main St", phone="123-456-7892")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"CCH {str(uuid4())[:4]}", color="white", customer_id=customer.id, brand="Ford", model="Fiesta", year=2019, is_active=True)
+    part = InventoryPartORM(id=uuid4(), name="Correa", stock_quantity=1, cost=10.0, final_price=40.0, is_active=True)
+    order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=20.0, status="pending", is_active=True)
+    db.add_all([customer, vehicle, part])
+    db.commit()
+    db.add_all([order, RepairOrderPartORM(repair_order_id=order.id, part_id=part.id, quantity=1)])
+    db.commit()
+
+    inventory_repo = InventoryPartRepository(db)
+    cache = VersionedResultCache()
+    use_case = SelectRepairOrdersByProfitUseCase(
+        repair_order_repository=RepairOrderRepository(db),
+        inventory_part_repository=inventory_repo,
+        result_cache=cache,
+    )
+
+    first = use_case.execute()
+    assert use_case.execute() == first
+    assert (cache.stats().hits, cache.stats().misses) == (1, 1)
+
+    inventory_repo.update(part.id, {"stock_quantity": 0})
+    assert use_case.execute() == []
+    assert (cache.stats().hits, cache.stats().misses) == (1, 2)
+
+def test_select_orders_result_cache_hits_after_the_plan_loads(db):
+    """Test that the first result after a (re)load is cached under the version the load left, not the one before it."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Rita Sanz", email=f"rita.{str(uuid4())[:8]}@example.com", address="2 Main St", phone="123-456-7898")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"VER {str(uuid4())[:4]}", color="blue", customer_id=customer.id, brand="Ford", model="Focus", year=2017, is_active=True)
+    db.add_all([customer, vehicle])
+    db.commit()
+    _create_orders_with_profits(db, customer, vehicle, [15.0, 25.0])
+
+    plan, cache = LiveOptimizationPlan(), VersionedResultCache()
+    use_case = SelectRepairOrdersByProfitUseCase(RepairOrderRepository(db), InventoryPartRepository(db), plan, cache)
+
+    first = use_case.execute()
+    assert use_case.execute() == first
+    assert (cache.stats().hits, cache.stats().misses) == (1, 1)
+
+    plan.invalidate()
+    report = use_case.execute_with_report()
+    assert use_case.execute_with_report() == report
+    assert (cache.stats().hits, cache.stats().misses) == (2, 2)
+
+def _create_orders_with_profits(db, customer, vehicle, labor_costs):
+    part = InventoryPartORM(id=uuid4(), name="Tornillo", stock_quantity=len(labor_costs), cost=1.0, final_price=1.0, is_active=True)
+    db.add(part)
+    db.commit()
+    orders = []
+    for labor_cost in labor_costs:
+        order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=labor_cost, status="pending", is_active=True)
+        db.add_all([order, RepairOrderPartORM(repair_order_id=order.id, part_id=part.id, quantity=1)])
+        orders.append(order)
+    db.commit()
+    return orders
+
+def test_select_orders_top_k_filters_and_cursor(db):
+    """Test limit, min_profit, customer and cursor push-down on the optimized list."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customers = [CustomerORM(id=uuid4(), name=f"Cliente {i}", email=f"cliente{i}@example.com", address="1 Main St", phone=f"555-000-{i}") for i in range(2)]
+    vehicles = [VehicleORM(id=uuid4(), license_plate=f"TOP {str(uuid4())[:4]}", color="gray", customer_id=c.id, brand="Kia", model="Rio", year=2018, is_active=True) for c in customers]
+    db.add_all(customers + vehicles)
+    db.commit()
+    first = _create_orders_with_profits(db, customers[0], vehicles[0], [10.0, 40.0, 30.0])
+    second = _create_orders_with_profits(db, customers[1], vehicles[1], [20.0])
+
+    use_case = SelectRepairOrdersByProfitUseCase(
+        repair_order_repository=RepairOrderRepository(db),
+        inventory_part_repository=InventoryPartRepository(db)
+    )
+
+    page = use_case.execute(limit=2)
+    assert [order.expected_profit for order in page] == [40.0, 30.0]
+    rest = use_case.execute(limit=2, cursor=encode_cursor(page[-1]))
+    assert [order.repair_order_id for order in rest] == [second[0].id, first[0].id]
+
+    assert [o.expected_profit for o in use_case.execute(min_profit=25.0)] == [40.0, 30.0]
+    assert [o.repair_order_id for o in use_case.execute(customer_id=customers[1].id)] == [second[0].id]
+    assert [o.expected_profit for o in use_case.stream(batch_size=3)] == [40.0, 30.0, 20.0, 10.0]
+
+    with pytest.raises(InvalidOptimizationCursorException):
+        use_case.execute(cursor="not-a-cursor")
+
+def test_stream_returns_its_connection_to_the_pool(db):
+    """Test that the NDJSON stream does not keep a pooled connection once its body is sent."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+    customer = CustomerORM(id=uuid4(), name="Olga Paz", email=f"olga.{str(uuid4())[:8]}@example.com", address="3 Main St", phone="555-100-0001")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"STR {str(uuid4())[:4]}", color="gray", customer_id=customer.id, brand="Kia", model="Rio", year=2018, is_active=True)
+    db.add_all([customer, vehicle])
+    db.commit()
+    _create_orders_with_profits(db, customer, vehicle, [10.0, 20.0])
+    shared_plan.invalidate()
+    db.close()
+
+    client = TestClient(app)
+    checked_out = engine.pool.checkedout()
+    for _ in range(3):
+        response = client.get("/api/v1/repair_order_optimization/stream")
+        assert response.status_code == 200, response.text
+        assert [json.loads(line)["expected_profit"] for line in response.text.splitlines()] == [20.0, 10.0]
+    assert engine.pool.checkedout() == checked_out
+
+def test_pending_candidate_lines_exclude_orders_stock_cannot_cover(db):
+    """Test that orders needing more than the stock, or an inactive part, are filtered in SQL."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Luis Diaz", email="luis.diaz@example.com", address="12 Main St", phone="123-456-7893")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"PRE {str(uuid4())[:4]}", color="black", customer_id=customer.id, brand="Fiat", model="Uno", year=2015, is_active=True)
+    part = InventoryPartORM(id=uuid4(), name="Amortiguador", stock_quantity=3, cost=30.0, final_price=60.0, is_active=True)
+    retired = InventoryPartORM(id=uuid4(), name="Carburador", stock_quantity=9, cost=30.0, final_price=60.0, is_active=False)
+    db.add_all([customer, vehicle, part, retired])
+    db.commit()
+
+    def add_order(*lines):
+        order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=10.0, status="pending", is_active=True)
+        db.add(order)
+        db.add_all([RepairOrderPartORM(repair_order_id=order.id, part_id=p.id, quantity=q) for p, q in lines])
+        db.commit()
+        return order
+
+    plausible = add_order((part, 3))
+    too_many = add_order((part, 2), (part, 2))  # two lines of the same part add up to 4 > 3
+    inactive = add_order((part, 1), (retired, 1))
+
+    repo = RepairOrderRepository(db)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        lines, blocked = repo.get_pending_candidate_lines()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert [(line[0], line[3], line[4]) for line in lines] == [(plausible.id, part.id, 3)]
+    assert sorted(blocked) == sorted([(too_many.id, part.id, 4), (inactive.id, retired.id, 1)])
+    assert sorted((order_id, part_id, qty) for order_id, _, _, part_id, qty in repo.get_pending_lines([too_many.id])) == [
+        (too_many.id, part.id, 2), (too_many.id, part.id, 2),
+    ]
+
+def test_what_if_loads_only_the_blocked_orders_a_scenario_could_unblock(db):
+    """Test that /what_if restocks can select an order the stock blocks, fetching only the lines of such orders."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Hugo Leon", email=f"hugo.{str(uuid4())[:8]}@example.com", address="6 Main St", phone="123-456-7899")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"WIF {str(uuid4())[:4]}", color="black", customer_id=customer.id, brand="Seat", model="Leon", year=2020, is_active=True)
+    pads = InventoryPartORM(id=uuid4(), name=f"Pastillas {str(uuid4())[:8]}", stock_quantity=2, cost=10.0, final_price=30.0, is_active=True)
+    db.add_all([customer, vehicle, pads])
+    db.commit()
+    small = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=10.0, status="pending", is_active=True)
+    big = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=500.0, status="pending", is_active=True)
+    db.add_all([small, big])
+    db.add_all([
+        RepairOrderPartORM(repair_order_id=small.id, part_id=pads.id, quantity=1),
+        RepairOrderPartORM(repair_order_id=big.id, part_id=pads.id, quantity=20),
+    ])
+    db.commit()
+
+    repo = RepairOrderRepository(db)
+    use_case = SelectRepairOrdersByProfitUseCase(repo, InventoryPartRepository(db), LiveOptimizationPlan())
+    assert [order.repair_order_id for order in use_case.execute()] == [small.id]
+
+    fetched = []
+    get_pending_lines = repo.get_pending_lines
+    repo.get_pending_lines = lambda ids: fetched.append(list(ids)) or get_pending_lines(ids)
+    baseline, restocked = use_case.evaluate_scenarios(WhatIfRequest(scenarios=[
+        ScenarioRequest(name="baseline"),
+        ScenarioRequest(name="restock", changes=[PartDeltaRequest(part_id=pads.id, stock_delta=20)]),
+    ]))
+    assert (baseline.total_profit, restocked.total_profit) == (30.0, 930.0)
+    assert {order.repair_order_id for order in restocked.orders} == {small.id, big.id}
+    assert fetched == [[big.id]]
+
+    use_case.evaluate_scenarios(WhatIfRequest(scenarios=[ScenarioRequest(name="baseline")]))
+    assert fetched[-1] == []
+
+def test_order_totals_and_parts_used_are_aggregated_in_sql(db):
+    """Test that per-order totals and the parts used come from single grouped/joined queries."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Ana Ruiz", email="ana.ruiz@example.com", address="7 Main St", phone="123-456-7894")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"TOT {str(uuid4())[:8]}", color="red", customer_id=customer.id, brand="Ford", model="Ka", year=2018, is_active=True)
+    filter_part = InventoryPartORM(id=uuid4(), name="Filtro", stock_quantity=5, cost=10.0, final_price=25.0, is_active=True)
+    belt = InventoryPartORM(id=uuid4(), name="Correa", stock_quantity=5, cost=40.0, final_price=50.0, is_active=True)
+    db.add_all([customer, vehicle, filter_part, belt])
+    db.commit()
+
+    order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=100.0, status="pending", is_active=True)
+    empty = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=30.0, status="pending", is_active=True)
+    db.add_all([order, empty])
+    db.add_all([
+        RepairOrderPartORM(repair_order_id=order.id, part_id=filter_part.id, quantity=2),
+        RepairOrderPartORM(repair_order_id=order.id, part_id=belt.id, quantity=1),
+        RepairOrderPartORM(repair_order_id=order.id, part_id=belt.id, quantity=4, is_active=False),
+    ])
+    db.commit()
+
+    repo = RepairOrderRepository(db)
+    totals = {row[0]: tuple(row[1:]) for row in repo.get_order_totals()}
+    assert totals == {order.id: (100.0, 100.0, 40.0), empty.id: (30.0, 0.0, 0.0)}
+
+    parts = RepairOrderPartRepository(db).get_part_details_by_order_id(order.id)
+    assert sorted((row.name, row.quantity_used) for row in parts) == [("Correa", 1), ("Filtro", 2)]
+
+def test_optimized_responses_load_customers_and_vehicles_in_constant_queries(db):
+    """Test that building the response issues the same number of queries for one order or many."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    for i in range(6):
+        customer = CustomerORM(id=uuid4(), name=f"Cliente N{i}", email=f"n{i}@example.com", address="1 Main St", phone=f"555-100-{i}")
+        vehicle = VehicleORM(id=uuid4(), license_plate=f"NPO {str(uuid4())[:8]}", color="gray", customer_id=customer.id, brand="Kia", model="Rio", year=2018, is_active=True)
+        db.add_all([customer, vehicle])
+        db.commit()
+        _create_orders_with_profits(db, customer, vehicle, [10.0 + i])
+
+    use_case = SelectRepairOrdersByProfitUseCase(RepairOrderRepository(db), InventoryPartRepository(db), LiveOptimizationPlan())
+    use_case.execute()
+
+    def count_queries(limit):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            orders = use_case.execute(limit=limit)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+        return len(orders), len(statements)
+
+    one, many = count_queries(1), count_queries(6)
+    assert (one[0], many[0]) == (1, 6)
+    assert one[1] == many[1] == 1
+    assert {o.customer.name for o in use_case.execute()} == {f"Cliente N{i}" for i in range(6)}
@@ -0,0 +1,67 @@
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.main import app
+from app.infrastructure.db.models import (RepairOrder as RepairOrderORM,
+                                        RepairOrderPart as RepairOrderPartORM,
+                                        InventoryPart as InventoryPartORM,
+                                        Vehicle as VehicleORM,
+                                        Customer as CustomerORM)
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+
+client = TestClient(app)
+
+def _walk(url, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_keyset_pages_cover_the_table_once_in_id_order(db):
+    """Test that following X-Next-Cursor returns every part exactly once, in id order, in pages of at most `limit`."""
+    db.add_all([InventoryPartORM(id=uuid4(), name=f"Pagina {str(uuid4())[:8]}", stock_quantity=1, cost=1.0, final_price=2.0, is_active=True) for _ in range(7)])
+    db.commit()
+    expected = sorted(str(part.id) for part in InventoryPartRepository(db).get_all())
+
+    pages = _walk("/api/v1/inventory_parts/list", limit=3)
+    ids = [part["id"] for page in pages for part in page]
+    assert all(len(page) <= 3 for page in pages)
+    assert ids == sorted(ids, key=lambda value: value.replace("-", "")) and sorted(ids) == expected
+
+    assert client.get("/api/v1/inventory_parts/list", params={"cursor": "bad"}).status_code == 400
+    assert client.get("/api/v1/inventory_parts/list", params={"limit": 0}).status_code == 422
+
+def test_list_filters_are_applied_in_the_query(db):
+    """Test the status, is_active and repair order filters on the paginated lists."""
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+    customer = CustomerORM(id=uuid4(), name="Paula Ibarra", email=f"paula.{str(uuid4())[:8]}@example.com", address="5 Main St", phone="123-456-7896")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"PAG {str(uuid4())[:8]}", color="green", customer_id=customer.id, brand="Seat", model="Ibiza", year=2017, is_active=False)
+    part = InventoryPartORM(id=uuid4(), name=f"Filtro {str(uuid4())[:8]}", stock_quantity=5, cost=1.0, final_price=2.0, is_active=True)
+    db.add_all([customer, vehicle, part])
+    db.commit()
+    pending = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=10.0, status="pending", is_active=True)
+    completed = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=10.0, status="completed", is_active=True)
+    db.add_all([pending, completed, RepairOrderPartORM(repair_order_id=completed.id, part_id=part.id, quantity=1)])
+    db.commit()
+
+    orders = [order for page in _walk("/api/v1/repair_orders/list", status="completed", limit=1) for order in page]
+    assert [order["id"] for order in orders] == [str(completed.id)]
+    assert orders[0]["customer"]["name"] == "Paula Ibarra"
+
+    lines = [line for page in _walk("/api/v1/repair_order_parts/list", repair_order_id=str(completed.id)) for line in page]
+    assert [line["part_id"] for line in lines] == [str(part.id)]
+
+    inactive = {v["id"] for page in _walk("/api/v1/vehicles/list", is_active=False) for v in page}
+    assert str(vehicle.id) in inactive
+
+    customers = {c["id"]: c["is_active"] for page in _walk("/api/v1/customers/list", limit=1000) for c in page}
+    assert customers[str(customer.id)] is True
+    client.patch(f"/api/v1/customers/disable/{customer.id}")
+    customers = {c["id"]: c["is_active"] for page in _walk("/api/v1/customers/list", limit=1000) for c in page}
+    assert customers[str(customer.id)] is False
+    assert all(not v["is_active"] for page in _walk("/api/v1/vehicles/list", is_active=False) for v in page)
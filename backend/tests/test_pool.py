@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from app.main import app
+from app.infrastructure.db.pool import InstrumentedQueuePool, engine_options, pool_stats
+
+def test_engine_options_read_the_environment(monkeypatch):
+    """Test that pool settings come from the environment and PgBouncer mode only disables asyncpg prepared statements."""
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    url = "postgresql://postgres:postgres@db:5432/autoparts"
+
+    sync_options = engine_options(url)
+    assert (sync_options["pool_size"], sync_options["max_overflow"], sync_options["pool_pre_ping"]) == (3, 0, False)
+    assert sync_options["poolclass"] is InstrumentedQueuePool
+    assert "connect_args" not in sync_options
+
+    async_args = engine_options(url.replace("postgresql", "postgresql+asyncpg"), is_async=True)["connect_args"]
+    assert (async_args["statement_cache_size"], async_args["prepared_statement_cache_size"]) == (0, 0)
+    assert async_args["prepared_statement_name_func"]() != async_args["prepared_statement_name_func"]()
+    assert engine_options("sqlite:///./test.db") == {"connect_args": {"check_same_thread": False}}
+
+def test_instrumented_pool_counts_checkouts_and_timeouts(tmp_path):
+    """Test that the pool reports checked-out connections, checkout wait and timeouts."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine.pool)
+    assert (stats.pool_class, stats.size, stats.checked_out, stats.checkouts, stats.timeouts) == (
+        "InstrumentedQueuePool", 1, 1, 1, 1,
+    )
+    held.close()
+    engine.dispose()
+
+def test_pool_stats_endpoint():
+    """Test that both engines of the worker are reported."""
+    response = TestClient(app).get("/api/v1/database/pool_stats")
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync_pool", "async_pool"}
@@ -0,0 +1,105 @@
+import pytest
+from uuid import uuid4
+from sqlalchemy import event
+from app.infrastructure.db.models import (RepairOrder as RepairOrderORM,
+                                        RepairOrderPart as RepairOrderPartORM,
+                                        InventoryPart as InventoryPartORM,
+                                        Vehicle as VehicleORM,
+                                        Customer as CustomerORM)
+from app.adapters.schemas.inventory_part import InventoryPartUpdate, InventoryPartPriceChange
+from app.domain.exceptions import InventoryPartNotFoundException, InventoryPartValidationException
+from app.adapters.schemas.repair_order_part import RepairOrderPartCreate, RepairOrderPartUpdate
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_part_repository import RepairOrderPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases.inventory_part_usecases import InventoryPartUseCase
+from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
+
+def _setup(db):
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+
+    customer = CustomerORM(id=uuid4(), name="Marta Gil", email="marta.gil@example.com", address="3 Main St", phone="123-456-7895")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"MAT {str(uuid4())[:8]}", color="white", customer_id=customer.id, brand="Kia", model="Rio", year=2019, is_active=True)
+    part = InventoryPartORM(id=uuid4(), name=f"Bujia {str(uuid4())[:8]}", stock_quantity=10, cost=10.0, final_price=25.0, is_active=True)
+    db.add_all([customer, vehicle, part])
+    db.commit()
+
+    def add_order(status):
+        order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=50.0, status=status, is_active=True)
+        db.add(order)
+        db.commit()
+        return order
+
+    return part, add_order
+
+def test_order_totals_follow_line_writes(db):
+    """Test that creating and updating a line keeps the stored totals of its order current."""
+    part, add_order = _setup(db)
+    order = add_order("pending")
+    repo = RepairOrderRepository(db)
+    use_case = RepairOrderPartUseCase(RepairOrderPartRepository(db), repo, InventoryPartRepository(db))
+
+    line = use_case.create_repair_order_part(RepairOrderPartCreate(repair_order_id=order.id, part_id=part.id, quantity=2))
+    stored = repo.get_by_id(order.id)
+    assert (stored.parts_total, stored.expected_profit, stored.total_cost_repair) == (50.0, 80.0, 100.0)
+
+    use_case.update_repair_order_part(line.id, RepairOrderPartUpdate(quantity=3))
+    stored = repo.get_by_id(order.id)
+    assert (stored.parts_total, stored.expected_profit, stored.total_cost_repair) == (75.0, 95.0, 125.0)
+    assert [o.id for o in repo.get_most_profitable_pending(5)] == [order.id]
+
+def test_part_price_edit_refreshes_open_orders_only(db):
+    """Test that a price or cost edit re-values the open orders using the part and leaves closed ones alone."""
+    part, add_order = _setup(db)
+    pending, completed = add_order("pending"), add_order("completed")
+    repo = RepairOrderRepository(db)
+    lines = RepairOrderPartUseCase(RepairOrderPartRepository(db), repo, InventoryPartRepository(db))
+    for order in (pending, completed):
+        lines.create_repair_order_part(RepairOrderPartCreate(repair_order_id=order.id, part_id=part.id, quantity=1))
+
+    use_case = InventoryPartUseCase(InventoryPartRepository(db), repair_order_repository=repo)
+    use_case.update_inventory_part(part.id, InventoryPartUpdate(name=part.name, stock_quantity=10, cost=20.0, final_price=40.0))
+
+    db.expire_all()
+    assert (repo.get_by_id(pending.id).parts_total, repo.get_by_id(pending.id).expected_profit) == (40.0, 70.0)
+    assert (repo.get_by_id(completed.id).parts_total, repo.get_by_id(completed.id).expected_profit) == (25.0, 65.0)
+
+def test_price_list_reprices_open_orders_in_one_update(db):
+    """Test that a price list touching many parts re-values their open orders with a single UPDATE of repair_orders."""
+    part, add_order = _setup(db)
+    other = InventoryPartORM(id=uuid4(), name=f"Filtro {str(uuid4())[:8]}", stock_quantity=10, cost=5.0, final_price=8.0, is_active=True)
+    db.add(other)
+    db.commit()
+    repo = RepairOrderRepository(db)
+    lines = RepairOrderPartUseCase(RepairOrderPartRepository(db), repo, InventoryPartRepository(db))
+    orders = [add_order("pending"), add_order("in_progress"), add_order("cancelled")]
+    for order in orders:
+        for item in (part, other):
+            lines.create_repair_order_part(RepairOrderPartCreate(repair_order_id=order.id, part_id=item.id, quantity=1))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = InventoryPartUseCase(InventoryPartRepository(db), repair_order_repository=repo).update_prices([
+            InventoryPartPriceChange(id=part.id, final_price=30.0),
+            InventoryPartPriceChange(id=other.id, cost=6.0, final_price=10.0),
+        ])
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert (result.updated_parts, result.refreshed_orders) == (2, 2)
+    assert sum(statement.lstrip().upper().startswith("UPDATE REPAIR_ORDERS") for statement in statements) == 1
+    db.expire_all()
+    stored = {order.id: repo.get_by_id(order.id) for order in orders}
+    assert [(stored[o.id].parts_total, stored[o.id].expected_profit) for o in orders] == [
+        (40.0, 74.0), (40.0, 74.0), (33.0, 68.0),
+    ]
+
+    use_case = InventoryPartUseCase(InventoryPartRepository(db), repair_order_repository=repo)
+    with pytest.raises(InventoryPartValidationException):
+        use_case.update_prices([InventoryPartPriceChange(id=part.id)])
+    with pytest.raises(InventoryPartNotFoundException):
+        use_case.update_prices([InventoryPartPriceChange(id=uuid4(), cost=1.0)])
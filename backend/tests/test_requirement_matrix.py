@@ -0,0 +1,39 @@
+from uuid import uuid4
+import numpy as np
+from app.use_cases.repair_order_optimization.requirement_matrix import RequirementMatrix
+
+
+def test_matrix_vector_queries():
+    """Test fulfillability, consumption and remaining stock over the matrix."""
+    pads, oil = uuid4(), uuid4()
+    first, second, third = uuid4(), uuid4(), uuid4()
+    matrix = RequirementMatrix()
+    matrix.set_row(first, [(pads, 2), (oil, 1)])
+    matrix.set_row(second, [(oil, 3), (oil, 1)])
+    matrix.set_row(third, [(pads, 5)])
+
+    stock = np.array([4, 4])  # pads, oil in matrix column order
+    assert matrix.shape == (3, 2)
+    assert matrix.fulfillable(stock).tolist() == [True, True, False]
+    assert matrix.consumption([0, 1]).tolist() == [2, 5]
+    assert matrix.remaining(stock, [0]).tolist() == [2, 3]
+    assert matrix.row_sums(np.array([10.0, 1.0])).tolist() == [21.0, 4.0, 50.0]
+
+
+def test_matrix_row_updates_and_compaction():
+    """Test that replacing and removing rows keeps the queries consistent."""
+    part = uuid4()
+    orders = [uuid4() for _ in range(4)]
+    matrix = RequirementMatrix()
+    for order_id in orders:
+        matrix.set_row(order_id, [(part, 1)])
+
+    matrix.set_row(orders[0], [(part, 3)])
+    matrix.remove_row(orders[1])
+    matrix.remove_row(orders[2])
+    assert orders[1] not in matrix
+
+    live = matrix.live_rows()
+    assert sorted(matrix.order_ids[row] for row in live) == sorted([orders[0], orders[3]])
+    assert matrix.consumption(live).tolist() == [4]
+    assert matrix.row(matrix.order_index[orders[0]]) == [(0, 3)]
@@ -0,0 +1,23 @@
+from app.use_cases.repair_order_optimization.result_cache import VersionedResultCache
+
+
+def test_result_cache_lru_and_stats():
+    """Test hits, misses and least-recently-used eviction."""
+    cache = VersionedResultCache(max_entries=2)
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+
+    assert cache.get_or_compute(("list", 1), compute("a")) == "a"
+    assert cache.get_or_compute(("list", 2), compute("b")) == "b"
+    assert cache.get_or_compute(("list", 1), compute("stale")) == "a"  # hit, now most recent
+    assert cache.get_or_compute(("list", 3), compute("c")) == "c"  # evicts ("list", 2)
+    assert cache.get_or_compute(("list", 2), compute("b2")) == "b2"
+
+    assert calls == ["a", "b", "c", "b2"]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 4, 2, 2)
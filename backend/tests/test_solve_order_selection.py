@@ -0,0 +1,107 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from random import Random
+from app.use_cases.repair_order_optimization import solve_order_selection as solve_order_selection_module
+from app.use_cases.repair_order_optimization.solve_order_selection import solve_order_selection
+
+
+def _brute_force_profit(profits, requirements, stock):
+    best = 0.0
+    for mask in product([False, True], repeat=len(profits)):
+        used = {}
+        for take, row in zip(mask, requirements):
+            if take:
+                for part, qty in row:
+                    used[part] = used.get(part, 0) + qty
+        if all(qty <= stock[part] for part, qty in used.items()):
+            best = max(best, sum(p for take, p in zip(mask, profits) if take))
+    return best
+
+
+def test_solver_skips_orders_without_stock_or_profit():
+    """Test that unfulfillable and non-profitable orders are never selected."""
+    result = solve_order_selection(
+        profits=[50.0, -5.0, 20.0],
+        requirements=[[(0, 3)], [(1, 1)], [(1, 1)]],
+        stock=[2, 5],
+    )
+    assert result.selected == [2]
+    assert result.total_profit == 20.0
+    assert result.proven_optimal
+
+
+def test_solver_beats_first_come_first_served():
+    """Test that two cheaper orders are preferred when together they earn more."""
+    result = solve_order_selection(
+        profits=[100.0, 60.0, 60.0],
+        requirements=[[(0, 2)], [(0, 1)], [(0, 1), (1, 1)]],
+        stock=[2, 1],
+    )
+    assert result.selected == [1, 2]
+    assert result.total_profit == 120.0
+    assert result.upper_bound == 120.0
+
+
+def test_solver_matches_brute_force_on_random_backlogs():
+    """Test that branch-and-bound finds the optimum on small random backlogs."""
+    rng = Random(7)
+    for _ in range(50):
+        profits = [round(rng.uniform(5, 200), 2) for _ in range(10)]
+        requirements = [
+            [(part, rng.randint(1, 3)) for part in rng.sample(range(4), rng.randint(1, 3))]
+            for _ in range(10)
+        ]
+        stock = [rng.randint(0, 8) for _ in range(4)]
+
+        result = solve_order_selection(profits, requirements, stock)
+
+        assert abs(result.total_profit - _brute_force_profit(profits, requirements, stock)) < 1e-6
+        used = {}
+        for index in result.selected:
+            for part, qty in requirements[index]:
+                used[part] = used.get(part, 0) + qty
+        assert all(qty <= stock[part] for part, qty in used.items())
+
+
+def test_solver_splits_disjoint_components_across_processes(monkeypatch):
+    """Test that components solved on a process pool merge into the same optimum."""
+    monkeypatch.setattr(solve_order_selection_module, "PARALLEL_MIN_ITEMS", 2)
+    rng = Random(11)
+    profits, requirements = [], []
+    for component in range(3):
+        parts = range(component * 3, component * 3 + 3)  # no part shared across components
+        for _ in range(5):
+            profits.append(round(rng.uniform(5, 200), 2))
+            requirements.append([(part, rng.randint(1, 3)) for part in rng.sample(parts, rng.randint(1, 2))])
+    stock = [rng.randint(2, 5) for _ in range(9)]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel = solve_order_selection(profits, requirements, stock, executor=executor)
+    sequential = solve_order_selection(profits, requirements, stock)
+
+    assert parallel.selected == sequential.selected
+    assert parallel.proven_optimal
+    assert abs(parallel.total_profit - _brute_force_profit(profits, requirements, stock)) < 1e-6
+
+
+def test_solver_reports_gap_when_time_budget_runs_out():
+    """Test that a cut-off search returns a feasible plan with a valid upper bound."""
+    rng = Random(3)
+    profits = [round(rng.uniform(5, 200), 2) for _ in range(60)]
+    requirements = [
+        [(part, rng.randint(1, 3)) for part in rng.sample(range(6), rng.randint(1, 3))]
+        for _ in range(60)
+    ]
+    stock = [6] * 6
+
+    cut = solve_order_selection(profits, requirements, stock, time_budget_ms=0)
+    full = solve_order_selection(profits, requirements, stock)
+
+    assert not cut.proven_optimal and full.proven_optimal
+    assert cut.gaps and all(gap > 0 for _, gap in cut.gaps)
+    assert cut.total_profit <= full.total_profit <= cut.upper_bound
+    used = {}
+    for i in cut.selected:
+        for part, qty in requirements[i]:
+            used[part] = used.get(part, 0) + qty
+    assert all(qty <= stock[part] for part, qty in used.items())
@@ -0,0 +1,105 @@
+import pytest
+from uuid import uuid4
+from sqlalchemy import event
+from app.infrastructure.db.models import (Customer as CustomerORM, Vehicle as VehicleORM, InventoryPart as InventoryPartORM,
+                                          RepairOrder as RepairOrderORM, RepairOrderPart as RepairOrderPartORM)
+from app.adapters.schemas.repair_order_part import RepairOrderPartRequest
+from app.domain.exceptions import InventoryPartValidationException
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+from app.infrastructure.repositories.repair_order_part_repository import RepairOrderPartRepository
+from app.infrastructure.repositories.repair_order_repository import RepairOrderRepository
+from app.use_cases.repair_order_part_usecases import RepairOrderPartUseCase
+from tests.test_db import TestingSessionLocal
+
+def _setup(db, part_count):
+    db.query(RepairOrderPartORM).delete()
+    db.query(RepairOrderORM).delete()
+    db.commit()
+    suffix = str(uuid4())[:8]
+    customer = CustomerORM(id=uuid4(), name="Nora Sol", address="8 Main St", phone="123-456-7111")
+    vehicle = VehicleORM(id=uuid4(), license_plate=f"SYN {suffix}", color="green", customer_id=customer.id, brand="Fiat", model="Punto", year=2015, is_active=True)
+    parts = [
+        InventoryPartORM(id=uuid4(), name=f"Sync {suffix} {i}", stock_quantity=10, cost=1.0, final_price=2.0, is_active=True)
+        for i in range(part_count)
+    ]
+    order = RepairOrderORM(id=uuid4(), customer_id=customer.id, vehicle_id=vehicle.id, labor_cost=10.0, status="pending", is_active=True)
+    db.add_all([customer, vehicle, order, *parts])
+    db.commit()
+    use_case = RepairOrderPartUseCase(RepairOrderPartRepository(db), RepairOrderRepository(db), InventoryPartRepository(db))
+    return order, parts, use_case
+
+def test_sync_parts_applies_the_diff_with_batched_statements(db):
+    """Test that a 15-line edit loads the parts once, writes the lines in bulk and moves the stock by the difference in one commit."""
+    order, parts, use_case = _setup(db, 16)
+    use_case.sync_parts_for_order(order.id, [RepairOrderPartRequest(part_id=parts[i].id, quantity=2) for i in range(3)])
+
+    incoming = [RepairOrderPartRequest(part_id=parts[0].id, quantity=5), RepairOrderPartRequest(part_id=parts[1].id, quantity=2)]
+    incoming += [RepairOrderPartRequest(part_id=part.id, quantity=1) for part in parts[3:16]]
+    statements, commits = [], []
+    listener = lambda conn, cursor, statement, *args: statements.append(" ".join(statement.split()).upper())
+    on_commit = lambda session: commits.append(session)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    event.listen(db, "after_commit", on_commit)
+    try:
+        total = use_case.sync_parts_for_order(order.id, incoming)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+        event.remove(db, "after_commit", on_commit)
+
+    assert total == 2.0 * (5 + 2 + 13)
+    assert sum(s.startswith("SELECT") and "FROM INVENTORY_PARTS" in s for s in statements) == 1
+    assert sum(s.startswith("INSERT INTO REPAIR_ORDER_PARTS") for s in statements) == 1
+    # One conditional stock move per part whose quantity changed: 0, the 13 new ones and the removed one.
+    assert sum(s.startswith("UPDATE INVENTORY_PARTS") for s in statements) == 15
+    assert len(commits) == 1
+
+    db.expire_all()
+    lines = {line.part_id: line.quantity for line in RepairOrderPartRepository(db).get_by_order_id(order.id)}
+    assert lines == {item.part_id: item.quantity for item in incoming}
+    stock = {part.id: part.stock_quantity for part in InventoryPartRepository(db).get_by_ids([p.id for p in parts])}
+    assert (stock[parts[0].id], stock[parts[1].id], stock[parts[2].id], stock[parts[3].id]) == (5, 8, 10, 9)
+    assert RepairOrderRepository(db).get_by_id(order.id).parts_total == total
+
+def test_sync_parts_is_atomic_when_a_part_lacks_stock(db):
+    """Test that an edit failing on one part leaves every line and stock untouched."""
+    order, parts, use_case = _setup(db, 3)
+    use_case.sync_parts_for_order(order.id, [RepairOrderPartRequest(part_id=parts[0].id, quantity=2)])
+
+    with pytest.raises(InventoryPartValidationException):
+        use_case.sync_parts_for_order(order.id, [
+            RepairOrderPartRequest(part_id=parts[1].id, quantity=1),
+            RepairOrderPartRequest(part_id=parts[2].id, quantity=11),
+        ])
+    with pytest.raises(InventoryPartValidationException):
+        use_case.sync_parts_for_order(order.id, [
+            RepairOrderPartRequest(part_id=parts[1].id, quantity=1),
+            RepairOrderPartRequest(part_id=parts[1].id, quantity=2),
+        ])
+
+    db.expire_all()
+    lines = {line.part_id: line.quantity for line in RepairOrderPartRepository(db).get_by_order_id(order.id)}
+    assert lines == {parts[0].id: 2}
+    assert [p.stock_quantity for p in InventoryPartRepository(db).get_by_ids([p.id for p in parts])].count(10) == 2
+
+def test_sync_parts_rejects_stock_taken_after_it_was_read(db):
+    """Test that stock taken by another session after this one read it makes the edit fail instead of overselling."""
+    order, parts, use_case = _setup(db, 2)
+    InventoryPartRepository(db).get_by_ids([parts[0].id])  # the session now holds stock 10 for the part
+
+    other = TestingSessionLocal()
+    try:
+        assert InventoryPartRepository(other).move_stock(parts[0].id, -9) == 1
+        assert InventoryPartRepository(other).move_stock(parts[0].id, -2) is None
+    finally:
+        other.close()
+
+    with pytest.raises(InventoryPartValidationException):
+        use_case.sync_parts_for_order(order.id, [
+            RepairOrderPartRequest(part_id=parts[1].id, quantity=4),
+            RepairOrderPartRequest(part_id=parts[0].id, quantity=3),
+        ])
+
+    db.expire_all()
+    assert RepairOrderPartRepository(db).get_by_order_id(order.id) == []
+    stock = {p.id: p.stock_quantity for p in InventoryPartRepository(db).get_by_ids([p.id for p in parts])}
+    assert (stock[parts[0].id], stock[parts[1].id]) == (1, 10)
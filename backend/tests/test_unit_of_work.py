@@ -0,0 +1,61 @@
+import pytest
+from uuid import uuid4
+from sqlalchemy import event
+from app.domain.models import InventoryPart
+from app.infrastructure.db.models import Customer as CustomerORM, InventoryPart as InventoryPartORM
+from app.infrastructure.repositories.base_repository import get_change_counter
+from app.infrastructure.repositories.customer_repository import CustomerRepository
+from app.infrastructure.repositories.inventory_part_repository import InventoryPartRepository
+
+def _part(name):
+    return InventoryPart(id=uuid4(), name=name, description=None, stock_quantity=3, cost=1.0, final_price=2.0, is_active=True)
+
+def test_unit_of_work_commits_once_and_bumps_counters_after(db):
+    """Test that writes of several repositories inside a unit of work flush, commit once and bump each counter once."""
+    parts, customers = InventoryPartRepository(db), CustomerRepository(db)
+    suffix = str(uuid4())[:8]
+    customer_id = uuid4()
+    db.add(CustomerORM(id=customer_id, name="Eva Luz", address="2 Main St", phone="123-456-7222"))
+    db.commit()
+    counters = (get_change_counter(InventoryPartORM), get_change_counter(CustomerORM))
+    commits, statements = [], []
+    on_commit = lambda session: commits.append(session)
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.lstrip().upper())
+    event.listen(db, "after_commit", on_commit)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        with parts.unit_of_work():
+            first = parts.add(_part(f"Unit {suffix} a"))
+            with customers.unit_of_work():
+                customers.update(customer_id, {"name": "Eva Luz Ruiz"})
+                parts.update(first.id, {"stock_quantity": 7})
+            parts.add(_part(f"Unit {suffix} b"))
+            assert (get_change_counter(InventoryPartORM), get_change_counter(CustomerORM)) == counters
+            assert commits == []
+    finally:
+        event.remove(db, "after_commit", on_commit)
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert len(commits) == 1
+    # No reload after each write: only the lookups by id of update and the inserts/updates ran.
+    assert sum(statement.startswith("SELECT") for statement in statements) == 2
+    assert get_change_counter(InventoryPartORM) == counters[0] + 1
+    assert get_change_counter(CustomerORM) == counters[1] + 1
+    assert parts.get_by_name(f"Unit {suffix} a").stock_quantity == 7
+    assert customers.get_by_id(customer_id).name == "Eva Luz Ruiz"
+
+def test_unit_of_work_rolls_back_every_write_on_error(db):
+    """Test that an error inside a unit of work discards its writes and leaves the change counters alone."""
+    parts = InventoryPartRepository(db)
+    suffix = str(uuid4())[:8]
+    counter = get_change_counter(InventoryPartORM)
+    with pytest.raises(RuntimeError):
+        with parts.unit_of_work():
+            parts.add(_part(f"Rollback {suffix}"))
+            raise RuntimeError("boom")
+
+    assert parts.get_by_name(f"Rollback {suffix}") is None
+    assert get_change_counter(InventoryPartORM) == counter
+    assert not parts.in_unit_of_work()
+    parts.add(_part(f"After {suffix}"))
+    assert get_change_counter(InventoryPartORM) == counter + 1
@@ -0,0 +1,14 @@
+import axios from 'axios';
+
+// Follows the X-Next-Cursor header of the keyset-paginated /list endpoints
+// and returns the rows of every page.
+export const getAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, { params: cursor ? { ...params, cursor } : params });
+    items.push(...(response.data || []));
+    cursor = response.headers['x-next-cursor'] || null;
+  } while (cursor);
+  return items;
+};
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { getAllPages } from './pagination';
 
 const API_URL = 'http://localhost:8000/api/v1';
 
@@ -14,8 +15,7 @@ export const getOptimizedOrders = async () => {
 
 export const getOrders = async () => {
   try {
-    const response = await axios.get(API_URL + '/repair_orders/list');
-    return response.data || [];
+    return await getAllPages(API_URL + '/repair_orders/list');
   } catch (error) {
     console.error('Error fetching orders:', error);
     return [];
@@ -1,11 +1,11 @@
 import axios from 'axios';
+import { getAllPages } from './pagination';
 
 const API_URL = 'http://localhost:8000/api/v1';
 
 export const getVehicles = async () => {
   try {
-    const response = await axios.get(API_URL + '/vehicles/list');
-    return response.data || [];
+    return await getAllPages(API_URL + '/vehicles/list');
   } catch (error) {
     console.error('Error fetching vehicles:', error);
     return [];